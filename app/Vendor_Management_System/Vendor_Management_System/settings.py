@@ -14,6 +14,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,18 +34,68 @@ ALLOWED_HOSTS = []
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "vendor_api.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_PAGINATION_CLASS": "vendor_api.pagination.KeysetPagination",
+    "PAGE_SIZE": 100,
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=24),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=10),
+    # Tokens carry a hash of the user's password, so that changing it revokes
+    # them. CachedJWTAuthentication also uses it as the token version.
+    "CHECK_REVOKE_TOKEN": True,
 }
 
+# Seconds for which vendor_api.authentication.CachedJWTAuthentication keeps a
+# user in its per-process cache (0 disables it), and how many it keeps. Users
+# are evicted as soon as they are saved in the same process; other processes
+# notice after at most the TTL.
+JWT_USER_CACHE_TTL = float(os.environ.get("JWT_USER_CACHE_TTL", 60))
+JWT_USER_CACHE_SIZE = int(os.environ.get("JWT_USER_CACHE_SIZE", 1024))
+
+# The copies of vendor performance rates on the Vendor row are refreshed after
+# the writing transaction commits, once per vendor. The default, "on_commit",
+# does NOT take the refresh off the write path: it runs in the request, after
+# the commit but before the response, so a write adds one read of the counters
+# and one vendor UPDATE per vendor to the response time, and every later read
+# sees the new rates. "background" hands the refresh to a worker thread that
+# merges bursts of writes (waiting VENDOR_METRICS_REFRESH_DELAY seconds to let
+# them accumulate), so writes return without it; vendor listings, the
+# leaderboard and the order summary then lag a write by about that delay, and
+# refreshes still queued when the process exits are lost until the vendor's
+# next write or reconcile_vendor_metrics.
+VENDOR_METRICS_REFRESH_MODE = os.environ.get("VENDOR_METRICS_REFRESH_MODE", "on_commit")
+VENDOR_METRICS_REFRESH_DELAY = float(
+    os.environ.get("VENDOR_METRICS_REFRESH_DELAY", 0.05)
+)
+
+# Requests slower than this are logged with their SQL by
+# vendor_api.instrumentation.InstrumentationMiddleware.
+SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get("SLOW_REQUEST_THRESHOLD_MS", 500))
+
+# GET /metrics/ is served to staff users, with an API token, and to these
+# client addresses (comma separated), e.g. that of the Prometheus server.
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip
+]
+
+# GET /api/changes/ (vendor_api.async_views.purchase_order_changes): entries
+# per response by default and at most, the longest a request may wait for new
+# entries (seconds), and how often a waiting request checks for them.
+# Long polling is off (0) by default: a waiting request only frees its worker
+# thread under an ASGI server (e.g. uvicorn Vendor_Management_System.asgi:
+# application); under WSGI, each waiting client holds a thread for the whole
+# wait. Set CHANGE_FEED_MAX_WAIT (e.g. to 30) only when serving through ASGI.
+CHANGE_FEED_PAGE_SIZE = 100
+CHANGE_FEED_MAX_PAGE_SIZE = 1000
+CHANGE_FEED_MAX_WAIT = float(os.environ.get("CHANGE_FEED_MAX_WAIT", 0))
+CHANGE_FEED_POLL_INTERVAL = float(os.environ.get("CHANGE_FEED_POLL_INTERVAL", 0.5))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -62,6 +114,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "vendor_api.instrumentation.InstrumentationMiddleware",
+    "vendor_api.routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -96,13 +150,82 @@ WSGI_APPLICATION = "Vendor_Management_System.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DATABASE_PROFILE selects the backend:
+# - "sqlite" (default): a single-node SQLite file in WAL mode, with the
+#   pragmas in SQLITE_PRAGMAS applied to every connection (see vendor_api.db).
+# - "postgresql": PostgreSQL configured by the POSTGRES_* variables (install
+#   the psycopg package). Connections are kept open for CONN_MAX_AGE seconds
+#   and checked before reuse; put PgBouncer in front for pooling across
+#   processes.
+# Setting a replica (SQLITE_REPLICA_PATH or POSTGRES_REPLICA_HOST) adds the
+# "replica" alias, which serves the GET requests of the vendor, purchase
+# order and performance endpoints (see vendor_api.routers).
+
+DATABASE_PROFILE = os.environ.get("DATABASE_PROFILE", "sqlite")
+REPLICA_DATABASE = "replica"
+
+if DATABASE_PROFILE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "vendor_management_system"),
+            "USER": os.environ.get("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+        }
     }
+    if os.environ.get("POSTGRES_REPLICA_HOST"):
+        DATABASES[REPLICA_DATABASE] = {
+            **DATABASES["default"],
+            "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+            "PORT": os.environ.get("POSTGRES_REPLICA_PORT", "5432"),
+            "TEST": {"MIRROR": "default"},
+        }
+elif DATABASE_PROFILE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            # Seconds a write waits for the write lock before failing.
+            "OPTIONS": {"timeout": 20},
+        }
+    }
+    if os.environ.get("SQLITE_REPLICA_PATH"):
+        DATABASES[REPLICA_DATABASE] = {
+            **DATABASES["default"],
+            "NAME": os.environ["SQLITE_REPLICA_PATH"],
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    raise ImproperlyConfigured(
+        f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}; use sqlite or postgresql."
+    )
+
+# Applied to every SQLite connection. WAL lets reads run alongside a write,
+# and NORMAL synchronous mode only syncs at checkpoints, which stays durable
+# against application crashes.
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "temp_store": "memory",
+    "cache_size": -64000,  # 64 MB.
+    "mmap_size": 268435456,  # 256 MB.
 }
 
+# Transactions take the SQLite write lock when they begin rather than at their
+# first write, so that concurrent read-then-write transactions queue up
+# instead of failing (see vendor_api.db).
+SQLITE_TRANSACTION_MODE = "IMMEDIATE"
+
+DATABASE_ROUTERS = ["vendor_api.routers.ReplicaRouter"]
+
+# Seconds during which a client that wrote through the API reads from the
+# primary database, so that it sees its own writes despite replica lag.
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
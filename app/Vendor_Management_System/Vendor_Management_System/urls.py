@@ -5,6 +5,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from vendor_api.instrumentation import metrics_view
+
 schema_view = get_schema_view(
    openapi.Info(
       title="Vendor Management System",
@@ -18,5 +20,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include("vendor_api.urls")),
+    path('api/async/', include("vendor_api.async_urls")),
+    path('metrics/', metrics_view, name='metrics'),
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
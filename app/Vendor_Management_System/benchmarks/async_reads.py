@@ -0,0 +1,134 @@
+"""
+Load benchmark of the sync (DRF) read endpoints against their async variants.
+
+Both run in-process on the same database and hardware, with the same number
+of requests in flight (--concurrency): the sync endpoints on a pool of that
+many worker threads, as a threaded WSGI/ASGI server would run them, and the
+async endpoints as that many concurrent tasks on a single event loop, each in
+its own ThreadSensitiveContext as an ASGI server runs requests (otherwise the
+async ORM would run the queries of all requests on one thread).
+
+--db-latency adds a simulated network round trip to every query. The async
+views do not come out ahead at equal concurrency, with or without latency:
+every query of an async view still runs on a worker thread, plus a hop to get
+there and back.
+
+Usage (from app/Vendor_Management_System):
+    python benchmarks/async_reads.py --requests 2000 --concurrency 200
+    python benchmarks/async_reads.py --concurrency 200 --db-latency 50
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Vendor_Management_System.settings")
+
+import django
+from asgiref.sync import ThreadSensitiveContext
+
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from vendor_api.models import Vendor
+
+PATHS = [
+    "vendors/?page_size=50",
+    "vendors/{vendor_id}/",
+    "vendors/{vendor_id}/performance/",
+    "purchase_orders/?page_size=50",
+]
+
+
+def add_latency(seconds):
+    """
+    Delays every query of the connections opened from now on by ``seconds``,
+    as a database across the network would.
+    """
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+
+
+def run_sync(paths, headers, concurrency):
+    def fetch(path):
+        client = Client(headers=headers)
+        return client.get(f"/api/{path}").status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        statuses = list(executor.map(fetch, paths))
+    return time.perf_counter() - started, statuses
+
+
+def run_async(paths, headers, concurrency):
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(path):
+            async with semaphore, ThreadSensitiveContext():
+                response = await client.get(f"/api/async/{path}", headers=headers)
+                return response.status_code
+
+        return await asyncio.gather(*(fetch(path) for path in paths))
+
+    started = time.perf_counter()
+    statuses = asyncio.run(main())
+    return time.perf_counter() - started, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument(
+        "--db-latency",
+        type=float,
+        default=0,
+        help="Simulated database round trip per query, in milliseconds.",
+    )
+    args = parser.parse_args()
+
+    setup_test_environment()
+    user = User.objects.filter(is_active=True).first()
+    vendor = Vendor.objects.first()
+    if user is None or vendor is None:
+        sys.exit("The database needs at least one active user and one vendor.")
+    if args.db_latency:
+        add_latency(args.db_latency / 1000)
+    token = RefreshToken.for_user(user).access_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    paths = [
+        PATHS[i % len(PATHS)].format(vendor_id=vendor.pk) for i in range(args.requests)
+    ]
+    print(f"{args.concurrency} requests in flight")
+    for name, (elapsed, statuses) in [
+        ("sync", run_sync(paths, headers, args.concurrency)),
+        ("async", run_async(paths, headers, args.concurrency)),
+    ]:
+        errors = sum(status != 200 for status in statuses)
+        print(
+            f"{name:>6}: {len(paths) / elapsed:8.1f} req/s "
+            f"({elapsed:.2f} s, {errors} errors)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Benchmarks the hot paths of the vendor API on a freshly seeded test database.
+
+Every scenario sends the same request sequence (the random choices are seeded)
+and reports the p50/p99 latency, the mean number of SQL queries per request
+and the throughput. Results are compared with the stored baselines, and the
+run fails if a scenario issues more queries than its baseline or its p50/p99
+latency grows by more than the tolerance. Query counts do not depend on the
+machine; latencies do, so record the baselines where the comparison runs.
+
+Usage (from app/Vendor_Management_System):
+    python benchmarks/run.py                    # compare with baselines.json
+    python benchmarks/run.py --save-baseline    # record new baselines
+    python benchmarks/run.py --scenario po_create --iterations 500
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Vendor_Management_System.settings")
+
+import django
+
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from vendor_api.models import PurchaseOrder, Vendor
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines.json"
+)
+
+
+class Scenarios:
+    """
+    Each scenario method sends one request and returns the response. They draw
+    their targets from a seeded generator so every run replays the same requests.
+    """
+
+    def __init__(self, client, seed):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.vendor_ids = list(Vendor.objects.values_list("id", flat=True))
+        self.order_ids = list(PurchaseOrder.objects.values_list("id", flat=True))
+        self.created = 0
+        self.since = (timezone.now() - timedelta(days=30)).isoformat()
+
+    def names(self):
+        return [
+            "vendor_list",
+            "po_list",
+            "po_list_by_vendor",
+            "po_list_by_sku",
+            "po_list_filtered",
+            "po_count",
+            "po_create",
+            "po_update",
+            "acknowledge",
+            "vendor_retrieve",
+            "performance_retrieve",
+            "leaderboard",
+        ]
+
+    def vendor_list(self):
+        return self.client.get(reverse("vendor-create-list"))
+
+    def po_list(self):
+        return self.client.get(reverse("purchase-order-create-list"))
+
+    def po_list_by_vendor(self):
+        vendor_id = self.rng.choice(self.vendor_ids)
+        return self.client.get(
+            reverse("purchase-order-create-list"), {"vendor": vendor_id}
+        )
+
+    def po_list_by_sku(self):
+        # The seeded items are skewed, so the low SKU numbers match many orders.
+        sku = f"SKU-{self.rng.randrange(100):05d}"
+        return self.client.get(reverse("purchase-order-create-list"), {"sku": sku})
+
+    def po_list_filtered(self):
+        # A dashboard query: one status over the last few weeks.
+        status = self.rng.choice(["pending", "completed", "canceled"])
+        return self.client.get(
+            reverse("purchase-order-create-list"),
+            {"status": status, "order_date_after": self.since},
+        )
+
+    def po_count(self):
+        return self.client.get(
+            reverse("purchase-order-create-list"),
+            {"acknowledged": "false", "count_only": "true"},
+        )
+
+    def po_create(self):
+        self.created += 1
+        return self.client.post(
+            reverse("purchase-order-create-list"),
+            {
+                "po_number": f"BENCH-PO-{self.created:08d}",
+                "vendor": self.rng.choice(self.vendor_ids),
+                "items": [{"name": "Item 1", "quantity": 5, "unit_price": 10.99}],
+                "quantity": 5,
+                "status": "pending",
+            },
+            format="json",
+        )
+
+    def po_update(self):
+        # Completing or reopening an order moves every counter of its vendor.
+        po_id = self.rng.choice(self.order_ids)
+        if self.rng.random() < 0.5:
+            data = {"status": "completed", "quality_rating": self.rng.randint(1, 5)}
+        else:
+            data = {"status": "pending", "quality_rating": None}
+        return self.client.patch(
+            reverse("purchase-order-read-update-delete", kwargs={"po_id": po_id}),
+            data,
+            format="json",
+        )
+
+    def acknowledge(self):
+        po_id = self.rng.choice(self.order_ids)
+        return self.client.patch(
+            reverse("purchase-order-acknowledge", kwargs={"po_id": po_id})
+        )
+
+    def vendor_retrieve(self):
+        vendor_id = self.rng.choice(self.vendor_ids)
+        return self.client.get(
+            reverse("vendor-read-update-delete", kwargs={"pk": vendor_id})
+        )
+
+    def performance_retrieve(self):
+        vendor_id = self.rng.choice(self.vendor_ids)
+        return self.client.get(
+            reverse("vendor-performance-retrieve", kwargs={"vendor_id": vendor_id})
+        )
+
+    def leaderboard(self):
+        return self.client.get(reverse("vendor-performance-leaderboard"), {"top": 20})
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_scenario(scenario, iterations, warmup):
+    """
+    Returns: A dict with the latency percentiles (ms), the mean number of
+    queries per request and the throughput (requests per second).
+    """
+    for _ in range(warmup):
+        scenario()
+
+    latencies = []
+    queries = 0
+    # Collector pauses would land on random requests and dominate the p99.
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                request_started = time.perf_counter()
+                response = scenario()
+                latencies.append(time.perf_counter() - request_started)
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f"{scenario.__name__} failed with {response.status_code}: "
+                    f"{response.data}"
+                )
+            queries += len(context.captured_queries)
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "queries": round(queries / iterations, 2),
+        "throughput": round(iterations / elapsed, 1),
+    }
+
+
+def compare(results, baselines, tolerance, p99_tolerance):
+    """
+    Returns: The list of regressions of the results against the baselines.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        if result["queries"] > baseline["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries per request "
+                f"(baseline {baseline['queries']})"
+            )
+        for key, allowed in (("p50_ms", tolerance), ("p99_ms", p99_tolerance)):
+            limit = baseline[key] * (1 + allowed)
+            if result[key] > limit:
+                regressions.append(
+                    f"{name}: {key} {result[key]} (baseline {baseline[key]}, "
+                    f"limit {limit:.3f})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        help="Only run this scenario (can be given more than once).",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed p50 latency growth over the baseline (default: 0.5, i.e. 50%%).",
+    )
+    parser.add_argument(
+        "--p99-tolerance",
+        type=float,
+        default=1.5,
+        help="Allowed p99 latency growth; tail latency is noisier (default: 1.5).",
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baselines instead of comparing.",
+    )
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        call_command(
+            "seed_vendor_data",
+            vendors=args.vendors,
+            orders=args.orders,
+            seed=args.seed,
+            stdout=open(os.devnull, "w"),
+        )
+        user = User.objects.create_user("benchmark_user", password="benchmark")
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}"
+        )
+        scenarios = Scenarios(client, args.seed)
+
+        results = {}
+        print(
+            f"{'scenario':<22}{'p50 ms':>10}{'p99 ms':>10}{'queries':>10}{'req/s':>10}"
+        )
+        for name in args.scenario or scenarios.names():
+            result = run_scenario(
+                getattr(scenarios, name), args.iterations, args.warmup
+            )
+            results[name] = result
+            print(
+                f"{name:<22}{result['p50_ms']:>10}{result['p99_ms']:>10}"
+                f"{result['queries']:>10}{result['throughput']:>10}"
+            )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+    parameters = {
+        "vendors": args.vendors,
+        "orders": args.orders,
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "database": connection.vendor,
+        "python": platform.python_version(),
+    }
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(
+                {"parameters": parameters, "scenarios": results},
+                baseline_file,
+                indent=2,
+                sort_keys=True,
+            )
+            baseline_file.write("\n")
+        print(f"Saved baselines to {args.baseline}.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baselines to compare with; run with --save-baseline first.")
+        return
+    with open(args.baseline) as baseline_file:
+        stored = json.load(baseline_file)
+    if stored["parameters"] != parameters:
+        print(f"Warning: baselines were recorded with {stored['parameters']}.")
+    regressions = compare(
+        results, stored["scenarios"], args.tolerance, args.p99_tolerance
+    )
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
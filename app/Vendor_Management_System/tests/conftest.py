@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture(scope="function")
+def clean_db():
+    """
+    Fixture to ensure a clean database for each test.
+    """
+    # Imported here: Django is set up by the test modules, and setting it up
+    # before them would let pytest-django block database access.
+    from django.db import transaction
+    from vendor_api.models import Vendor, PurchaseOrder
+
+    with transaction.atomic():
+        PurchaseOrder.objects.all().delete()
+        Vendor.objects.all().delete()
+
+    yield
@@ -0,0 +1,174 @@
+import os
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Vendor_Management_System.settings")
+django.setup()
+
+import pytest
+import datetime
+from django.core.management import call_command
+from vendor_api.models import Vendor, PurchaseOrder, HistoricalPerformance
+
+
+@pytest.fixture(scope="function")
+def create_vendors():
+    return [
+        Vendor.objects.create(
+            name=f"Test Vendor {i}",
+            contact_details="123-456-7890",
+            address="123 Main St",
+            vendor_code=f"CODE{i}",
+        ).id
+        for i in range(3)
+    ]
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_snapshot_vendor_performance_is_idempotent_per_bucket(create_vendors):
+    """
+    Tests that snapshots are taken once per vendor and bucket.
+    """
+    vendor = Vendor.objects.get(id=create_vendors[0])
+    PurchaseOrder.objects.create(
+        po_number="PO1", vendor=vendor, items=[], quantity=1, status="completed"
+    )
+
+    call_command("snapshot_vendor_performance", "--interval", "3600")
+    call_command("snapshot_vendor_performance", "--interval", "3600")
+
+    snapshots = HistoricalPerformance.objects.filter(vendor_id__in=create_vendors)
+    assert snapshots.count() == 3
+    snapshot = snapshots.get(vendor=vendor)
+    assert snapshot.fulfillment_rate == 100.0
+    assert snapshot.date.minute == 0 and snapshot.date.second == 0
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_late_snapshots_are_rolled_up_again(create_vendors):
+    """
+    Tests that a snapshot taken for a bucket that is already rolled up gets
+    the bucket rolled up again.
+    """
+    from vendor_api.history import rollup_history, snapshot_vendor_performance
+    from vendor_api.models import HistoricalPerformanceRollup
+
+    start = datetime.datetime(2024, 5, 1, 10, tzinfo=datetime.timezone.utc)
+    snapshot_vendor_performance(60, at=start)
+    assert rollup_history("hourly", until=start + datetime.timedelta(hours=2)) == 3
+
+    snapshot_vendor_performance(60, at=start + datetime.timedelta(minutes=30))
+
+    rollups = HistoricalPerformanceRollup.objects.filter(resolution="hourly")
+    assert list(rollups.values_list("date", "samples").distinct()) == [(start, 2)]
+    assert rollups.count() == 3
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_seed_vendor_data_is_reproducible():
+    """
+    Tests that seeding creates skewed data with consistent metric counters,
+    and that the same seed yields the same data.
+    """
+    call_command("seed_vendor_data", "--vendors", "5", "--orders", "300", "--seed", "7")
+
+    vendors = Vendor.objects.filter(vendor_code__startswith="SEED-")
+    assert vendors.count() == 5
+    orders_per_vendor = sorted(
+        (vendor.purchaseorder_set.count() for vendor in vendors), reverse=True
+    )
+    assert sum(orders_per_vendor) == 300
+    assert orders_per_vendor[0] > 2 * orders_per_vendor[-1]
+    for vendor in vendors:
+        counters = vendor.metric_counters
+        assert counters.total_orders == vendor.purchaseorder_set.count()
+        assert counters.completed_orders == (
+            vendor.purchaseorder_set.filter(status="completed").count()
+        )
+        assert vendor.fulfillment_rate == float(vendor.calculate_fulfillment_rate())
+
+    first_run = list(
+        PurchaseOrder.objects.order_by("po_number").values_list(
+            "po_number", "vendor__vendor_code", "status", "quality_rating"
+        )
+    )
+    call_command(
+        "seed_vendor_data",
+        "--vendors",
+        "5",
+        "--orders",
+        "300",
+        "--seed",
+        "7",
+        "--clear",
+    )
+    assert (
+        list(
+            PurchaseOrder.objects.order_by("po_number").values_list(
+                "po_number", "vendor__vendor_code", "status", "quality_rating"
+            )
+        )
+        == first_run
+    )
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_reconcile_vendor_metrics_repairs_drift(create_vendors):
+    """
+    Tests that reconciling rebuilds drifted counters and rates from the orders.
+    """
+    vendor_id = create_vendors[0]
+    for i, status in enumerate(["completed", "completed", "pending"]):
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=vendor_id,
+            items=[],
+            quantity=1,
+            status=status,
+            quality_rating=4.0 if status == "completed" else None,
+        )
+    # Writes that bypass the model, e.g. raw SQL or queryset updates.
+    PurchaseOrder.objects.filter(po_number="PO2").update(status="completed")
+    Vendor.objects.filter(id=create_vendors[1]).update(fulfillment_rate=50.0)
+
+    call_command("reconcile_vendor_metrics", "--dry-run")
+    assert Vendor.objects.get(id=vendor_id).metric_counters.completed_orders == 2
+
+    call_command("reconcile_vendor_metrics")
+    vendor = Vendor.objects.get(id=vendor_id)
+    assert vendor.metric_counters.completed_orders == 3
+    assert vendor.metric_counters.rating_count == 2
+    assert vendor.fulfillment_rate == 100.0
+    assert Vendor.objects.get(id=create_vendors[1]).fulfillment_rate == 0.0
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_backfill_purchase_order_items(create_vendors):
+    """
+    Tests that the backfill rebuilds the item lines of existing orders in
+    chunks, and that running it again changes nothing.
+    """
+    from vendor_api.models import PurchaseOrderItem
+
+    for i in range(5):
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=create_vendors[0],
+            items=[
+                {"sku": f"SKU-{i}", "name": "Bolt", "quantity": 1},
+                {"name": "Nut", "quantity": 1},
+                {"quantity": 1},
+            ],
+            quantity=3,
+        )
+    # Orders written before the lines existed have none.
+    PurchaseOrderItem.objects.all().delete()
+
+    call_command("backfill_purchase_order_items", "--batch-size", "2")
+    call_command("backfill_purchase_order_items", "--batch-size", "2")
+
+    assert PurchaseOrderItem.objects.count() == 10
+    assert list(
+        PurchaseOrderItem.objects.filter(purchase_order__po_number="PO3")
+        .order_by("position")
+        .values_list("position", "sku", "name")
+    ) == [(0, "SKU-3", "Bolt"), (1, "", "Nut")]
@@ -0,0 +1,176 @@
+import os
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Vendor_Management_System.settings")
+django.setup()
+
+import random
+import threading
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from vendor_api import metrics
+from vendor_api.bulk import transition_purchase_orders
+from vendor_api.changes import sequence_changes
+from vendor_api.models import PurchaseOrder, PurchaseOrderChange, Vendor
+
+WORKERS = 8
+OPERATIONS_PER_WORKER = 250
+
+
+def update_order(rng, order_ids, vendor_ids):
+    """
+    One random purchase order write, the way the API makes them: load the
+    order, change it and save it, or move a few orders to a status in bulk.
+    """
+    operation = rng.random()
+    if operation < 0.1:
+        transition_purchase_orders(
+            rng.sample(order_ids, 5), [], rng.choice(["completed", "canceled"])
+        )
+        return
+    order = PurchaseOrder.objects.get(pk=rng.choice(order_ids))
+    if operation < 0.4:
+        # Acknowledgement (see PurchaseOrderAcknowledgeView).
+        order.acknowledgment_date = timezone.now()
+        order.delivery_date = order.acknowledgment_date + timezone.timedelta(
+            days=rng.randint(-2, 5)
+        )
+        order.save(update_fields=["acknowledgment_date", "delivery_date"])
+        return
+    order.status = rng.choice(["pending", "completed", "canceled"])
+    order.quality_rating = rng.choice([None, 1.0, 2.5, 4.0, 5.0])
+    if operation < 0.5:
+        order.vendor_id = rng.choice(vendor_ids)
+    order.save()
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_concurrent_purchase_order_writes_keep_metrics_exact():
+    """
+    Tests that thousands of concurrent writes to a few vendors' orders leave
+    the counters and rates equal to a full recompute from the orders.
+    """
+    vendor_ids = [
+        Vendor.objects.create(
+            name=f"Test Vendor {i}",
+            contact_details="123-456-7890",
+            address="123 Main St",
+            vendor_code=f"CODE{i}",
+        ).id
+        for i in range(3)
+    ]
+    issue_date = timezone.now() - timezone.timedelta(days=3)
+    order_ids = [
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=vendor_ids[i % len(vendor_ids)],
+            items=[],
+            quantity=1,
+            issue_date=issue_date,
+        ).id
+        for i in range(40)
+    ]
+
+    errors = []
+    start = threading.Barrier(WORKERS)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            start.wait()
+            for _ in range(OPERATIONS_PER_WORKER):
+                update_order(rng, order_ids, vendor_ids)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert metrics.reconcile_counters(dry_run=True) == {}
+    for vendor in Vendor.objects.filter(id__in=vendor_ids):
+        assert vendor.fulfillment_rate == pytest.approx(
+            float(vendor.calculate_fulfillment_rate()), abs=0.01
+        )
+        assert vendor.on_time_delivery_rate == pytest.approx(
+            float(vendor.calculate_on_time_delivery_rate()), abs=0.01
+        )
+        assert vendor.quality_rating_avg == pytest.approx(
+            float(vendor.calculate_quality_rating_average()), abs=0.01
+        )
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_change_feed_reader_never_skips_concurrent_writes():
+    """
+    Tests that a feed reader polling while many threads write purchase
+    orders sees every change log entry exactly once, in sequence.
+    """
+    vendor_id = Vendor.objects.create(
+        name="Test Vendor",
+        contact_details="123-456-7890",
+        address="123 Main St",
+        vendor_code="CODE1",
+    ).id
+    while sequence_changes():
+        pass
+    since = PurchaseOrderChange.objects.order_by("-seq").values_list("seq", flat=True)
+    since = since.first() or 0
+    first_id = PurchaseOrderChange.objects.order_by("-id").values_list("id", flat=True)
+    first_id = first_id.first() or 0
+
+    errors = []
+    writing = threading.Event()
+    writing.set()
+    start = threading.Barrier(WORKERS)
+
+    def writer(seed):
+        try:
+            start.wait()
+            for i in range(50):
+                order = PurchaseOrder.objects.create(
+                    po_number=f"PO{seed}-{i}", vendor_id=vendor_id, items=[], quantity=1
+                )
+                order.status = "completed"
+                order.save(update_fields=["status"])
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    seen = []
+
+    def read():
+        sequence_changes()
+        last = seen[-1][0] if seen else since
+        seen.extend(
+            PurchaseOrderChange.objects.filter(seq__gt=last)
+            .order_by("seq")
+            .values_list("seq", "id")
+        )
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        read()
+    for thread in threads:
+        thread.join()
+    while sequence_changes():
+        pass
+    read()
+
+    assert errors == []
+    written = PurchaseOrderChange.objects.filter(id__gt=first_id)
+    assert len(seen) == written.count() == WORKERS * 50 * 2
+    assert [seq for seq, _ in seen] == list(range(since + 1, since + len(seen) + 1))
+    assert {entry_id for _, entry_id in seen} == set(
+        written.values_list("id", flat=True)
+    )
@@ -0,0 +1,200 @@
+import os
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Vendor_Management_System.settings")
+django.setup()
+
+import datetime
+
+import pytest
+from django.db import connection, transaction
+from vendor_api.models import (
+    HistoricalPerformance,
+    HistoricalPerformanceRollup,
+    PurchaseOrder,
+    PurchaseOrderItem,
+)
+
+VENDOR_ID = 1
+
+
+def hot_queries():
+    """
+    The per-vendor queries behind the performance metrics and the order
+    summary, with the index each one is expected to use.
+    """
+    completed = PurchaseOrder.objects.filter(vendor=VENDOR_ID, status="completed")
+    return [
+        (
+            PurchaseOrder.objects.filter(vendor=VENDOR_ID),
+            "po_vendor_order_date_idx",
+        ),
+        (completed, "po_vendor_status_ontime_idx"),
+        (completed.filter(on_time=True), "po_vendor_status_ontime_idx"),
+        (
+            completed.filter(quality_rating__isnull=False).values("quality_rating"),
+            "po_vendor_rated_idx",
+        ),
+        (
+            PurchaseOrder.objects.filter(
+                vendor=VENDOR_ID, acknowledgment_date__isnull=False
+            ).values("acknowledgment_date", "issue_date"),
+            "po_vendor_acknowledged_idx",
+        ),
+        # The latest order and acknowledgment dates, looked up again when a
+        # vendor's latest order goes (see metrics.get_latest_expression).
+        (
+            PurchaseOrder.objects.filter(vendor=VENDOR_ID)
+            .order_by("-order_date")
+            .values("order_date")[:1],
+            "po_vendor_order_date_idx",
+        ),
+        (
+            PurchaseOrder.objects.filter(
+                vendor=VENDOR_ID, acknowledgment_date__isnull=False
+            )
+            .order_by("-acknowledgment_date")
+            .values("acknowledgment_date")[:1],
+            "po_vendor_acknowledged_idx",
+        ),
+        # The per-vendor history reads, served by the index of the unique
+        # (vendor, date) constraint.
+        (
+            HistoricalPerformance.objects.filter(vendor=VENDOR_ID),
+            "hp_vendor_date_unique",
+        ),
+        (
+            HistoricalPerformanceRollup.objects.filter(
+                vendor=VENDOR_ID, resolution="daily"
+            ),
+            "hpr_vendor_bucket_unique",
+        ),
+        # The rollups' watermark, and the snapshots of every vendor rolled up
+        # together (see history.rollup_history).
+        (
+            HistoricalPerformanceRollup.objects.filter(resolution="daily")
+            .order_by("-date")
+            .values("date")[:1],
+            "hpr_resolution_date_idx",
+        ),
+        (
+            HistoricalPerformance.objects.filter(
+                date__gte=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+            ),
+            "hp_date_idx",
+        ),
+        # The ?sku= and ?item_name= purchase order filters.
+        (
+            PurchaseOrderItem.objects.filter(sku="SKU-1").values("purchase_order_id"),
+            "poi_sku_idx",
+        ),
+        (
+            PurchaseOrderItem.objects.filter(name="Bolt").values("purchase_order_id"),
+            "poi_name_idx",
+        ),
+    ]
+
+
+def explain(queryset):
+    """
+    Returns the query plan of a queryset. On PostgreSQL sequential scans are
+    disabled for the duration, so that tiny test tables still show whether an
+    index is usable at all.
+    """
+    if connection.vendor != "postgresql":
+        return queryset.explain()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+def get_sqlite_index_name(table, name):
+    """
+    Returns: The name of a SQLite index, or of the index enforcing the unique
+             constraint of that name. SQLite names the index of a constraint
+             declared in CREATE TABLE itself (sqlite_autoindex_<table>_<n>).
+    """
+    with connection.cursor() as cursor:
+        constraint = connection.introspection.get_constraints(cursor, table).get(name)
+        if constraint is None or constraint["index"]:
+            return name
+        cursor.execute(f'PRAGMA index_list("{table}")')
+        for _, index, unique, origin, _ in cursor.fetchall():
+            cursor.execute(f'PRAGMA index_info("{index}")')
+            columns = [column for _, _, column in cursor.fetchall()]
+            if unique and origin == "u" and columns == constraint["columns"]:
+                return index
+    raise AssertionError(f"No index enforces {name} on {table}.")
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite query plans")
+@pytest.mark.parametrize("queryset, index", hot_queries())
+def test_hot_queries_use_index_on_sqlite(queryset, index):
+    index = get_sqlite_index_name(queryset.model._meta.db_table, index)
+    plan = explain(queryset)
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan
+    assert "SCAN" not in plan
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="PostgreSQL is not available"
+)
+@pytest.mark.parametrize("queryset, index", hot_queries())
+def test_hot_queries_use_index_on_postgresql(queryset, index):
+    plan = explain(queryset)
+    assert "Index" in plan and index in plan
+    assert "Seq Scan" not in plan
+
+
+def list_queries():
+    """
+    The purchase order list filters (see vendor_api.filters), with the index
+    each one is expected to use. Pages are read in (order_date, id) order,
+    which the index should deliver without a sort.
+    """
+    page = ("order_date", "id")
+    since = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    return [
+        (PurchaseOrder.objects.order_by(*page)[:101], "po_order_date_idx"),
+        (
+            PurchaseOrder.objects.filter(order_date__gte=since).order_by(*page)[:101],
+            "po_order_date_idx",
+        ),
+        (
+            PurchaseOrder.objects.filter(status="pending").order_by(*page)[:101],
+            "po_status_order_date_idx",
+        ),
+        (
+            PurchaseOrder.objects.filter(acknowledgment_date__isnull=True).order_by(
+                *page
+            )[:101],
+            "po_unacknowledged_idx",
+        ),
+        (
+            PurchaseOrder.objects.filter(delivery_date__gte=since).values("id"),
+            "po_delivery_date_idx",
+        ),
+        (
+            PurchaseOrder.objects.filter(quality_rating__gte=4).values("id"),
+            "po_rating_idx",
+        ),
+    ]
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite query plans")
+@pytest.mark.parametrize("queryset, index", list_queries())
+def test_list_filters_use_index_on_sqlite(queryset, index):
+    plan = explain(queryset)
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="PostgreSQL is not available"
+)
+@pytest.mark.parametrize("queryset, index", list_queries())
+def test_list_filters_use_index_on_postgresql(queryset, index):
+    plan = explain(queryset)
+    assert index in plan
+    assert "Seq Scan" not in plan and "Sort" not in plan
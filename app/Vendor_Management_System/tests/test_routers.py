@@ -0,0 +1,127 @@
+import os
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Vendor_Management_System.settings")
+django.setup()
+
+import sqlite3
+
+import pytest
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from vendor_api.models import PurchaseOrder, Vendor
+from vendor_api.routers import STICKY_COOKIE
+
+
+@pytest.fixture(scope="function")
+def replica_db(tmp_path):
+    """
+    Adds a "replica" database: a second SQLite file holding a copy of the
+    primary, taken by calling the fixture's value. It lags behind the primary
+    until the next copy.
+    """
+    path = tmp_path / "replica.sqlite3"
+
+    def sync():
+        connections[settings.REPLICA_DATABASE].close()
+        connection.ensure_connection()
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+
+    settings.DATABASES[settings.REPLICA_DATABASE] = {
+        **connections.settings["default"],
+        "NAME": str(path),
+    }
+    yield sync
+    connections[settings.REPLICA_DATABASE].close()
+    del connections[settings.REPLICA_DATABASE]
+    del settings.DATABASES[settings.REPLICA_DATABASE]
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite replica files")
+@pytest.mark.usefixtures("clean_db")
+def test_reads_go_to_replica_until_the_client_writes(replica_db):
+    """
+    Tests that endpoint reads are served by the replica, writes go to the
+    primary, and a client that wrote reads its writes from the primary.
+    """
+    user, _ = User.objects.get_or_create(username="replica_user")
+    vendor = Vendor.objects.create(
+        name="Test Vendor",
+        contact_details="123-456-7890",
+        address="123 Main St",
+        vendor_code="ABC123",
+    )
+    replica_db()
+    Vendor.objects.filter(pk=vendor.pk).update(name="Renamed Vendor")
+
+    token = RefreshToken.for_user(user).access_token
+    writer, reader = APIClient(), APIClient()
+    for client in (writer, reader):
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    vendor_list_url = reverse("vendor-create-list")
+    assert reader.get(vendor_list_url).data["results"][0]["name"] == "Test Vendor"
+    response = reader.get("/api/async/vendors/")
+    assert [row["name"] for row in response.json()["results"]] == ["Test Vendor"]
+
+    list_url = reverse("purchase-order-create-list")
+    response = writer.post(
+        list_url,
+        {
+            "po_number": "PO1",
+            "vendor": vendor.pk,
+            "items": [{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+            "quantity": 1,
+        },
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.cookies[STICKY_COOKIE]["max-age"] == settings.REPLICA_STICKY_SECONDS
+    assert PurchaseOrder.objects.using(settings.REPLICA_DATABASE).count() == 0
+
+    # The writer sees its order at once; other clients once the replica has it.
+    assert [row["po_number"] for row in writer.get(list_url).data["results"]] == ["PO1"]
+    assert reader.get(list_url).data["results"] == []
+    replica_db()
+    assert [row["po_number"] for row in reader.get(list_url).data["results"]] == ["PO1"]
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite replica files")
+@pytest.mark.usefixtures("clean_db")
+def test_conditional_vendor_responses_are_read_from_primary(replica_db):
+    """
+    Tests that a GET of the vendor detail right after a write, by a client
+    without the sticky cookie, reads the primary: the lagging replica row is
+    neither served nor given validators.
+    """
+    user, _ = User.objects.get_or_create(username="replica_user")
+    vendor = Vendor.objects.create(
+        name="Test Vendor",
+        contact_details="123-456-7890",
+        address="123 Main St",
+        vendor_code="ABC123",
+    )
+    replica_db()
+
+    token = RefreshToken.for_user(user).access_token
+    writer, reader = APIClient(), APIClient()
+    for client in (writer, reader):
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    detail_url = reverse("vendor-read-update-delete", kwargs={"pk": vendor.pk})
+    assert reader.get(detail_url).data["name"] == "Test Vendor"
+
+    response = writer.patch(detail_url, {"name": "Renamed Vendor"}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert Vendor.objects.using(settings.REPLICA_DATABASE).get().name == "Test Vendor"
+
+    response = reader.get(detail_url)
+    assert response.data["name"] == "Renamed Vendor"
+    response = reader.get(detail_url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
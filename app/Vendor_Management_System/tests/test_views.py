@@ -39,8 +39,12 @@ if __name__ == "__main__":
 @pytest.fixture(scope="function")
 def jwt_token():
     """
-    Retrieves the test user and generates a JWT token.
+    Retrieves the test user and generates a JWT token. The user starts out
+    uncached by the authentication, so every test sees its lookup query.
     """
+    from vendor_api.authentication import user_cache
+
+    user_cache.clear()
     user = User.objects.get(username="test_user")
     from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -295,7 +299,7 @@ def test_list_all_purchase_orders(jwt_token, create_vendors):
     response = jwt_token.get(url)
 
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == 2
+    assert len(response.data["results"]) == 2
 
 
 @pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
@@ -332,11 +336,96 @@ def test_list_purchase_orders_by_vendor(jwt_token, create_vendor):
     response = jwt_token.get(url, {"vendor": vendor_id})
 
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == 1
-    for purchase_order in response.data:
+    assert len(response.data["results"]) == 1
+    for purchase_order in response.data["results"]:
         assert purchase_order["vendor"] == vendor_id
 
 
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_paginate_purchase_orders_with_cursor(jwt_token, create_vendor):
+    """
+    Tests walking the purchase order list forwards and backwards by cursor,
+    with rows sharing an order date and a row inserted mid-walk.
+    """
+    order_date = timezone.now() - timezone.timedelta(days=1)
+    for i in range(5):
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=create_vendor,
+            order_date=order_date + timezone.timedelta(hours=i // 2),
+            items=[],
+            quantity=1,
+        )
+
+    url = reverse("purchase-order-create-list")
+    first = jwt_token.get(url, {"page_size": 2})
+    assert first.data["previous"] is None
+    assert [po["po_number"] for po in first.data["results"]] == ["PO0", "PO1"]
+
+    PurchaseOrder.objects.create(
+        po_number="PO-LATE", vendor_id=create_vendor, items=[], quantity=1
+    )
+    second = jwt_token.get(first.data["next"])
+    assert [po["po_number"] for po in second.data["results"]] == ["PO2", "PO3"]
+
+    third = jwt_token.get(second.data["next"])
+    assert [po["po_number"] for po in third.data["results"]] == ["PO4", "PO-LATE"]
+    assert third.data["next"] is None
+
+    back = jwt_token.get(third.data["previous"])
+    assert [po["po_number"] for po in back.data["results"]] == ["PO2", "PO3"]
+
+    descending = jwt_token.get(url, {"page_size": 2, "ordering": "-order_date"})
+    assert [po["po_number"] for po in descending.data["results"]] == [
+        "PO-LATE",
+        "PO4",
+    ]
+    assert jwt_token.get(url, {"cursor": "not-a-cursor"}).status_code == 404
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendors")
+def test_export_purchase_orders(jwt_token, create_vendors):
+    """
+    Tests streaming filtered purchase orders as NDJSON and CSV.
+    """
+    import json
+
+    vendor_id1, vendor_id2 = create_vendors
+    for po_number, vendor_id, order_date in [
+        ("PO1", vendor_id1, "2024-05-01T12:00:00Z"),
+        ("PO2", vendor_id1, "2024-06-01T12:00:00Z"),
+        ("PO3", vendor_id2, "2024-05-02T12:00:00Z"),
+    ]:
+        PurchaseOrder.objects.create(
+            po_number=po_number,
+            vendor_id=vendor_id,
+            order_date=order_date,
+            items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+            quantity=1,
+        )
+
+    url = reverse("purchase-order-export")
+    response = jwt_token.get(
+        url, {"vendor": vendor_id1, "order_date_before": "2024-05-15"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    rows = [
+        json.loads(line)
+        for line in b"".join(response.streaming_content).decode().splitlines()
+    ]
+    assert [row["po_number"] for row in rows] == ["PO1"]
+    assert rows[0]["items"][0]["name"] == "Item 1"
+
+    response = jwt_token.get(url, {"output": "csv"})
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert response["Content-Type"] == "text/csv"
+    assert lines[0].startswith("id,po_number,vendor_id")
+    assert len(lines) == 4
+
+    assert jwt_token.get(url, {"status": "lost"}).status_code == 400
+
+
 @pytest.mark.usefixtures("clean_db", "jwt_token", "create_purchase_order")
 def test_retrieve_purchase_order(jwt_token, create_purchase_order):
     """
@@ -470,6 +559,75 @@ def test_retrieve_vendor_performance(jwt_token, create_purchase_order):
         assert key in response.data
 
 
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_purchase_order")
+def test_vendor_performance_conditional_get(jwt_token, create_purchase_order):
+    """
+    Tests that performance reads carry an ETag that holds until a purchase
+    order of the vendor changes, each read costing one query.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    purchase_order = PurchaseOrder.objects.get(id=create_purchase_order)
+    url = reverse(
+        "vendor-performance-retrieve", kwargs={"vendor_id": purchase_order.vendor_id}
+    )
+
+    response = jwt_token.get(url)
+    etag = response["ETag"]
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Last-Modified"]
+
+    # The authenticated user is cached by now.
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_token.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert len(queries) == 1
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_token.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(queries) == 1
+
+    purchase_order.status = "completed"
+    purchase_order.save()
+
+    response = jwt_token.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+    assert response.data["fulfillment_rate"] == 100.0
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_vendor_validators_come_from_the_database(jwt_token, create_vendor):
+    """
+    Tests that a vendor's ETag comes from its row, so that it changes with
+    any write to the row, even one made outside the API, and that sparse
+    fieldsets get their own.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    url = reverse("vendor-read-update-delete", kwargs={"pk": create_vendor})
+    response = jwt_token.get(url)
+    etag = response["ETag"]
+
+    response = jwt_token.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_token.get(url, {"fields": "name"}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(queries) == 1
+    assert response.data == {"name": "Test Vendor"}
+
+    Vendor.objects.filter(pk=create_vendor).update(
+        name="Renamed Vendor", updated_at=timezone.now()
+    )
+    response = jwt_token.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+    assert response.data["name"] == "Renamed Vendor"
+
+
 @pytest.mark.usefixtures("clean_db", "jwt_token")
 def test_acknowledge_purchase_order(jwt_token, create_purchase_order):
     """
@@ -491,3 +649,1351 @@ def test_acknowledge_purchase_order(jwt_token, create_purchase_order):
 
     vendor = purchase_order.vendor
     assert vendor.average_response_time is not None
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token")
+def test_acknowledge_purchase_order_takes_no_body(jwt_token, create_purchase_order):
+    """
+    Tests that acknowledging rejects a request body instead of silently
+    ignoring it, and that a PUT without a body acknowledges the order.
+    """
+    url = reverse("purchase-order-acknowledge", kwargs={"po_id": create_purchase_order})
+    response = jwt_token.patch(url, {"status": "completed"}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    purchase_order = PurchaseOrder.objects.get(id=create_purchase_order)
+    assert purchase_order.status == "pending"
+    assert purchase_order.acknowledgment_date is None
+
+    response = jwt_token.put(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    purchase_order.refresh_from_db()
+    assert purchase_order.status == "pending"
+    assert purchase_order.acknowledgment_date is not None
+    assert response.data["id"] == purchase_order.id
+    assert response.data["acknowledgment_date"] is not None
+    assert response.data["delivery_date"] is not None
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token")
+def test_acknowledge_purchase_order_queries(jwt_token, create_purchase_order):
+    """
+    Tests the exact queries issued by acknowledging a purchase order, and the
+    vendor's average response time it maintains.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    purchase_order = PurchaseOrder.objects.get(id=create_purchase_order)
+    purchase_order.issue_date = timezone.now() - timezone.timedelta(days=2)
+    purchase_order.save()
+
+    url = reverse("purchase-order-acknowledge", kwargs={"po_id": purchase_order.id})
+    with CaptureQueriesContext(connection) as queries:
+        response = jwt_token.patch(url)
+    assert response.status_code == status.HTTP_200_OK
+
+    statements = [query["sql"].split(" ", 2)[:2] for query in queries]
+    assert statements == [
+        ["SELECT", '"auth_user"."id",'],  # Authentication.
+        ["SELECT", '"vendor_api_purchaseorder"."id",'],  # The purchase order.
+        ["BEGIN"],
+        ["SELECT", '"vendor_api_purchaseorder"."vendor_id",'],  # Locked re-read.
+        ["UPDATE", '"vendor_api_purchaseorder"'],  # Both dates, one statement.
+        ["UPDATE", '"vendor_api_vendormetriccounters"'],  # Response time delta.
+        ["INSERT", "INTO"],  # Change log entry.
+        ["COMMIT"],
+        ["BEGIN"],  # Refreshed rates, after commit.
+        ["SELECT", '"vendor_api_vendormetriccounters"."vendor_id",'],
+        ["UPDATE", '"vendor_api_vendor"'],
+        ["COMMIT"],
+    ]
+    assert '"acknowledgment_date" = ' in queries[4]["sql"]
+    assert '"items"' not in queries[4]["sql"]
+
+    vendor = Vendor.objects.get(id=purchase_order.vendor_id)
+    assert vendor.average_response_time == 2.0
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_vendor_metrics_follow_purchase_order_writes(create_vendor):
+    """
+    Tests that the incrementally maintained metrics match a full recount.
+    """
+    vendor = Vendor.objects.get(id=create_vendor)
+    now = timezone.now()
+    orders = [
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor=vendor,
+            delivery_date=now + timezone.timedelta(days=i - 2),
+            items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+            quantity=1,
+        )
+        for i in range(5)
+    ]
+    for rating, order in zip([4.0, 3.0, None], orders[1:4]):
+        order.status = "completed"
+        order.quality_rating = rating
+        order.save()
+    orders[4].delete()
+
+    vendor.refresh_from_db()
+    assert vendor.fulfillment_rate == float(vendor.calculate_fulfillment_rate())
+    assert vendor.quality_rating_avg == float(vendor.calculate_quality_rating_average())
+    assert vendor.on_time_delivery_rate == float(
+        vendor.calculate_on_time_delivery_rate()
+    )
+    assert vendor.fulfillment_rate == 75.0
+    assert vendor.quality_rating_avg == 3.5
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_purchase_order_completion_with_string_dates(create_vendor):
+    """
+    Tests that orders created and saved with ISO datetime strings are
+    completed like orders given datetimes.
+    """
+    late = PurchaseOrder.objects.create(
+        po_number="PO-LATE",
+        vendor_id=create_vendor,
+        delivery_date="2024-05-10T08:00:00Z",
+        items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+        quantity=1,
+        status="completed",
+    )
+    assert late.on_time is False
+
+    on_time = PurchaseOrder.objects.create(
+        po_number="PO-ON-TIME",
+        vendor_id=create_vendor,
+        delivery_date="2024-05-10T08:00:00Z",
+        items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+        quantity=1,
+    )
+    on_time.status = "completed"
+    on_time.completed_at = "2024-05-10T17:00:00"
+    on_time.save()
+    on_time.refresh_from_db()
+    assert on_time.on_time is True
+    assert on_time.completed_at == datetime.datetime(
+        2024, 5, 10, 17, tzinfo=datetime.timezone.utc
+    )
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_vendor_response_time_with_string_dates(create_vendor):
+    """
+    Tests that orders acknowledged with ISO datetime strings count towards
+    the vendor's average response time.
+    """
+    for po_number, issue_date, acknowledgment_date in [
+        ("PO1", "2024-05-01T12:00:00Z", "2024-05-03T12:00:00Z"),
+        ("PO2", "2024-05-02T12:00:00", "2024-05-06T12:00:00"),
+    ]:
+        PurchaseOrder.objects.create(
+            po_number=po_number,
+            vendor_id=create_vendor,
+            items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+            quantity=1,
+            issue_date=issue_date,
+            acknowledgment_date=acknowledgment_date,
+        )
+    vendor = Vendor.objects.get(id=create_vendor)
+    assert vendor.average_response_time == 3.0
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_vendor_latest_dates_with_string_dates(create_vendor):
+    """
+    Tests that the vendor's latest order and acknowledgment dates follow
+    orders given ISO datetime strings.
+    """
+    from vendor_api.models import VendorMetricCounters
+
+    def latest_dates():
+        counters = VendorMetricCounters.objects.get(vendor_id=create_vendor)
+        return counters.last_order_date, counters.last_acknowledgment_date
+
+    def may(day, hour=0):
+        return datetime.datetime(2024, 5, day, hour, tzinfo=datetime.timezone.utc)
+
+    PurchaseOrder.objects.create(
+        po_number="PO1",
+        vendor_id=create_vendor,
+        items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+        quantity=1,
+        order_date=may(10, 12),
+    )
+    order = PurchaseOrder.objects.create(
+        po_number="PO2",
+        vendor_id=create_vendor,
+        items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+        quantity=1,
+        order_date="2024-05-10T08:00:00Z",
+        issue_date="2024-05-09T12:00:00Z",
+    )
+    assert latest_dates() == (may(10, 12), None)
+
+    order.order_date = "2024-05-11T12:00:00Z"
+    order.acknowledgment_date = "2024-05-12T12:00:00Z"
+    order.save()
+    assert latest_dates() == (may(11, 12), may(12, 12))
+    vendor = Vendor.objects.get(id=create_vendor)
+    assert vendor.average_response_time == 3.0
+
+    order.order_date = "2024-05-08T12:00:00Z"
+    order.save()
+    assert latest_dates() == (may(10, 12), may(12, 12))
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_purchase_order_save_does_not_scan_vendor_history(create_vendor):
+    """
+    Tests that saving a purchase order costs the same number of queries
+    whatever the size of the vendor's order history.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def queries_for_completing(po_number):
+        order = PurchaseOrder.objects.create(
+            po_number=po_number,
+            vendor_id=create_vendor,
+            items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+            quantity=1,
+        )
+        order.status = "completed"
+        with CaptureQueriesContext(connection) as queries:
+            order.save()
+        return len(queries)
+
+    first = queries_for_completing("PO-FIRST")
+    for i in range(20):
+        queries_for_completing(f"PO{i}")
+    assert queries_for_completing("PO-LAST") == first
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_purchase_order")
+def test_bulk_upsert_purchase_orders(jwt_token, create_purchase_order):
+    """
+    Tests creating and updating purchase orders in bulk with per-row errors.
+    """
+    existing = PurchaseOrder.objects.get(id=create_purchase_order)
+    rows = [
+        {
+            "po_number": existing.po_number,
+            "vendor": existing.vendor_id,
+            "items": existing.items,
+            "quantity": existing.quantity,
+            "status": "completed",
+            "quality_rating": 4.0,
+        },
+        {
+            "po_number": "PO-NEW",
+            "vendor": existing.vendor_id,
+            "items": [{"name": "Item 1", "quantity": 2, "unit_price": 10.99}],
+            "quantity": 2,
+        },
+        {"po_number": "PO-BAD", "vendor": existing.vendor_id, "quantity": 0},
+        {
+            "po_number": "PO-NO-VENDOR",
+            "vendor": 99999,
+            "items": [],
+            "quantity": 1,
+        },
+    ]
+
+    url = reverse("purchase-order-bulk-upsert")
+    response = jwt_token.post(url, rows, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["created"] == 1
+    assert response.data["updated"] == 1
+    assert [error["index"] for error in response.data["errors"]] == [2, 3]
+    assert PurchaseOrder.objects.count() == 2
+
+    vendor = Vendor.objects.get(id=existing.vendor_id)
+    assert vendor.fulfillment_rate == 50.0
+    assert vendor.quality_rating_avg == 4.0
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_bulk_upsert_without_returned_ids(monkeypatch, jwt_token, create_vendor):
+    """
+    Tests that bulk created orders get their ids on backends whose bulk
+    inserts cannot return them.
+    """
+    from django.db import connection
+
+    from vendor_api.models import PurchaseOrderChange, PurchaseOrderItem
+
+    monkeypatch.setattr(
+        type(connection.features), "can_return_rows_from_bulk_insert", False
+    )
+    rows = [
+        {
+            "po_number": f"PO-{number}",
+            "vendor": create_vendor,
+            "items": [{"name": "Item 1", "quantity": 2, "unit_price": 10.99}],
+            "quantity": 2,
+        }
+        for number in range(3)
+    ]
+
+    url = reverse("purchase-order-bulk-upsert")
+    response = jwt_token.post(url, rows, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["created"] == 3
+    orders = dict(PurchaseOrder.objects.values_list("id", "po_number"))
+    changes = PurchaseOrderChange.objects.filter(
+        action="created", purchase_order__in=orders
+    )
+    assert dict(changes.values_list("purchase_order", "po_number")) == orders
+    items = PurchaseOrderItem.objects.values_list("purchase_order_id", flat=True)
+    assert sorted(items) == sorted(orders)
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_vendor_performance_history_downsampling(jwt_token, create_vendor):
+    """
+    Tests reading a vendor's performance history at daily resolution.
+    """
+    from vendor_api.models import HistoricalPerformance
+
+    start = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    HistoricalPerformance.objects.bulk_create(
+        HistoricalPerformance(
+            vendor_id=create_vendor,
+            date=start + datetime.timedelta(hours=hour),
+            on_time_delivery_rate=hour // 24 * 10.0,
+            quality_rating_avg=4.0,
+            average_response_time=1.0,
+            fulfillment_rate=hour % 2 * 100.0,
+        )
+        for hour in range(72)
+    )
+
+    url = reverse("vendor-performance-history", kwargs={"vendor_id": create_vendor})
+    response = jwt_token.get(
+        url, {"resolution": "daily", "date_after": "2024-05-02T00:00:00Z"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    results = response.data["results"]
+    assert [point["date"] for point in results] == [
+        start + datetime.timedelta(days=1),
+        start + datetime.timedelta(days=2),
+    ]
+    assert [point["on_time_delivery_rate"] for point in results] == [10.0, 20.0]
+    assert results[0]["fulfillment_rate"] == 50.0
+
+    raw = jwt_token.get(url, {"resolution": "raw"})
+    assert len(raw.data["results"]) == 72
+    assert raw.data["truncated"] is False and raw.data["next"] is None
+    assert jwt_token.get(url, {"resolution": "monthly"}).status_code == 400
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_vendor_performance_history_reads_rollups(jwt_token, create_vendor):
+    """
+    Tests that history reads take the closed buckets wholly inside their
+    range from the rollups, and aggregate the snapshots of the others.
+    """
+    from vendor_api.history import rollup_history
+    from vendor_api.models import HistoricalPerformance, HistoricalPerformanceRollup
+
+    start = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    HistoricalPerformance.objects.bulk_create(
+        HistoricalPerformance(
+            vendor_id=create_vendor,
+            date=start + datetime.timedelta(hours=hour),
+            on_time_delivery_rate=hour // 24 * 10.0,
+            quality_rating_avg=4.0,
+            average_response_time=1.0,
+            fulfillment_rate=hour % 2 * 100.0,
+        )
+        for hour in range(96)
+    )
+    # Days 1 to 3 are rolled up; day 4 is still open.
+    assert rollup_history("daily", until=start + datetime.timedelta(days=3, hours=12))
+    rollups = HistoricalPerformanceRollup.objects.filter(resolution="daily")
+    assert list(rollups.order_by("date").values_list("samples", flat=True)) == [24] * 3
+    # Marks the rollups, to tell which points were read from them.
+    rollups.update(quality_rating_avg=5.0)
+
+    url = reverse("vendor-performance-history", kwargs={"vendor_id": create_vendor})
+    response = jwt_token.get(url, {"resolution": "daily"})
+    assert [point["quality_rating_avg"] for point in response.data["results"]] == [
+        5.0,
+        5.0,
+        5.0,
+        4.0,
+    ]
+    assert [point["on_time_delivery_rate"] for point in response.data["results"]] == [
+        0.0,
+        10.0,
+        20.0,
+        30.0,
+    ]
+
+    # The first day is only partly in the range, the last one not rolled up.
+    response = jwt_token.get(
+        url, {"resolution": "daily", "date_after": "2024-05-01T12:00:00Z"}
+    )
+    assert [point["quality_rating_avg"] for point in response.data["results"]] == [
+        4.0,
+        5.0,
+        5.0,
+        4.0,
+    ]
+    response = jwt_token.get(
+        url, {"resolution": "daily", "date_before": "2024-05-02T12:00:00Z"}
+    )
+    assert [point["quality_rating_avg"] for point in response.data["results"]] == [
+        5.0,
+        4.0,
+    ]
+    assert response.data["results"][1]["date"] == start + datetime.timedelta(days=1)
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_vendor_performance_history_truncation(monkeypatch, jwt_token, create_vendor):
+    """
+    Tests that a truncated raw history says so and links to the rest.
+    """
+    from vendor_api import history
+    from vendor_api.models import HistoricalPerformance
+
+    monkeypatch.setattr(history, "RAW_LIMIT", 50)
+    start = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    HistoricalPerformance.objects.bulk_create(
+        HistoricalPerformance(
+            vendor_id=create_vendor,
+            date=start + datetime.timedelta(minutes=minute),
+            on_time_delivery_rate=100.0,
+            quality_rating_avg=4.0,
+            average_response_time=1.0,
+            fulfillment_rate=100.0,
+        )
+        for minute in range(72)
+    )
+
+    url = reverse("vendor-performance-history", kwargs={"vendor_id": create_vendor})
+    response = jwt_token.get(url, {"resolution": "raw"})
+    assert response.data["truncated"] is True
+    assert len(response.data["results"]) == 50
+
+    response = jwt_token.get(response.data["next"])
+    assert response.data["truncated"] is False
+    assert response.data["next"] is None
+    assert [point["date"] for point in response.data["results"]] == [
+        start + datetime.timedelta(minutes=minute) for minute in range(50, 72)
+    ]
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendors")
+def test_vendor_performance_leaderboard(jwt_token, create_vendors):
+    """
+    Tests ranking vendors by a metric, and that the cached ranking follows
+    purchase order writes.
+    """
+    vendor_id1, vendor_id2 = create_vendors
+    order = PurchaseOrder.objects.create(
+        po_number="PO1", vendor_id=vendor_id1, items=[], quantity=1
+    )
+    PurchaseOrder.objects.create(
+        po_number="PO2", vendor_id=vendor_id2, items=[], quantity=1
+    )
+
+    url = reverse("vendor-performance-leaderboard")
+    params = {"ordering": "-fulfillment_rate", "top": 1}
+    response = jwt_token.get(url, params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 1
+
+    order.status = "completed"
+    order.save()
+    response = jwt_token.get(url, params)
+    leader = response.data["results"][0]
+    assert leader["vendor_id"] == vendor_id1
+    assert leader["fulfillment_rate"] == 100.0
+    assert leader["percentile_rank"] == 100.0
+
+    response = jwt_token.get(url, {"vendor": f"{vendor_id2}"})
+    assert [row["vendor_id"] for row in response.data["results"]] == [vendor_id2]
+    assert jwt_token.get(url, {"ordering": "name"}).status_code == 400
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_vendor_metrics_refresh_once_per_transaction(create_vendor):
+    """
+    Tests that many purchase order writes in one transaction refresh the
+    vendor's rates once, after commit.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        with transaction.atomic():
+            for i in range(20):
+                PurchaseOrder.objects.create(
+                    po_number=f"PO{i}",
+                    vendor_id=create_vendor,
+                    items=[],
+                    quantity=1,
+                    status="completed" if i % 2 else "pending",
+                )
+            assert Vendor.objects.get(id=create_vendor).fulfillment_rate == 0.0
+
+    vendor_updates = [
+        query
+        for query in queries
+        if query["sql"].startswith('UPDATE "vendor_api_vendor"')
+    ]
+    assert len(vendor_updates) == 1
+    assert Vendor.objects.get(id=create_vendor).fulfillment_rate == 50.0
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_vendor_metrics_background_refresh(create_vendor, settings):
+    """
+    Tests refreshing vendor rates on the background worker.
+    """
+    from vendor_api.metrics import background_refresher
+
+    settings.VENDOR_METRICS_REFRESH_MODE = "background"
+    for i in range(10):
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=create_vendor,
+            items=[],
+            quantity=1,
+            status="completed",
+        )
+
+    assert background_refresher.wait_until_idle(timeout=5)
+    assert Vendor.objects.get(id=create_vendor).fulfillment_rate == 100.0
+
+
+@pytest.mark.usefixtures("clean_db", "create_purchase_order")
+def test_async_read_endpoints_match_sync(create_purchase_order):
+    """
+    Tests that the async read endpoints return the same data as the sync ones.
+    """
+    import asyncio
+    from django.test import AsyncClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    user = User.objects.get(username="test_user")
+    token = RefreshToken.for_user(user).access_token
+    headers = {"Authorization": f"Bearer {token}"}
+    sync_client = APIClient()
+    sync_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    vendor_id = PurchaseOrder.objects.get(id=create_purchase_order).vendor_id
+
+    paths = [
+        "vendors/",
+        f"vendors/{vendor_id}/",
+        f"vendors/{vendor_id}/performance/",
+        "purchase_orders/?page_size=10",
+        "purchase_orders/?fields=po_number,status",
+        f"purchase_orders/{create_purchase_order}/",
+        f"purchase_orders/{create_purchase_order}/?exclude=items",
+    ]
+
+    async def fetch_all():
+        client = AsyncClient()
+        return [
+            await client.get(f"/api/async/{path}", headers=headers) for path in paths
+        ]
+
+    for path, response in zip(paths, asyncio.run(fetch_all())):
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == sync_client.get(f"/api/{path}").json()
+
+    async def fetch_unauthenticated():
+        return await AsyncClient().get("/api/async/vendors/")
+
+    assert asyncio.run(fetch_unauthenticated()).status_code == 401
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendors")
+def test_async_list_ordering_matches_sync(jwt_token, create_vendors):
+    """
+    Tests that the async purchase order list honours ?ordering= like the sync
+    one, page after page, and that the async views only accept GET.
+    """
+    now = timezone.now()
+    for i in range(5):
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=create_vendors[i % 2],
+            order_date=now - timezone.timedelta(days=i * (-1) ** i),
+            items=[],
+            quantity=1,
+        )
+
+    sync_url = "/api/purchase_orders/?ordering=-order_date&page_size=2"
+    async_url = "/api/async/purchase_orders/?ordering=-order_date&page_size=2"
+    pages = 0
+    while sync_url:
+        expected = jwt_token.get(sync_url).json()
+        data = jwt_token.get(async_url).json()
+        assert data["results"] == expected["results"]
+        assert (data["next"] or "").replace("/api/async/", "/api/") == (
+            expected["next"] or ""
+        )
+        sync_url, async_url = expected["next"], data["next"]
+        pages += 1
+    assert pages == 3
+    first = jwt_token.get(
+        "/api/async/purchase_orders/", {"ordering": "-order_date"}
+    ).json()
+    order_dates = [row["order_date"] for row in first["results"]]
+    assert order_dates == sorted(order_dates, reverse=True)
+
+    response = jwt_token.post("/api/async/purchase_orders/", {}, format="json")
+    assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+    assert response["Allow"] == "GET, HEAD"
+    assert (
+        jwt_token.delete(f"/api/async/vendors/{create_vendors[0]}/").status_code
+        == status.HTTP_405_METHOD_NOT_ALLOWED
+    )
+    assert Vendor.objects.filter(id=create_vendors[0]).exists()
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_request_instrumentation(jwt_token, create_purchase_order, settings, caplog):
+    """
+    Tests the Server-Timing header, the per-endpoint metrics and the slow
+    request log of the instrumentation middleware.
+    """
+    import re
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from vendor_api.instrumentation import endpoint_metrics
+
+    endpoint_metrics.reset()
+    url = reverse(
+        "purchase-order-read-update-delete", kwargs={"po_id": create_purchase_order}
+    )
+    with CaptureQueriesContext(connection) as context:
+        response = jwt_token.get(url)
+    query_count = len(context.captured_queries)
+
+    timing = re.match(
+        r'db;dur=[\d.]+;desc="(\d+) queries", serializer;dur=([\d.]+), view;dur=[\d.]+$',
+        response["Server-Timing"],
+    )
+    assert timing is not None
+    assert int(timing.group(1)) == query_count
+    assert float(timing.group(2)) > 0
+
+    settings.SLOW_REQUEST_THRESHOLD_MS = 0
+    with caplog.at_level("WARNING", logger="vendor_api.instrumentation"):
+        jwt_token.get(url)
+    assert "Slow request: GET /api/purchase_orders/" in caplog.text
+    assert 'FROM "vendor_api_purchaseorder"' in caplog.text
+
+    metrics_url = reverse("metrics")
+    assert APIClient().get(metrics_url).status_code == status.HTTP_401_UNAUTHORIZED
+    assert jwt_token.get(metrics_url).status_code == status.HTTP_403_FORBIDDEN
+    staff, _ = User.objects.get_or_create(
+        username="staff_user", defaults={"is_staff": True}
+    )
+    staff_client = APIClient()
+    staff_client.force_authenticate(staff)
+    response = staff_client.get(metrics_url)
+    assert response.status_code == status.HTTP_200_OK
+    metrics = response.content.decode()
+    labels = '{method="GET",endpoint="/api/purchase_orders/<int:po_id>/"}'
+    assert f"vendor_api_requests_total{labels} 2" in metrics
+    assert f"vendor_api_slow_requests_total{labels} 1" in metrics
+    # The second request finds the user in the authentication's cache.
+    assert f"vendor_api_request_queries_total{labels} {2 * query_count - 1}" in metrics
+
+    settings.METRICS_ALLOWED_IPS = ["127.0.0.1"]
+    assert APIClient().get(metrics_url).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_purchase_order_completion_is_recorded(jwt_token, create_vendor):
+    """
+    Tests that completing an order stamps completed_at and a fixed on-time
+    flag, and that reopening it clears both.
+    """
+    now = timezone.now()
+    on_time = PurchaseOrder.objects.create(
+        po_number="PO-ON-TIME",
+        vendor_id=create_vendor,
+        delivery_date=now + timezone.timedelta(days=1),
+        items=[],
+        quantity=1,
+        status="completed",
+    )
+    late = PurchaseOrder.objects.create(
+        po_number="PO-LATE",
+        vendor_id=create_vendor,
+        delivery_date=now - timezone.timedelta(days=1),
+        items=[],
+        quantity=1,
+    )
+    url = reverse("purchase-order-read-update-delete", kwargs={"po_id": late.id})
+    response = jwt_token.patch(
+        url, {"status": "completed", "completed_at": "2020-01-01T00:00:00Z"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    on_time.refresh_from_db()
+    late.refresh_from_db()
+    assert on_time.on_time is True and on_time.completed_at >= now
+    assert late.on_time is False and late.completed_at >= now
+    vendor = Vendor.objects.get(id=create_vendor)
+    assert vendor.on_time_delivery_rate == 50.0
+    assert vendor.metric_counters.on_time_orders == 1
+
+    late.status = "pending"
+    late.save(update_fields=["status"])
+    late.refresh_from_db()
+    assert late.completed_at is None and late.on_time is None
+    vendor.refresh_from_db()
+    assert vendor.on_time_delivery_rate == 100.0
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_vendor_save_keeps_concurrently_refreshed_rates(jwt_token, create_vendor):
+    """
+    Tests that saving a vendor's details does not write back stale rates, and
+    that the rates cannot be set through the API.
+    """
+    stale_vendor = Vendor.objects.get(id=create_vendor)
+    PurchaseOrder.objects.create(
+        po_number="PO1",
+        vendor_id=create_vendor,
+        items=[],
+        quantity=1,
+        status="completed",
+    )
+    stale_vendor.name = "Renamed Vendor"
+    stale_vendor.save()
+
+    vendor = Vendor.objects.get(id=create_vendor)
+    assert vendor.name == "Renamed Vendor"
+    assert vendor.fulfillment_rate == 100.0
+
+    url = reverse("vendor-read-update-delete", kwargs={"pk": create_vendor})
+    response = jwt_token.patch(url, {"fulfillment_rate": 0.0}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["fulfillment_rate"] == 100.0
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendors")
+def test_bulk_status_transition(jwt_token, create_vendors):
+    """
+    Tests moving purchase orders of several vendors to a status at once, with
+    one UPDATE per group of equal changes and one refresh per vendor.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    orders = [
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=create_vendors[i % 2],
+            delivery_date=timezone.now() + timezone.timedelta(days=1),
+            items=[],
+            quantity=1,
+        )
+        for i in range(6)
+    ]
+    url = reverse("purchase-order-bulk-status")
+    request = {
+        "ids": [order.id for order in orders[:3]] + [999999],
+        "po_numbers": ["PO3", "PO4", "PO-MISSING"],
+        "status": "completed",
+        "quality_ratings": {"PO0": 5.0, str(orders[1].id): 3.0, "PO5": 1.0},
+    }
+    with CaptureQueriesContext(connection) as context:
+        response = jwt_token.post(url, request, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["updated"] == 5
+    assert [error["reference"] for error in response.data["errors"]] == [
+        999999,
+        "PO-MISSING",
+        "PO5",
+    ]
+    updates = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith('UPDATE "vendor_api_purchaseorder"')
+    ]
+    # Rated 5.0, rated 3.0 and unrated orders.
+    assert len(updates) == 3
+
+    completed = PurchaseOrder.objects.filter(status="completed")
+    assert completed.count() == 5
+    assert all(order.on_time and order.completed_at for order in completed)
+    assert PurchaseOrder.objects.get(po_number="PO1").quality_rating == 3.0
+    first, second = (
+        Vendor.objects.get(id=vendor_id) for vendor_id in create_vendors[:2]
+    )
+    assert first.fulfillment_rate == 100.0
+    assert first.quality_rating_avg == 5.0
+    assert second.fulfillment_rate == round(2 / 3 * 100, 2)
+    assert second.quality_rating_avg == 3.0
+
+    response = jwt_token.post(url, {"ids": [orders[0].id], "status": "completed"})
+    assert response.data["updated"] == 0 and response.data["unchanged"] == 1
+    response = jwt_token.post(url, {"status": "completed"}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendors")
+def test_sparse_fieldsets(jwt_token, create_vendors):
+    """
+    Tests that ?fields= and ?exclude= restrict both the response and the
+    columns fetched, without breaking cursor pagination.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for i in range(3):
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=create_vendors[0],
+            items=[{"name": "Item 1", "quantity": 1, "unit_price": 10.99}],
+            quantity=1,
+        )
+    url = reverse("purchase-order-create-list")
+    with CaptureQueriesContext(connection) as context:
+        response = jwt_token.get(url, {"fields": "po_number,status", "page_size": 2})
+    query_count = len(context.captured_queries)
+    select = context.captured_queries[-1]["sql"]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [sorted(row) for row in response.data["results"]] == [
+        ["po_number", "status"]
+    ] * 2
+    assert query_count == 2
+    assert '"items"' not in select and '"order_date"' in select
+    next_page = jwt_token.get(response.data["next"])
+    assert [row["po_number"] for row in next_page.data["results"]] == ["PO2"]
+
+    po_id = PurchaseOrder.objects.get(po_number="PO0").id
+    detail_url = reverse("purchase-order-read-update-delete", kwargs={"po_id": po_id})
+    response = jwt_token.get(detail_url, {"exclude": "items,vendor"})
+    assert "items" not in response.data and "vendor" not in response.data
+    assert response.data["po_number"] == "PO0"
+    response = jwt_token.get(detail_url, {"fields": "po_number,secret"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    vendor_url = reverse("vendor-read-update-delete", kwargs={"pk": create_vendors[0]})
+    assert sorted(jwt_token.get(vendor_url, {"fields": "name"}).data) == ["name"]
+    assert "vendor_code" in jwt_token.get(vendor_url).data
+
+
+@pytest.mark.usefixtures("clean_db", "create_purchase_order")
+def test_fast_list_serializer_matches_model_serializer(create_purchase_order):
+    """
+    Tests that the list fast path renders exactly what the serializer does.
+    """
+    from vendor_api.serializers import PurchaseOrderSerializer, VendorSerializer
+
+    order = PurchaseOrder.objects.get(id=create_purchase_order)
+    order.status = "completed"
+    order.quality_rating = 4.5
+    order.acknowledgment_date = timezone.now()
+    order.save()
+
+    for serializer_class, queryset in [
+        (PurchaseOrderSerializer, PurchaseOrder.objects.all()),
+        (VendorSerializer, Vendor.objects.all()),
+    ]:
+        fast = serializer_class(queryset, many=True).data
+        regular = [serializer_class(instance).data for instance in queryset]
+        assert fast == regular
+        assert fast[0] and type(fast[0]) is dict
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_purchase_order_item_filters(jwt_token, create_vendor):
+    """
+    Tests filtering purchase orders by SKU and item name through the item
+    lines kept in step with the items of single and bulk writes.
+    """
+    from vendor_api.models import PurchaseOrderItem
+
+    order = PurchaseOrder.objects.create(
+        po_number="PO1",
+        vendor_id=create_vendor,
+        items=[
+            {"sku": "SKU-1", "name": "Bolt", "quantity": 1},
+            {"sku": "SKU-2", "name": "Nut", "quantity": 2},
+        ],
+        quantity=3,
+    )
+    PurchaseOrder.objects.create(
+        po_number="PO2",
+        vendor_id=create_vendor,
+        items=[{"sku": "SKU-2", "name": "Nut", "quantity": 1}],
+        quantity=1,
+    )
+    url = reverse("purchase-order-create-list")
+
+    def po_numbers(params):
+        response = jwt_token.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return sorted(row["po_number"] for row in response.data["results"])
+
+    assert po_numbers({"sku": "SKU-2"}) == ["PO1", "PO2"]
+    assert po_numbers({"sku": "SKU-1"}) == ["PO1"]
+    assert po_numbers({"item_name": "Nut", "sku": "SKU-1"}) == ["PO1"]
+    assert po_numbers({"sku": "SKU-3"}) == []
+
+    # Saves that leave the items alone do not touch the lines.
+    line_ids = set(PurchaseOrderItem.objects.values_list("id", flat=True))
+    order.status = "completed"
+    order.save()
+    assert set(PurchaseOrderItem.objects.values_list("id", flat=True)) == line_ids
+
+    order.items = [{"sku": "SKU-3", "name": "Washer", "quantity": 3}]
+    order.save()
+    assert po_numbers({"sku": "SKU-1"}) == []
+    assert po_numbers({"sku": "SKU-3"}) == ["PO1"]
+
+    rows = [
+        {
+            "po_number": "PO2",
+            "vendor": create_vendor,
+            "items": [{"sku": "SKU-3", "name": "Washer", "quantity": 1}],
+            "quantity": 1,
+        },
+        {
+            "po_number": "PO3",
+            "vendor": create_vendor,
+            "items": [{"sku": "SKU-1", "name": "Bolt", "quantity": 1}],
+            "quantity": 1,
+        },
+    ]
+    response = jwt_token.post(
+        reverse("purchase-order-bulk-upsert"), rows, format="json"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert po_numbers({"sku": "SKU-3"}) == ["PO1", "PO2"]
+    assert po_numbers({"sku": "SKU-1"}) == ["PO3"]
+    assert po_numbers({"sku": "SKU-2"}) == []
+
+    async_url = "/api/async/purchase_orders/"
+    response = jwt_token.get(async_url, {"item_name": "Washer"})
+    assert sorted(row["po_number"] for row in response.json()["results"]) == [
+        "PO1",
+        "PO2",
+    ]
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_purchase_order_item_lines_snapshot_is_lazy(monkeypatch, create_vendor):
+    """
+    Tests that loading orders does not extract their item lines until the
+    items are accessed, and that changing the items in place after loading
+    still rewrites the lines on save.
+    """
+    from vendor_api.models import PurchaseOrderItem
+
+    for i in range(3):
+        PurchaseOrder.objects.create(
+            po_number=f"PO{i}",
+            vendor_id=create_vendor,
+            items=[{"sku": f"SKU-{i}", "name": "Bolt", "quantity": 1}],
+            quantity=1,
+        )
+    calls = []
+    get_item_lines = PurchaseOrder.get_item_lines
+    monkeypatch.setattr(
+        PurchaseOrder,
+        "get_item_lines",
+        lambda order: calls.append(order.pk) or get_item_lines(order),
+    )
+
+    orders = list(PurchaseOrder.objects.order_by("po_number"))
+    assert calls == []
+
+    order = orders[0]
+    order.status = "completed"
+    order.save()
+    # Saving reads the items, so only the saved order takes its snapshot.
+    assert set(calls) == {order.pk}
+
+    order.items.append({"sku": "SKU-9", "name": "Nut", "quantity": 1})
+    order.save()
+    assert list(
+        PurchaseOrderItem.objects.filter(purchase_order=order)
+        .order_by("position")
+        .values_list("sku", flat=True)
+    ) == ["SKU-0", "SKU-9"]
+
+    order = orders[1]
+    order.items = [{"sku": "SKU-8", "name": "Washer", "quantity": 1}]
+    order.save()
+    assert list(
+        PurchaseOrderItem.objects.filter(purchase_order=order).values_list(
+            "sku", flat=True
+        )
+    ) == ["SKU-8"]
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token", "create_vendor")
+def test_purchase_order_list_filters(jwt_token, create_vendor):
+    """
+    Tests the purchase order list filters, their validation and count_only.
+    """
+    now = timezone.now()
+    orders = [
+        ("PO1", "pending", None, None, -10),
+        ("PO2", "completed", 4.5, now, -5),
+        ("PO3", "completed", 2.0, now, -1),
+        ("PO4", "canceled", None, now, 3),
+    ]
+    for po_number, order_status, rating, acknowledged_at, days in orders:
+        PurchaseOrder.objects.create(
+            po_number=po_number,
+            vendor_id=create_vendor,
+            items=[],
+            quantity=1,
+            status=order_status,
+            quality_rating=rating,
+            order_date=now + timezone.timedelta(days=days),
+            delivery_date=now + timezone.timedelta(days=days + 7),
+            acknowledgment_date=acknowledged_at,
+        )
+    url = reverse("purchase-order-create-list")
+
+    def po_numbers(params):
+        response = jwt_token.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return [row["po_number"] for row in response.data["results"]]
+
+    assert po_numbers({"status": "completed"}) == ["PO2", "PO3"]
+    assert po_numbers({"status": "pending,canceled"}) == ["PO1", "PO4"]
+    assert po_numbers({"acknowledged": "false"}) == ["PO1"]
+    assert po_numbers({"acknowledged": "true", "min_quality_rating": "3"}) == ["PO2"]
+    assert po_numbers({"max_quality_rating": "3"}) == ["PO3"]
+    assert po_numbers(
+        {"order_date_after": (now - timezone.timedelta(days=6)).isoformat()}
+    ) == ["PO2", "PO3", "PO4"]
+    assert po_numbers(
+        {"delivery_date_before": (now + timezone.timedelta(days=3)).isoformat()}
+    ) == ["PO1", "PO2"]
+    assert po_numbers({"vendor": create_vendor, "status": "completed"}) == [
+        "PO2",
+        "PO3",
+    ]
+
+    response = jwt_token.get(url, {"status": "completed", "count_only": "true"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {"count": 2}
+    response = jwt_token.get(
+        "/api/async/purchase_orders/", {"acknowledged": "true", "count_only": "1"}
+    )
+    assert response.json() == {"count": 3}
+
+    for params in (
+        {"status": "shipped"},
+        {"acknowledged": "maybe"},
+        {"min_quality_rating": "high"},
+        {"order_date_after": "yesterday"},
+        {"vendor": "abc"},
+    ):
+        response = jwt_token.get(url, params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.data) == set(params)
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendor")
+def test_cached_jwt_authentication(create_vendor):
+    """
+    Tests that authenticated requests reuse the cached user, and that
+    deactivating the user or changing the password takes effect at once.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from vendor_api.authentication import user_cache
+
+    user_cache.clear()
+    user = User.objects.create_user("cached_user", password="first_password")
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}"
+    )
+    url = reverse("vendor-performance-retrieve", kwargs={"vendor_id": create_vendor})
+
+    def auth_queries(path=url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path)
+        queries = [query["sql"] for query in context.captured_queries]
+        return response.status_code, sum('FROM "auth_user"' in sql for sql in queries)
+
+    try:
+        assert auth_queries() == (status.HTTP_200_OK, 1)
+        assert auth_queries() == (status.HTTP_200_OK, 0)
+        assert auth_queries("/api/async/vendors/") == (status.HTTP_200_OK, 0)
+
+        user.is_active = False
+        user.save()
+        assert auth_queries() == (status.HTTP_401_UNAUTHORIZED, 1)
+        assert auth_queries("/api/async/vendors/")[0] == status.HTTP_401_UNAUTHORIZED
+
+        user.is_active = True
+        user.save()
+        assert auth_queries() == (status.HTTP_200_OK, 1)
+        user.set_password("second_password")
+        user.save()
+        assert auth_queries() == (status.HTTP_401_UNAUTHORIZED, 1)
+
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}"
+        )
+        assert auth_queries() == (status.HTTP_200_OK, 1)
+        assert auth_queries() == (status.HTTP_200_OK, 0)
+    finally:
+        user.delete()
+
+
+def test_user_cache_returns_a_copy_per_request():
+    """
+    Tests that each lookup gets its own instance of a cached user, so that
+    changes made to one request's user are not seen by another.
+    """
+    from vendor_api.authentication import user_cache
+
+    user_cache.clear()
+    user = User(id=1, username="cached_user")
+    try:
+        user_cache.set("1", "version", user)
+        first = user_cache.get("1", "version")
+        second = user_cache.get("1", "version")
+        assert first is not second and first is not user
+
+        user.is_staff = True
+        first.is_superuser = True
+        first._perm_cache = {"vendor_api.delete_vendor"}
+        third = user_cache.get("1", "version")
+        assert (third.is_staff, third.is_superuser) == (False, False)
+        assert not hasattr(third, "_perm_cache")
+        assert third.username == "cached_user"
+    finally:
+        user_cache.clear()
+
+
+@pytest.mark.usefixtures("clean_db", "jwt_token")
+def test_vendor_order_summary(jwt_token, create_vendors):
+    """
+    Tests that the vendor's order summary follows purchase order writes, and
+    that the vendor list filters on it without touching the orders.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils.dateparse import parse_datetime
+    from vendor_api.metrics import reconcile_counters
+
+    vendor1, vendor2 = create_vendors
+    now = timezone.now()
+    orders = {}
+    for po_number, vendor_id, order_status, items, days in [
+        (
+            "PO1",
+            vendor1,
+            "pending",
+            [
+                {"name": "Item 1", "quantity": 5, "unit_price": 10.99},
+                {"name": "Item 2", "quantity": 3, "unit_price": 15.99},
+            ],
+            -3,
+        ),
+        ("PO2", vendor1, "pending", [{"quantity": 2, "unit_price": "2.50"}], -1),
+        ("PO3", vendor1, "canceled", [{"name": "Unpriced"}], -2),
+        ("PO4", vendor2, "completed", [], 0),
+    ]:
+        orders[po_number] = PurchaseOrder.objects.create(
+            po_number=po_number,
+            vendor_id=vendor_id,
+            items=items,
+            quantity=1,
+            status=order_status,
+            order_date=now + timezone.timedelta(days=days),
+        )
+
+    def summary(vendor_id):
+        url = reverse("vendor-read-update-delete", kwargs={"pk": vendor_id})
+        data = jwt_token.get(url).data
+        for field in ("last_order_date", "last_acknowledgment_date"):
+            data[field] = data[field] and parse_datetime(data[field])
+        return data
+
+    data = summary(vendor1)
+    assert (data["pending_orders"], data["completed_orders"]) == (2, 0)
+    assert data["canceled_orders"] == 1
+    assert data["open_order_value"] == "107.92"
+    assert data["last_order_date"] == orders["PO2"].order_date
+    assert data["last_acknowledgment_date"] is None
+
+    url = reverse("purchase-order-acknowledge", kwargs={"po_id": orders["PO1"].id})
+    assert jwt_token.patch(url).status_code == status.HTTP_200_OK
+    orders["PO1"].refresh_from_db()
+    orders["PO2"].delete()
+    data = summary(vendor1)
+    assert (data["pending_orders"], data["open_order_value"]) == (1, "102.92")
+    assert data["last_order_date"] == orders["PO3"].order_date
+    assert data["last_acknowledgment_date"] == orders["PO1"].acknowledgment_date
+
+    # Moving an order takes its share of the summary along.
+    orders["PO1"].vendor_id = vendor2
+    orders["PO1"].save()
+    orders["PO1"].items = [{"quantity": 1, "unit_price": 200}]
+    orders["PO1"].save(update_fields=["items"])
+    data = summary(vendor1)
+    assert (data["pending_orders"], data["open_order_value"]) == (0, "0.00")
+    assert data["last_acknowledgment_date"] is None
+    data = summary(vendor2)
+    assert (data["pending_orders"], data["completed_orders"]) == (1, 1)
+    assert data["open_order_value"] == "200.00"
+    assert data["last_order_date"] == orders["PO4"].order_date
+    assert data["last_acknowledgment_date"] == orders["PO1"].acknowledgment_date
+    assert reconcile_counters(dry_run=True) == {}
+
+    url = reverse("vendor-create-list")
+
+    def vendor_ids(params):
+        response = jwt_token.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        async_response = jwt_token.get("/api/async/vendors/", params)
+        assert async_response.json()["results"] == response.json()["results"]
+        return [row["id"] for row in response.data["results"]]
+
+    with CaptureQueriesContext(connection) as context:
+        assert vendor_ids({"min_open_pos": "1"}) == [vendor2]
+    assert not any(
+        "vendor_api_purchaseorder" in query["sql"] for query in context.captured_queries
+    )
+    assert vendor_ids({"max_open_pos": "0"}) == [vendor1]
+    assert vendor_ids({"min_open_value": "150"}) == [vendor2]
+    assert vendor_ids(
+        {"last_order_date_after": (now - timezone.timedelta(hours=1)).isoformat()}
+    ) == [vendor2]
+    response = jwt_token.get(url, {"min_open_pos": "many"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == {"min_open_pos"}
+
+
+@pytest.mark.usefixtures("clean_db", "create_vendors")
+def test_purchase_order_change_feed(jwt_token, create_vendors, settings):
+    """
+    Tests that purchase order creates, updates, deletes and bulk transitions
+    are logged in order, and that the change feed pages through them and
+    waits for new ones.
+    """
+    import threading
+    import time
+
+    from django.db import connection
+    from django.db.models import Max
+    from vendor_api.changes import sequence_changes
+    from vendor_api.models import PurchaseOrderChange
+
+    url = reverse("purchase-order-changes")
+    # Number the entries of earlier tests, to start after them.
+    while sequence_changes():
+        pass
+    start = PurchaseOrderChange.objects.aggregate(start=Max("seq"))["start"] or 0
+
+    order = PurchaseOrder.objects.create(
+        po_number="PO1",
+        vendor_id=create_vendors[0],
+        items=[{"name": "Item 1", "quantity": 2, "unit_price": 10}],
+        quantity=2,
+    )
+    order.quality_rating = 4.0
+    order.save(update_fields=["quality_rating"])
+    response = jwt_token.post(
+        reverse("purchase-order-bulk-status"),
+        {"ids": [order.id], "status": "completed"},
+        format="json",
+    )
+    assert response.data["updated"] == 1
+    PurchaseOrder.objects.filter(pk=order.pk).get().delete()
+
+    response = jwt_token.get(url, {"since": start})
+    assert response.status_code == status.HTTP_200_OK
+    entries = response.json()["results"]
+    assert [(entry["action"], entry["po_number"]) for entry in entries] == [
+        ("created", "PO1"),
+        ("updated", "PO1"),
+        ("updated", "PO1"),
+        ("deleted", "PO1"),
+    ]
+    assert [entry["seq"] for entry in entries] == sorted(
+        entry["seq"] for entry in entries
+    )
+    assert {entry["purchase_order"] for entry in entries} == {order.id}
+    assert {entry["vendor"] for entry in entries} == {create_vendors[0]}
+    created, rated, completed, deleted = (entry["data"] for entry in entries)
+    assert created["status"] == "pending" and created["order_value"] == "20.00"
+    assert "id" not in created
+    assert rated == {"quality_rating": 4.0}
+    assert completed["status"] == "completed" and "items" not in completed
+    assert deleted is None
+    assert response.json()["next_since"] == entries[-1]["seq"]
+    assert response.json()["has_more"] is False
+
+    # Paging: the next request resumes after the last entry returned.
+    response = jwt_token.get(url, {"since": start, "limit": 3})
+    assert [entry["seq"] for entry in response.json()["results"]] == [
+        entry["seq"] for entry in entries[:3]
+    ]
+    assert response.json()["has_more"] is True
+    response = jwt_token.get(url, {"since": response.json()["next_since"]})
+    assert response.json()["results"] == entries[3:]
+
+    # Long polling is off unless enabled: wait is ignored.
+    began = time.monotonic()
+    response = jwt_token.get(url, {"since": entries[-1]["seq"], "wait": 5})
+    assert time.monotonic() - began < 1
+    assert response.json()["results"] == []
+
+    # Long polling: an empty feed waits for the next write.
+    settings.CHANGE_FEED_MAX_WAIT = 10
+
+    def create_later():
+        time.sleep(0.3)
+        try:
+            PurchaseOrder.objects.create(
+                po_number="PO2", vendor_id=create_vendors[1], items=[], quantity=1
+            )
+        finally:
+            connection.close()
+
+    writer = threading.Thread(target=create_later)
+    began = time.monotonic()
+    writer.start()
+    response = jwt_token.get(url, {"since": entries[-1]["seq"], "wait": 10})
+    writer.join()
+    assert time.monotonic() - began < 5
+    assert [entry["po_number"] for entry in response.json()["results"]] == ["PO2"]
+    next_since = response.json()["next_since"]
+    response = jwt_token.get(url, {"since": next_since, "wait": 0.2})
+    assert response.json() == {
+        "results": [],
+        "next_since": next_since,
+        "has_more": False,
+    }
+
+    for params in ({"since": "x"}, {"since": -1}, {"limit": 0}, {"wait": -1}):
+        response = jwt_token.get(url, params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.json()) == set(params)
+    assert APIClient().get(url).status_code == status.HTTP_401_UNAUTHORIZED
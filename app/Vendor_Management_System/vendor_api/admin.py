@@ -3,4 +3,9 @@ from .models import *
 
 # Register your models here.
 admin.site.register(Vendor)
-admin.site.register(PurchaseOrder)
+
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(admin.ModelAdmin):
+    # PurchaseOrder.__str__ shows the vendor name; fetch it in the list query.
+    list_select_related = ("vendor",)
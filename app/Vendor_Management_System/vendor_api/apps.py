@@ -6,4 +6,7 @@ class VendorApiConfig(AppConfig):
     name = "vendor_api"
     
     def ready(self):
-        from . import signals
+        from . import db, instrumentation, signals
+
+        db.install()
+        instrumentation.install()
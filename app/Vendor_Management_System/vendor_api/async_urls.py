@@ -0,0 +1,31 @@
+"""
+Async variants of the read endpoints, mounted under /api/async/ with the same
+paths as their sync counterparts in urls.py.
+"""
+
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path("vendors/", async_views.vendor_list, name="async-vendor-list"),
+    path(
+        "vendors/<int:pk>/",
+        async_views.vendor_detail,
+        name="async-vendor-detail",
+    ),
+    path(
+        "vendors/<int:vendor_id>/performance/",
+        async_views.vendor_performance,
+        name="async-vendor-performance",
+    ),
+    path(
+        "purchase_orders/",
+        async_views.purchase_order_list,
+        name="async-purchase-order-list",
+    ),
+    path(
+        "purchase_orders/<int:po_id>/",
+        async_views.purchase_order_detail,
+        name="async-purchase-order-detail",
+    ),
+]
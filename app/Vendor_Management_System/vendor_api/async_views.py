@@ -0,0 +1,245 @@
+"""
+Async read endpoints.
+
+DRF views are synchronous, so under an ASGI server each request holds a
+worker thread for its whole duration. These views serve the same reads as
+plain Django async views on the async ORM (aget, afirst, async for), only
+leaving the event loop for the queries themselves. They reuse the DRF
+serializers and renderer, so responses are identical to the sync endpoints.
+"""
+
+import asyncio
+import functools
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    MethodNotAllowed,
+    NotAuthenticated,
+    ValidationError,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import CachedJWTAuthentication
+from .changes import BATCH_SIZE, sequence_changes
+from .fieldsets import get_requested_fields, only_fields
+from .filters import (
+    filter_purchase_orders,
+    filter_vendors,
+    parse_bool_param,
+    parse_float_param,
+    parse_int_param,
+)
+from .models import PurchaseOrder, PurchaseOrderChange, Vendor, VendorMetricCounters
+from .pagination import KeysetPagination, PurchaseOrderPagination
+from .serializers import (
+    PurchaseOrderChangeSerializer,
+    PurchaseOrderSerializer,
+    VendorSerializer,
+)
+from .views import PurchaseOrderListCreateAPIView, VendorListCreateAPIView
+
+ALLOWED_METHODS = ("GET", "HEAD")
+
+_jwt_authentication = CachedJWTAuthentication()
+_renderer = JSONRenderer()
+
+
+def _render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        _renderer.render(data),
+        content_type=_renderer.media_type,
+        status=status_code,
+    )
+
+
+async def authenticate(request):
+    """
+    Async counterpart of JWTAuthentication.authenticate(): the token is
+    checked in-process and the user comes from the user cache or, on a miss,
+    from the database.
+    Returns: The active user, or None if no token was sent.
+    """
+    header = _jwt_authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = _jwt_authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    validated_token = _jwt_authentication.get_validated_token(raw_token)
+    return await _jwt_authentication.aget_user(validated_token)
+
+
+def async_api_view(view):
+    """
+    Wraps an async view with JWT authentication, the IsAuthenticated check,
+    the GET (and HEAD) only check of the read-only DRF views, in the same
+    order, and DRF-style error responses. The view gets a DRF Request for
+    query_params.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            request.user = await authenticate(request)
+            if request.user is None:
+                raise NotAuthenticated()
+            if request.method not in ALLOWED_METHODS:
+                raise MethodNotAllowed(request.method)
+            data = await view(Request(request), *args, **kwargs)
+        except APIException as exc:
+            detail = (
+                exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+            )
+            response = _render(detail, exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response["WWW-Authenticate"] = _jwt_authentication.authenticate_header(
+                    request
+                )
+            elif exc.status_code == status.HTTP_405_METHOD_NOT_ALLOWED:
+                response["Allow"] = ", ".join(ALLOWED_METHODS)
+            return response
+        except Http404 as exc:
+            return _render({"detail": str(exc)}, status.HTTP_404_NOT_FOUND)
+        return _render(data)
+
+    return wrapper
+
+
+async def _paginate(paginator, queryset, request, serializer_class, view_class):
+    # The sync view's filter backends and ordering fields decide ?ordering=,
+    # so that both endpoints order, and build cursors, alike.
+    view = view_class(request=request, args=(), kwargs={}, format_kwarg=None)
+    fields = get_requested_fields(request, serializer_class)
+    if fields is not None:
+        queryset = only_fields(queryset, fields)
+    page_queryset = paginator.get_page_queryset(queryset, request, view)
+    rows = paginator.set_page([row async for row in page_queryset])
+    data = serializer_class(rows, many=True, fields=fields).data
+    return paginator.get_paginated_response(data).data
+
+
+async def _retrieve(queryset, request, serializer_class, pk, not_found_message):
+    fields = get_requested_fields(request, serializer_class)
+    if fields is not None:
+        queryset = only_fields(queryset, fields)
+    try:
+        instance = await queryset.aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        raise Http404(not_found_message)
+    return serializer_class(instance, fields=fields).data
+
+
+@async_api_view
+async def vendor_list(request):
+    queryset = filter_vendors(Vendor.objects.all(), request.query_params)
+    return await _paginate(
+        KeysetPagination(),
+        queryset,
+        request,
+        VendorSerializer,
+        VendorListCreateAPIView,
+    )
+
+
+@async_api_view
+async def vendor_detail(request, pk):
+    return await _retrieve(
+        Vendor.objects.all(),
+        request,
+        VendorSerializer,
+        pk,
+        "Vendor with ID " + str(pk) + " not found.",
+    )
+
+
+@async_api_view
+async def vendor_performance(request, vendor_id):
+    counters = await VendorMetricCounters.objects.filter(vendor_id=vendor_id).afirst()
+    if counters is None:
+        if not await Vendor.objects.filter(pk=vendor_id).aexists():
+            raise Http404("Vendor with ID " + str(vendor_id) + " not found.")
+        counters = VendorMetricCounters(vendor_id=vendor_id)
+    return counters.get_performance_metrics()
+
+
+@async_api_view
+async def purchase_order_list(request):
+    queryset = filter_purchase_orders(PurchaseOrder.objects.all(), request.query_params)
+    if parse_bool_param(request.query_params, "count_only"):
+        return {"count": await queryset.order_by().acount()}
+    return await _paginate(
+        PurchaseOrderPagination(),
+        queryset,
+        request,
+        PurchaseOrderSerializer,
+        PurchaseOrderListCreateAPIView,
+    )
+
+
+@async_api_view
+async def purchase_order_detail(request, po_id):
+    return await _retrieve(
+        PurchaseOrder.objects.all(),
+        request,
+        PurchaseOrderSerializer,
+        po_id,
+        "Purchase order with ID " + str(po_id) + " not found.",
+    )
+
+
+@async_api_view
+async def purchase_order_changes(request):
+    """
+    The purchase order change log (see vendor_api.changes), oldest first:
+    the entries after ``since`` (a sequence number, 0 for all), at most
+    ``limit``, once sequence_changes() has numbered the finished ones.
+    With ``wait`` (seconds, at most CHANGE_FEED_MAX_WAIT, which is 0 unless
+    long polling is enabled), a request that finds no entries polls for new
+    ones until some are written or the wait is over (long polling). Only an
+    ASGI server serves the wait without holding a worker thread.
+    Returns: The entries, the ``since`` of the next request and whether more
+             entries are already waiting.
+    """
+    params = request.query_params
+    since = parse_int_param(params, "since") or 0
+    limit = parse_int_param(params, "limit")
+    if limit is None:
+        limit = settings.CHANGE_FEED_PAGE_SIZE
+    wait = parse_float_param(params, "wait") or 0
+    if since < 0:
+        raise ValidationError({"since": ["Must not be negative."]})
+    if not 1 <= limit <= settings.CHANGE_FEED_MAX_PAGE_SIZE:
+        raise ValidationError(
+            {
+                "limit": [
+                    "Must be between 1 and "
+                    + str(settings.CHANGE_FEED_MAX_PAGE_SIZE)
+                    + "."
+                ]
+            }
+        )
+    if wait < 0:
+        raise ValidationError({"wait": ["Must not be negative."]})
+    deadline = time.monotonic() + min(wait, settings.CHANGE_FEED_MAX_WAIT)
+    queryset = PurchaseOrderChange.objects.filter(seq__gt=since).order_by("seq")
+    while True:
+        sequenced = await sync_to_async(sequence_changes)()
+        entries = [entry async for entry in queryset[: limit + 1]]
+        remaining = deadline - time.monotonic()
+        if entries or remaining <= 0:
+            break
+        await asyncio.sleep(min(settings.CHANGE_FEED_POLL_INTERVAL, remaining))
+    # A full batch may have left entries to number.
+    has_more = len(entries) > limit or sequenced == BATCH_SIZE
+    entries = entries[:limit]
+    return {
+        "results": PurchaseOrderChangeSerializer(entries, many=True).data,
+        "next_since": entries[-1].seq if entries else since,
+        "has_more": has_more,
+    }
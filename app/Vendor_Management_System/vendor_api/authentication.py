@@ -0,0 +1,143 @@
+"""
+JWT authentication with a per-process user cache.
+
+simplejwt's JWTAuthentication loads the user row on every request. Here the
+user is kept in an LRU cache for JWT_USER_CACHE_TTL seconds, keyed by the
+user id and the token's password hash claim (see CHECK_REVOKE_TOKEN in
+SIMPLE_JWT), so that a token issued before a password change never matches a
+user cached for a newer one. Saving or deleting a user evicts it as soon as
+the write commits; other processes see the change after at most the TTL.
+
+Each request gets its own copy of the cached user, so that attributes set on
+request.user (e.g. the permission caches of ModelBackend) never leak into
+another request, concurrent or later.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Least recently used users, with the token version they were cached for
+    and an expiry time. Users are copied in and out, so the cached instance is
+    never shared with a request. The size and TTL settings are read on every
+    call so that they can be changed at runtime (and in tests); a TTL of 0
+    disables the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "JWT_USER_CACHE_TTL", 60)
+
+    @property
+    def max_size(self):
+        return getattr(settings, "JWT_USER_CACHE_SIZE", 1024)
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            cached_version, user, expires = entry
+            if cached_version != version or expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, version, user):
+        ttl = self.ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (
+                version,
+                copy.copy(user),
+                time.monotonic() + ttl,
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that serves users from user_cache. The checks are
+    those of JWTAuthentication.get_user; failed lookups are not cached.
+    """
+
+    def get_cache_key(self, validated_token):
+        """
+        Returns: The user id (as a string) and the token version of a token.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return str(user_id), validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+
+    def check_user(self, user, validated_token):
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+    def get_user(self, validated_token):
+        user_id, version = self.get_cache_key(validated_token)
+        user = user_cache.get(user_id, version)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self.check_user(user, validated_token)
+            user_cache.set(user_id, version, user)
+        return user
+
+    async def aget_user(self, validated_token):
+        """
+        Async counterpart of get_user(), for the async views.
+        """
+        user_id, version = self.get_cache_key(validated_token)
+        user = user_cache.get(user_id, version)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self.check_user(user, validated_token)
+            user_cache.set(user_id, version, user)
+        return user
@@ -0,0 +1,247 @@
+"""
+Bulk purchase order writes.
+
+Rows are validated in one pass, matched to existing orders with a few IN
+queries, and written with bulk_create/bulk_update or grouped UPDATEs. Since
+bulk writes bypass the post_save receivers, the vendor counters are updated
+here from the collected state changes, once per affected vendor, the item
+lines of the orders whose items changed are rewritten, and the writes are
+added to the change log.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import metrics
+from .changes import log_changes
+from .items import items_changed, replace_item_lines
+from .models import PurchaseOrder, Vendor
+from .serializers import PurchaseOrderBulkItemSerializer
+
+BATCH_SIZE = 1000
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def upsert_purchase_orders(rows, batch_size=BATCH_SIZE):
+    """
+    Creates or updates purchase orders keyed on po_number.
+    Args: rows: List of purchase order dicts in the PurchaseOrderSerializer format.
+          batch_size: Number of rows per INSERT/UPDATE statement.
+    Returns: A dict with the created and updated counts and a list of per-row
+             errors. Invalid rows are skipped, the valid ones are still written.
+    """
+    serializer = PurchaseOrderBulkItemSerializer()
+    errors = []
+    valid = {}
+    for index, row in enumerate(rows):
+        try:
+            data = serializer.run_validation(row)
+        except serializers.ValidationError as exc:
+            po_number = row.get("po_number") if isinstance(row, dict) else None
+            errors.append(
+                {"index": index, "po_number": po_number, "errors": exc.detail}
+            )
+            continue
+        if data["po_number"] in valid:
+            errors.append(
+                {
+                    "index": index,
+                    "po_number": data["po_number"],
+                    "errors": {"po_number": ["Duplicate po_number in this batch."]},
+                }
+            )
+            continue
+        valid[data["po_number"]] = (index, data)
+
+    vendor_ids = {data["vendor"] for _, data in valid.values()}
+    known_vendors = set(
+        Vendor.objects.filter(id__in=vendor_ids).values_list("id", flat=True)
+    )
+    for po_number, (index, data) in list(valid.items()):
+        if data["vendor"] not in known_vendors:
+            errors.append(
+                {
+                    "index": index,
+                    "po_number": po_number,
+                    "errors": {
+                        "vendor": [
+                            f'Invalid pk "{data["vendor"]}" - object does not exist.'
+                        ]
+                    },
+                }
+            )
+            del valid[po_number]
+
+    with transaction.atomic():
+        # Locked until the writes commit, so that the counter deltas are
+        # computed from the rows as they are overwritten.
+        existing = {}
+        queryset = PurchaseOrder.objects.select_for_update()
+        for po_numbers in _chunks(list(valid), batch_size):
+            existing.update(queryset.in_bulk(po_numbers, field_name="po_number"))
+
+        to_create = []
+        to_update = []
+        update_fields = set()
+        changes = []
+        for po_number, (index, data) in valid.items():
+            data["vendor_id"] = data.pop("vendor")
+            order = existing.get(po_number)
+            if order is None:
+                order = PurchaseOrder(**data)
+                order.update_completion()
+                order.update_order_value()
+                to_create.append(order)
+                changes.append((None, order.get_metric_state()))
+                continue
+            previous_state = order.get_metric_state()
+            for field, value in data.items():
+                setattr(order, field, value)
+            order.update_completion()
+            order.update_order_value()
+            update_fields.update(data, PurchaseOrder.DERIVED_FIELDS)
+            to_update.append(order)
+            changes.append((previous_state, order.get_metric_state()))
+
+        PurchaseOrder.objects.bulk_create(to_create, batch_size=batch_size)
+        if any(order.pk is None for order in to_create):
+            # Backends that cannot return the ids of bulk inserted rows. The
+            # change log and the item lines reference the orders by id.
+            created_ids = {}
+            for po_numbers in _chunks(
+                [order.po_number for order in to_create], batch_size
+            ):
+                created_ids.update(
+                    PurchaseOrder.objects.filter(po_number__in=po_numbers).values_list(
+                        "po_number", "id"
+                    )
+                )
+            for order in to_create:
+                order.pk = created_ids[order.po_number]
+        if to_update:
+            PurchaseOrder.objects.bulk_update(
+                to_update, sorted(update_fields), batch_size=batch_size
+            )
+        metrics.apply_order_changes(changes)
+        log_changes(to_create, "created", batch_size=batch_size)
+        log_changes(to_update, "updated", update_fields, batch_size=batch_size)
+        replace_item_lines(to_create, created=True, batch_size=batch_size)
+        replace_item_lines(
+            [order for order in to_update if items_changed(order)],
+            batch_size=batch_size,
+        )
+
+    errors.sort(key=lambda error: error["index"])
+    return {"created": len(to_create), "updated": len(to_update), "errors": errors}
+
+
+def _group_transitions(orders, fields, status, quality_ratings):
+    """
+    Applies a status transition to loaded orders in memory.
+    Returns: The ids of the changed orders grouped by their changed
+             (field, value) pairs, and their metric state changes.
+    """
+    groups = defaultdict(list)
+    changes = []
+    # One completion time for all, so that the orders share an UPDATE.
+    now = timezone.now()
+    for order in orders:
+        previous_state = order.get_metric_state()
+        before = {field: getattr(order, field) for field in fields}
+        order.status = status
+        for key in (order.po_number, str(order.id)):
+            if key in quality_ratings:
+                order.quality_rating = quality_ratings[key]
+                break
+        order.update_completion(now)
+        changed = tuple(
+            (field, getattr(order, field))
+            for field in fields
+            if getattr(order, field) != before[field]
+        )
+        if changed:
+            groups[changed].append(order.id)
+            changes.append((previous_state, order.get_metric_state()))
+
+    return groups, changes
+
+
+def transition_purchase_orders(
+    ids, po_numbers, status, quality_ratings=None, batch_size=BATCH_SIZE
+):
+    """
+    Moves purchase orders to a status, with one UPDATE per group of orders
+    whose changed columns get the same values.
+    Args: ids, po_numbers: The orders to update; either list may be empty.
+          status: The target status.
+          quality_ratings: Optional dict of quality ratings keyed by po_number
+                           or by id (as a string).
+          batch_size: Maximum number of ids per UPDATE statement.
+    Returns: A dict with the updated and unchanged counts and a list of errors
+             for references that matched no order.
+    """
+    quality_ratings = quality_ratings or {}
+    fields = (
+        "id",
+        "po_number",
+        "delivery_date",
+        *PurchaseOrder.METRIC_STATE_FIELDS,
+        *PurchaseOrder.COMPLETION_FIELDS,
+    )
+    with transaction.atomic():
+        # Locked until the UPDATEs commit, so that the counter deltas are
+        # computed from the rows as they are overwritten.
+        queryset = PurchaseOrder.objects.select_for_update().only(*fields)
+        orders = {}
+        for chunk in _chunks(ids, batch_size):
+            orders.update((order.id, order) for order in queryset.filter(id__in=chunk))
+        for chunk in _chunks(po_numbers, batch_size):
+            orders.update(
+                (order.id, order) for order in queryset.filter(po_number__in=chunk)
+            )
+        groups, changes = _group_transitions(
+            orders.values(), fields, status, quality_ratings
+        )
+        for changed, order_ids in groups.items():
+            for chunk in _chunks(order_ids, batch_size):
+                PurchaseOrder.objects.filter(id__in=chunk).update(**dict(changed))
+        metrics.apply_order_changes(changes)
+        for changed, order_ids in groups.items():
+            log_changes(
+                [orders[order_id] for order_id in order_ids],
+                "updated",
+                [field for field, _ in changed],
+                batch_size=batch_size,
+            )
+
+    found_ids = set(orders)
+    found_po_numbers = {order.po_number for order in orders.values()}
+    errors = [
+        {"reference": id, "errors": ["Purchase order not found."]}
+        for id in dict.fromkeys(ids)
+        if id not in found_ids
+    ]
+    errors += [
+        {"reference": po_number, "errors": ["Purchase order not found."]}
+        for po_number in dict.fromkeys(po_numbers)
+        if po_number not in found_po_numbers
+    ]
+    found_keys = found_po_numbers | {str(id) for id in found_ids}
+    errors += [
+        {
+            "reference": key,
+            "errors": ["Quality rating for an order not in the request."],
+        }
+        for key in quality_ratings
+        if key not in found_keys
+    ]
+
+    updated = sum(len(order_ids) for order_ids in groups.values())
+    return {"updated": updated, "unchanged": len(orders) - updated, "errors": errors}
@@ -0,0 +1,19 @@
+"""
+Validators (ETag and Last-Modified) of the responses derived from vendor data.
+
+A response's version is the updated_at column of the row it is built from,
+which every write to that row sets. The row is loaded anyway to build the
+response, so the validators cost no query of their own, and all processes
+agree on them.
+"""
+
+import datetime
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def to_version(updated_at):
+    """
+    Returns: updated_at as an integer number of microseconds since the epoch.
+    """
+    return (updated_at - _EPOCH) // datetime.timedelta(microseconds=1)
@@ -0,0 +1,136 @@
+"""
+Append-only change log of purchase orders, served by GET /api/changes/.
+
+Every purchase order create, update and delete adds a PurchaseOrderChange in
+the transaction that made it: from the post_save and post_delete receivers
+for single writes, and from the bulk write paths, which bypass them. Each
+entry carries the values written, rendered as the purchase order endpoints
+render them: every field for creates and full saves, the saved ones for
+partial and bulk updates, none for deletes.
+
+Consumers resume from the last sequence number they saw, so an entry must
+never get a lower one than an entry already served. Writers do not number
+their entries: that would take a global lock held until every write commits.
+Instead, sequence_changes() numbers the entries of finished transactions
+only, in transaction and id order, before the feed is read. On SQLite,
+writing transactions are serialized (see vendor_api.db), so every visible
+entry is final. On PostgreSQL, entries record their transaction id and only
+those of transactions older than every running one (the snapshot's xmin) are
+numbered; the numbering itself takes an advisory lock, which only feed
+readers contend for.
+"""
+
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from .models import PurchaseOrder, PurchaseOrderChange
+from .serializers import PurchaseOrderSerializer
+
+BATCH_SIZE = 1000
+
+# Key of the PostgreSQL advisory lock that serializes sequence_changes().
+SEQUENCE_LOCK_KEY = 0x504F4348
+
+
+def get_field_names(fields):
+    """
+    Returns: The purchase order field names of the given names or attnames
+             (e.g. vendor_id), in model order.
+    """
+    fields = set(fields)
+    return [
+        field.name
+        for field in PurchaseOrder._meta.concrete_fields
+        if not field.primary_key and (field.name in fields or field.attname in fields)
+    ]
+
+
+def get_transaction_id(using):
+    """
+    Returns: The id of the current PostgreSQL transaction, or None on other
+             backends.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT txid_current()")
+        return cursor.fetchone()[0]
+
+
+def log_changes(orders, action, fields=None, batch_size=BATCH_SIZE):
+    """
+    Adds one change log entry per order, in order.
+    Args: orders: The purchase orders, as written.
+          action: "created", "updated" or "deleted".
+          fields: The names (or attnames) of the fields written, or None for
+                  all of them.
+          batch_size: Number of rows per INSERT statement.
+    """
+    orders = list(orders)
+    if not orders:
+        return
+    data = [None] * len(orders)
+    if action != "deleted":
+        if fields is None and orders[0].get_deferred_fields():
+            # Django only saved the loaded fields.
+            fields = list(orders[0].__dict__)
+        if fields is not None:
+            fields = get_field_names(fields)
+        if len(orders) == 1:
+            # Saved instances may hold values as they were assigned (e.g. date
+            # strings), which only the per-field representations accept.
+            data = [PurchaseOrderSerializer(orders[0], fields=fields).data]
+        else:
+            data = PurchaseOrderSerializer(orders, many=True, fields=fields).data
+        for values in data:
+            values.pop("id", None)
+    using = router.db_for_write(PurchaseOrderChange)
+    transaction_id = get_transaction_id(using)
+    PurchaseOrderChange.objects.using(using).bulk_create(
+        [
+            PurchaseOrderChange(
+                purchase_order=order.pk,
+                vendor=order.vendor_id,
+                po_number=order.po_number,
+                action=action,
+                data=values,
+                transaction_id=transaction_id,
+            )
+            for order, values in zip(orders, data)
+        ],
+        batch_size=batch_size,
+    )
+
+
+def sequence_changes(batch_size=BATCH_SIZE):
+    """
+    Gives the next sequence numbers to the unsequenced entries of finished
+    transactions, in transaction and id order.
+    Args: batch_size: Most entries numbered per call.
+    Returns: The number of entries numbered.
+    """
+    using = router.db_for_write(PurchaseOrderChange)
+    pending = PurchaseOrderChange.objects.using(using).filter(seq__isnull=True)
+    if not pending.exists():
+        return 0
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SEQUENCE_LOCK_KEY])
+                cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+                xmin = cursor.fetchone()[0]
+            pending = pending.filter(transaction_id__lt=xmin)
+        entries = list(pending.order_by("transaction_id", "id").only("id")[:batch_size])
+        if not entries:
+            return 0
+        last = PurchaseOrderChange.objects.using(using).aggregate(last=Max("seq"))[
+            "last"
+        ]
+        for seq, entry in enumerate(entries, start=(last or 0) + 1):
+            entry.seq = seq
+        PurchaseOrderChange.objects.using(using).bulk_update(
+            entries, ["seq"], batch_size=batch_size
+        )
+    return len(entries)
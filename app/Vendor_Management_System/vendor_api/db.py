@@ -0,0 +1,50 @@
+"""
+Per-connection database setup.
+
+Django 5.0 has no options for SQLite pragmas or transaction modes, so they
+are applied from the connection_created signal to every new SQLite
+connection (see SQLITE_PRAGMAS and SQLITE_TRANSACTION_MODE in settings.py).
+
+SQLite transactions start as readers by default and only take the write lock
+at their first write. A transaction that reads a row and then writes fails
+at once with "database is locked" if another connection wrote in between,
+as its snapshot can no longer be upgraded. Starting transactions with BEGIN
+IMMEDIATE takes the write lock up front, where the busy timeout applies,
+which also makes the select_for_update() reads of the metric code safe.
+"""
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+def begin_in_transaction_mode(execute, sql, params, many, context):
+    """
+    Execute wrapper that starts the transactions Django opens with BEGIN in
+    the SQLITE_TRANSACTION_MODE (DEFERRED, IMMEDIATE or EXCLUSIVE).
+    """
+    if sql == "BEGIN":
+        mode = getattr(settings, "SQLITE_TRANSACTION_MODE", None)
+        if mode:
+            sql = f"BEGIN {mode}"
+    return execute(sql, params, many, context)
+
+
+def apply_sqlite_pragmas(sender=None, connection=None, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    if begin_in_transaction_mode not in connection.execute_wrappers:
+        connection.execute_wrappers.append(begin_in_transaction_mode)
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def install():
+    """
+    Applies the pragmas to open and future database connections.
+    """
+    connection_created.connect(apply_sqlite_pragmas)
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None:
+            apply_sqlite_pragmas(connection=connection)
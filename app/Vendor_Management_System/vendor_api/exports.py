@@ -0,0 +1,69 @@
+"""
+Streaming exports.
+
+Rows are read with ``values()`` and ``iterator()`` and written to the response
+as they arrive, so the memory used does not depend on the size of the export.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back to the csv writer's caller.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _ndjson_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+def _csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(
+            [
+                (
+                    json.dumps(row[field], cls=DjangoJSONEncoder)
+                    if isinstance(row[field], (dict, list))
+                    else row[field]
+                )
+                for field in fields
+            ]
+        )
+
+
+def stream_queryset(queryset, fields, output, filename, chunk_size=CHUNK_SIZE):
+    """
+    Builds a streaming response with one NDJSON object or CSV row per record.
+    Args: queryset: The records to export.
+          fields: The model fields to include, in column order.
+          output: "ndjson" or "csv".
+          filename: Download file name, without extension.
+    """
+    rows = queryset.values(*fields).iterator(chunk_size=chunk_size)
+    if output == "csv":
+        lines = _csv_lines(rows, fields)
+    else:
+        lines = _ndjson_lines(rows)
+
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[output])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
@@ -0,0 +1,104 @@
+"""
+Sparse fieldsets for GET requests.
+
+``?fields=a,b`` renders only the listed fields and ``?exclude=c`` leaves the
+listed ones out. The model columns behind the fields left out are deferred on
+the queryset, so that large columns such as PurchaseOrder.items are not even
+fetched when a client does not need them.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXCLUDE_PARAM = "exclude"
+
+
+def _split(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def get_requested_fields(request, serializer_class):
+    """
+    Reads the ``fields`` and ``exclude`` query parameters.
+    Returns: The names of the serializer fields to render, in serializer order,
+             or None if the request does not restrict them.
+    """
+    params = request.query_params
+    requested = _split(params.get(FIELDS_PARAM, ""))
+    excluded = _split(params.get(EXCLUDE_PARAM, ""))
+    if not requested and not excluded:
+        return None
+
+    available = list(serializer_class().fields)
+    for param, names in ((FIELDS_PARAM, requested), (EXCLUDE_PARAM, excluded)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError(
+                {
+                    param: [
+                        f"Unknown field(s): {', '.join(unknown)}. "
+                        f"Expected any of: {', '.join(available)}."
+                    ]
+                }
+            )
+    fields = [
+        name
+        for name in available
+        if (not requested or name in requested) and name not in excluded
+    ]
+    if not fields:
+        raise ValidationError({EXCLUDE_PARAM: ["No fields left to return."]})
+    return fields
+
+
+def only_fields(queryset, field_names):
+    """
+    Restricts a queryset to the columns behind the given serializer fields
+    (plus the primary key, which Django always loads).
+    """
+    opts = queryset.model._meta
+    columns = []
+    for name in field_names:
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            # Not backed by a column of its own; nothing to restrict.
+            return queryset
+        if field.concrete:
+            columns.append(name)
+    return queryset.only(*columns)
+
+
+class SparseFieldsetMixin:
+    """
+    Applies ``?fields=`` / ``?exclude=`` to the queryset and the serializer
+    of a generic view on GET requests. The serializer must accept a
+    ``fields`` argument (see serializers.SparseFieldsMixin).
+    """
+
+    # Model fields the view itself reads, loaded whatever the fieldset.
+    always_loaded_fields = ()
+
+    def get_requested_fields(self):
+        if self.request.method not in SAFE_METHODS:
+            return None
+        if not hasattr(self, "_requested_fields"):
+            self._requested_fields = get_requested_fields(
+                self.request, self.get_serializer_class()
+            )
+        return self._requested_fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+        return only_fields(queryset, [*fields, *self.always_loaded_fields])
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,188 @@
+"""
+Query string filters shared by the vendor, purchase order and performance
+endpoints.
+"""
+
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import PurchaseOrder, PurchaseOrderItem
+
+
+def parse_datetime_param(params, name):
+    """
+    Reads an ISO 8601 date or datetime from the query string.
+    Returns: An aware datetime (midnight for plain dates) or None if absent.
+    """
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is not None:
+                parsed = datetime.datetime.combine(date, datetime.time.min)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: ["Expected an ISO 8601 date or datetime."]})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_int_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: ["A valid integer is required."]})
+
+
+def parse_float_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError({name: ["A valid number is required."]})
+
+
+def parse_bool_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    value = value.lower()
+    if value in ("true", "1", "yes"):
+        return True
+    if value in ("false", "0", "no"):
+        return False
+    raise ValidationError({name: ["Expected true or false."]})
+
+
+def filter_by_date_range(queryset, params, field, param_prefix=None):
+    """
+    Applies ``<prefix>_after`` (inclusive) and ``<prefix>_before`` (exclusive)
+    query parameters to a datetime field.
+    """
+    param_prefix = param_prefix or field
+    after = parse_datetime_param(params, f"{param_prefix}_after")
+    before = parse_datetime_param(params, f"{param_prefix}_before")
+    if after is not None:
+        queryset = queryset.filter(**{f"{field}__gte": after})
+    if before is not None:
+        queryset = queryset.filter(**{f"{field}__lt": before})
+    return queryset
+
+
+def filter_by_items(queryset, params):
+    """
+    Applies the ``sku`` and ``item_name`` query parameters: orders with an
+    item of exactly that SKU or name. Both are looked up in the indexed
+    PurchaseOrderItem lines rather than in the items JSON.
+    """
+    for param, field in (("sku", "sku"), ("item_name", "name")):
+        value = params.get(param)
+        if value:
+            queryset = queryset.filter(
+                id__in=PurchaseOrderItem.objects.filter(**{field: value}).values(
+                    "purchase_order_id"
+                )
+            )
+    return queryset
+
+
+def filter_purchase_orders(queryset, params):
+    """
+    Filters purchase orders by vendor, status, order and delivery date range,
+    acknowledgement, quality rating range and item. Every filter is a plain
+    comparison on a column, so that the indexes in PurchaseOrder.Meta apply.
+    """
+    vendor_id = parse_int_param(params, "vendor")
+    if vendor_id is not None:
+        queryset = queryset.filter(vendor_id=vendor_id)
+
+    statuses = [status for status in params.get("status", "").split(",") if status]
+    if statuses:
+        valid_statuses = {choice for choice, _ in PurchaseOrder.STATUS_CHOICES}
+        invalid = [status for status in statuses if status not in valid_statuses]
+        if invalid:
+            raise ValidationError(
+                {"status": [f'"{status}" is not a valid choice.' for status in invalid]}
+            )
+        if len(statuses) == 1:
+            queryset = queryset.filter(status=statuses[0])
+        else:
+            queryset = queryset.filter(status__in=statuses)
+
+    acknowledged = parse_bool_param(params, "acknowledged")
+    if acknowledged is not None:
+        queryset = queryset.filter(acknowledgment_date__isnull=not acknowledged)
+
+    min_rating = parse_float_param(params, "min_quality_rating")
+    max_rating = parse_float_param(params, "max_quality_rating")
+    if min_rating is not None:
+        queryset = queryset.filter(quality_rating__gte=min_rating)
+    if max_rating is not None:
+        queryset = queryset.filter(quality_rating__lte=max_rating)
+
+    queryset = filter_by_items(queryset, params)
+    queryset = filter_by_date_range(queryset, params, "delivery_date")
+    return filter_by_date_range(queryset, params, "order_date")
+
+
+class PurchaseOrderFilterBackend(BaseFilterBackend):
+    """
+    Applies filter_purchase_orders to the purchase order list.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_purchase_orders(queryset, request.query_params)
+
+
+def filter_vendors(queryset, params):
+    """
+    Filters vendors by their order summary: the number (``min_open_pos``,
+    ``max_open_pos``) and value (``min_open_value``) of their pending orders
+    and their last order date range. The summary is stored on the vendor
+    row, so no filter counts the vendor's orders.
+    """
+    for param, lookup in (
+        ("min_open_pos", "pending_orders__gte"),
+        ("max_open_pos", "pending_orders__lte"),
+    ):
+        value = parse_int_param(params, param)
+        if value is not None:
+            queryset = queryset.filter(**{lookup: value})
+
+    min_open_value = parse_float_param(params, "min_open_value")
+    if min_open_value is not None:
+        queryset = queryset.filter(open_order_value__gte=min_open_value)
+    return filter_by_date_range(queryset, params, "last_order_date")
+
+
+class VendorFilterBackend(BaseFilterBackend):
+    """
+    Applies filter_vendors to the vendor list.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_vendors(queryset, request.query_params)
+
+
+def filter_historical_performance(queryset, params):
+    """
+    Filters historical performance records by vendor and date range.
+    """
+    vendor_id = parse_int_param(params, "vendor")
+    if vendor_id is not None:
+        queryset = queryset.filter(vendor_id=vendor_id)
+    return filter_by_date_range(queryset, params, "date")
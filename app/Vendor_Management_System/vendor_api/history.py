@@ -0,0 +1,309 @@
+"""
+Historical vendor performance snapshots.
+
+Snapshots are also rolled up into hourly, daily and weekly averages
+(HistoricalPerformanceRollup) once their bucket has closed, so that a history
+read takes the closed buckets of its range from the rollups and only
+aggregates the raw snapshots of the buckets at its edges and of those not
+rolled up yet. Every bucket before the latest rolled up one (per resolution)
+is rolled up for every vendor, so that bucket is the rollups' watermark.
+Snapshots written after their bucket was rolled up get it rolled up again by
+snapshot_vendor_performance(); snapshots written by other means need
+rebuild_rollups().
+"""
+
+import datetime
+
+from django.db import NotSupportedError, transaction
+from django.db.models import Avg, Count, Func, IntegerField, Max, Min
+from django.utils import timezone
+
+from .models import HistoricalPerformance, HistoricalPerformanceRollup, Vendor
+
+METRIC_FIELDS = Vendor.PERFORMANCE_FIELDS
+
+
+# Bucket widths in seconds, and offsets aligning weekly buckets on Mondays
+# (the Unix epoch fell on a Thursday).
+RESOLUTIONS = {
+    "hourly": (3600, 0),
+    "daily": (86400, 0),
+    "weekly": (7 * 86400, 4 * 86400),
+}
+RAW_LIMIT = 10000
+
+
+class EpochBucket(Func):
+    """
+    Number of the fixed-width time bucket (counted from the Unix epoch, in UTC)
+    that a datetime column falls in. Unlike Trunc, this is plain integer
+    arithmetic on every backend, which keeps grouping large ranges cheap.
+    """
+
+    output_field = IntegerField()
+
+    def __init__(self, expression, width, offset=0):
+        super().__init__(expression)
+        self.width = width
+        self.offset = offset
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f"EpochBucket is not implemented for {connection.vendor}."
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"((CAST(strftime('%%s', {sql}) AS INTEGER) - %s) / %s)",
+            (*params, self.offset, self.width),
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"FLOOR((EXTRACT(EPOCH FROM {sql}) - %s) / %s)::bigint",
+            (*params, self.offset, self.width),
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"FLOOR((UNIX_TIMESTAMP({sql}) - %s) / %s)",
+            (*params, self.offset, self.width),
+        )
+
+
+def bucket_start(moment, interval, offset=0):
+    """
+    Floors a datetime to the start of its snapshot bucket.
+    Args: moment: An aware datetime.
+          interval: Bucket length in seconds; buckets are aligned on the Unix epoch.
+          offset: Seconds by which the buckets are shifted from the epoch.
+    """
+    seconds = (int(moment.timestamp()) - offset) // interval * interval + offset
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def _bucket_date(bucket, width, offset):
+    return datetime.datetime.fromtimestamp(
+        bucket * width + offset, tz=datetime.timezone.utc
+    )
+
+
+def rolled_up_until(resolution):
+    """
+    Returns: The end of the latest rolled up bucket of a resolution, before
+             which every snapshot is rolled up, or None if there is none.
+    """
+    latest = HistoricalPerformanceRollup.objects.filter(
+        resolution=resolution
+    ).aggregate(date=Max("date"))["date"]
+    if latest is None:
+        return None
+    return latest + datetime.timedelta(seconds=RESOLUTIONS[resolution][0])
+
+
+def rollup_range(resolution, start, end, batch_size=1000):
+    """
+    Rolls up the snapshots of every vendor between two bucket boundaries,
+    replacing the rollups already there.
+    Returns: The number of rollups written.
+    """
+    width, offset = RESOLUTIONS[resolution]
+    rows = (
+        HistoricalPerformance.objects.filter(date__gte=start, date__lt=end)
+        .annotate(bucket=EpochBucket("date", width, offset))
+        .values("vendor_id", "bucket")
+        .annotate(samples=Count("id"), **{field: Avg(field) for field in METRIC_FIELDS})
+        .order_by()
+    )
+    rollups = [
+        HistoricalPerformanceRollup(
+            resolution=resolution,
+            date=_bucket_date(row.pop("bucket"), width, offset),
+            **row,
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        HistoricalPerformanceRollup.objects.filter(
+            resolution=resolution, date__gte=start, date__lt=end
+        ).delete()
+        HistoricalPerformanceRollup.objects.bulk_create(rollups, batch_size=batch_size)
+    return len(rollups)
+
+
+def rollup_history(resolution, until=None, batch_size=1000):
+    """
+    Rolls up the snapshots of the buckets that closed since the watermark (or
+    since the first snapshot), up to the bucket containing ``until`` (default:
+    now), a day's worth of buckets (or one bucket, if longer) at a time.
+    Returns: The number of rollups written.
+    """
+    width, offset = RESOLUTIONS[resolution]
+    end = bucket_start(until or timezone.now(), width, offset)
+    start = rolled_up_until(resolution)
+    span = datetime.timedelta(seconds=width * max(1, 86400 // width))
+
+    written = 0
+    while True:
+        # Skip the stretches without snapshots.
+        snapshots = HistoricalPerformance.objects.filter(date__lt=end)
+        if start is not None:
+            snapshots = snapshots.filter(date__gte=start)
+        first = snapshots.aggregate(date=Min("date"))["date"]
+        if first is None:
+            return written
+        start = bucket_start(first, width, offset)
+        stop = min(start + span, end)
+        written += rollup_range(resolution, start, stop, batch_size)
+        start = stop
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Rolls up every closed bucket again from scratch, e.g. after snapshots were
+    imported or deleted other than by snapshot_vendor_performance().
+    Returns: The number of rollups written.
+    """
+    with transaction.atomic():
+        HistoricalPerformanceRollup.objects.all().delete()
+        return sum(
+            rollup_history(resolution, batch_size=batch_size)
+            for resolution in RESOLUTIONS
+        )
+
+
+def snapshot_vendor_performance(interval, at=None, batch_size=1000):
+    """
+    Records every vendor's current performance metrics as of the bucket
+    containing ``at`` (default: now).
+
+    The metrics are read from the Vendor rows, where they are kept up to date
+    on every purchase order write, in a single pass. Snapshots that already
+    exist for a (vendor, bucket) are left alone, so running this more than once
+    per bucket is harmless.
+    Returns: The bucket start and the number of vendors processed.
+    """
+    date = bucket_start(at or timezone.now(), interval)
+    rows = (
+        Vendor.objects.order_by("pk")
+        .values_list("pk", *METRIC_FIELDS)
+        .iterator(chunk_size=batch_size)
+    )
+
+    processed = 0
+    batch = []
+    for vendor_id, *metrics in rows:
+        batch.append(
+            HistoricalPerformance(
+                vendor_id=vendor_id, date=date, **dict(zip(METRIC_FIELDS, metrics))
+            )
+        )
+        if len(batch) >= batch_size:
+            HistoricalPerformance.objects.bulk_create(batch, ignore_conflicts=True)
+            processed += len(batch)
+            batch = []
+    if batch:
+        HistoricalPerformance.objects.bulk_create(batch, ignore_conflicts=True)
+        processed += len(batch)
+
+    # A snapshot taken for a bucket already rolled up (``at`` in the past).
+    for resolution, (width, offset) in RESOLUTIONS.items():
+        until = rolled_up_until(resolution)
+        if until is not None and date < until:
+            start = bucket_start(date, width, offset)
+            rollup_range(
+                resolution,
+                start,
+                start + datetime.timedelta(seconds=width),
+                batch_size,
+            )
+    return date, processed
+
+
+def _snapshots(vendor_id, after, before):
+    """
+    Args: vendor_id: The vendor.
+          after, before: Optional inclusive and exclusive bounds on the dates.
+    Returns: The vendor's snapshots in the range.
+    """
+    snapshots = HistoricalPerformance.objects.filter(vendor_id=vendor_id)
+    if after is not None:
+        snapshots = snapshots.filter(date__gte=after)
+    if before is not None:
+        snapshots = snapshots.filter(date__lt=before)
+    return snapshots
+
+
+def performance_history(vendor_id, resolution, after=None, before=None):
+    """
+    Reads a vendor's performance history, averaged per time bucket unless the
+    raw resolution is requested. The buckets wholly inside the range and
+    before the rollups' watermark are read from the rollups; the snapshots of
+    the others are averaged in the database.
+    Args: vendor_id: The vendor.
+          resolution: "raw", "hourly", "daily" or "weekly".
+          after, before: Optional inclusive and exclusive bounds on the dates.
+    Returns: A list of dicts with the bucket (or record) date and the metrics,
+             oldest first, and whether it was truncated: raw reads return at
+             most RAW_LIMIT records.
+    """
+    if resolution == "raw":
+        rows = list(
+            _snapshots(vendor_id, after, before)
+            .order_by("date")
+            .values("date", *METRIC_FIELDS)[: RAW_LIMIT + 1]
+        )
+        return rows[:RAW_LIMIT], len(rows) > RAW_LIMIT
+
+    width, offset = RESOLUTIONS[resolution]
+    interval = datetime.timedelta(seconds=width)
+    # The rolled up buckets are those starting in [first, last).
+    last = rolled_up_until(resolution)
+    first = None
+    if last is not None and before is not None:
+        last = min(last, bucket_start(before, width, offset))
+    if last is not None and after is not None:
+        first = bucket_start(after, width, offset)
+        if first < after:
+            first += interval
+        if first >= last:
+            last = None
+
+    points = []
+    # The snapshots outside the rollups, as separate date ranges with one
+    # bound each: SQLite narrows an index range by a single bound per side,
+    # so an OR of both ranges, or stacked bounds, would scan the whole range.
+    spans = [_snapshots(vendor_id, after, before)]
+    if last is not None:
+        rollups = HistoricalPerformanceRollup.objects.filter(
+            vendor_id=vendor_id, resolution=resolution, date__lt=last
+        )
+        spans = [_snapshots(vendor_id, max(last, after or last), before)]
+        if first is not None:
+            rollups = rollups.filter(date__gte=first)
+            if first > after:
+                spans.append(_snapshots(vendor_id, after, first))
+        points += rollups.order_by("date").values("date", *METRIC_FIELDS)
+
+    for span in spans:
+        rows = (
+            span.annotate(bucket=EpochBucket("date", width, offset))
+            .values("bucket")
+            .annotate(**{field: Avg(field) for field in METRIC_FIELDS})
+            .order_by("bucket")
+        )
+        points += (
+            {"date": _bucket_date(row.pop("bucket"), width, offset), **row}
+            for row in rows
+        )
+    points.sort(key=lambda point: point["date"])
+    return [
+        {
+            "date": point["date"],
+            **{field: round(point[field], 2) for field in METRIC_FIELDS},
+        }
+        for point in points
+    ], False
@@ -0,0 +1,281 @@
+"""
+Per-request query and timing instrumentation.
+
+Every database connection gets an execute wrapper (installed when the
+connection is created) that times its queries and charges them to the
+request being served, tracked in a context variable so that concurrent and
+async requests are kept apart. Serializers add their own time the same way.
+
+InstrumentationMiddleware reports the numbers of each request in a
+Server-Timing header, adds them up per endpoint for the Prometheus text
+endpoint (see metrics_view), and logs the SQL of requests slower than
+SLOW_REQUEST_THRESHOLD_MS.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import BasePermission
+
+logger = logging.getLogger(__name__)
+
+# SQL kept per request for the slow request log; all queries are counted.
+MAX_LOGGED_QUERIES = 200
+
+_current_stats = contextvars.ContextVar("vendor_api_request_stats", default=None)
+
+
+class RequestStats:
+    """
+    Timings collected while serving one request.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.queries = []
+
+    def add_query(self, sql, params, duration):
+        self.query_count += 1
+        self.db_time += duration
+        if len(self.queries) < MAX_LOGGED_QUERIES:
+            self.queries.append((sql, params, duration))
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper that charges the query to the current request, if any.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, params, time.perf_counter() - started)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    """
+    Installs the query recorder on open and future database connections.
+    """
+    connection_created.connect(install_query_recorder)
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection=connection)
+
+
+@contextmanager
+def timed_serialization():
+    stats = _current_stats.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.serializer_time += time.perf_counter() - started
+
+
+class EndpointMetrics:
+    """
+    Running totals per endpoint, exposed in the Prometheus text format.
+    The totals are kept per process.
+    """
+
+    FIELDS = (
+        ("requests", "vendor_api_requests_total", "counter", "Requests served."),
+        (
+            "slow_requests",
+            "vendor_api_slow_requests_total",
+            "counter",
+            "Requests slower than SLOW_REQUEST_THRESHOLD_MS.",
+        ),
+        (
+            "queries",
+            "vendor_api_request_queries_total",
+            "counter",
+            "SQL queries issued.",
+        ),
+        (
+            "view_seconds",
+            "vendor_api_request_view_seconds_total",
+            "counter",
+            "Time spent serving requests.",
+        ),
+        (
+            "db_seconds",
+            "vendor_api_request_db_seconds_total",
+            "counter",
+            "Time spent in SQL queries.",
+        ),
+        (
+            "serializer_seconds",
+            "vendor_api_request_serializer_seconds_total",
+            "counter",
+            "Time spent in serializers.",
+        ),
+        (
+            "max_queries",
+            "vendor_api_request_queries_max",
+            "gauge",
+            "Most SQL queries issued by a single request.",
+        ),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(dict)
+
+    def record(self, endpoint, stats, view_time, slow):
+        with self._lock:
+            totals = self._totals[endpoint]
+            totals["requests"] = totals.get("requests", 0) + 1
+            totals["slow_requests"] = totals.get("slow_requests", 0) + int(slow)
+            totals["queries"] = totals.get("queries", 0) + stats.query_count
+            totals["view_seconds"] = totals.get("view_seconds", 0.0) + view_time
+            totals["db_seconds"] = totals.get("db_seconds", 0.0) + stats.db_time
+            totals["serializer_seconds"] = (
+                totals.get("serializer_seconds", 0.0) + stats.serializer_time
+            )
+            totals["max_queries"] = max(totals.get("max_queries", 0), stats.query_count)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(totals) for endpoint, totals in self._totals.items()}
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+    def render(self):
+        snapshot = self.snapshot()
+        lines = []
+        for key, name, kind, description in self.FIELDS:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (method, route), totals in sorted(snapshot.items()):
+                route = route.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(
+                    f'{name}{{method="{method}",endpoint="{route}"}} '
+                    f"{totals.get(key, 0):g}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+endpoint_metrics = EndpointMetrics()
+
+
+def get_endpoint(request):
+    """
+    Returns: (method, route) of the request, with the URL pattern rather than
+    the path so that every vendor or order id maps to the same endpoint.
+    """
+    match = getattr(request, "resolver_match", None)
+    route = "/" + match.route if match is not None and match.route else "<unmatched>"
+    return request.method, route
+
+
+class InstrumentationMiddleware:
+    """
+    Records the query count and the view, database and serializer time of
+    each request; see the module docstring.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, view_time):
+        slow = view_time * 1000 >= getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 500)
+        method, route = get_endpoint(request)
+        endpoint_metrics.record((method, route), stats, view_time, slow)
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.query_count} queries"',
+                f"serializer;dur={stats.serializer_time * 1000:.2f}",
+                f"view;dur={view_time * 1000:.2f}",
+            ]
+        )
+        if slow:
+            self.log_slow_request(request, response, stats, view_time)
+        return response
+
+    def log_slow_request(self, request, response, stats, view_time):
+        lines = [
+            f"Slow request: {request.method} {request.get_full_path()} -> "
+            f"{response.status_code} in {view_time * 1000:.1f} ms, "
+            f"{stats.query_count} queries in {stats.db_time * 1000:.1f} ms, "
+            f"serializers {stats.serializer_time * 1000:.1f} ms"
+        ]
+        for sql, params, duration in stats.queries:
+            lines.append(f"  [{duration * 1000:.2f} ms] {sql} {params!r}")
+        if stats.query_count > len(stats.queries):
+            lines.append(f"  ... {stats.query_count - len(stats.queries)} more")
+        logger.warning("\n".join(lines))
+
+
+class CanReadMetrics(BasePermission):
+    """
+    Lets staff users, authenticated like the rest of the API, and clients
+    from METRICS_ALLOWED_IPS (e.g. the Prometheus server) read the metrics.
+    """
+
+    def has_permission(self, request, view):
+        if request.META.get("REMOTE_ADDR") in getattr(
+            settings, "METRICS_ALLOWED_IPS", ()
+        ):
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+@api_view(["GET"])
+@permission_classes([CanReadMetrics])
+def metrics_view(request):
+    """
+    Serves the per-endpoint totals in the Prometheus text format.
+    """
+    return HttpResponse(
+        endpoint_metrics.render(), content_type="text/plain; version=0.0.4"
+    )
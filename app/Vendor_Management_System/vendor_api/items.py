@@ -0,0 +1,51 @@
+"""
+Keeps the PurchaseOrderItem lines in step with PurchaseOrder.items.
+
+The lines of an order are replaced as a whole whenever its items change: by
+the post_save receiver for single saves, and by the bulk write paths, which
+bypass it. backfill_purchase_order_items builds them for existing rows.
+"""
+
+from .models import PurchaseOrderItem
+
+BATCH_SIZE = 1000
+
+
+def replace_item_lines(orders, created=False, batch_size=BATCH_SIZE):
+    """
+    Writes the lines of the given orders, replacing the ones they had.
+    Args: orders: Saved purchase orders with their items loaded.
+          created: Whether the orders were just inserted and have no lines yet.
+          batch_size: Number of rows per DELETE/INSERT statement.
+    Returns: The number of lines written.
+    """
+    if not created:
+        order_ids = [order.pk for order in orders]
+        for start in range(0, len(order_ids), batch_size):
+            PurchaseOrderItem.objects.filter(
+                purchase_order_id__in=order_ids[start : start + batch_size]
+            ).delete()
+    lines = []
+    for order in orders:
+        item_lines = order.get_item_lines()
+        order._loaded_item_lines = item_lines
+        lines.extend(
+            PurchaseOrderItem(
+                purchase_order_id=order.pk, position=position, sku=sku, name=name
+            )
+            for position, sku, name in item_lines
+        )
+    PurchaseOrderItem.objects.bulk_create(lines, batch_size=batch_size)
+    return len(lines)
+
+
+def items_changed(order):
+    """
+    Returns: Whether the item lines of a saved order differ from the ones
+             written for it, as far as the instance knows.
+    """
+    if order.__dict__.get("_item_lines_pending"):
+        # The items were neither read nor assigned since the row was loaded.
+        return False
+    lines = order.get_item_lines()
+    return lines is not None and lines != getattr(order, "_loaded_item_lines", None)
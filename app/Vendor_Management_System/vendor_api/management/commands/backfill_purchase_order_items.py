@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from vendor_api.items import replace_item_lines
+from vendor_api.models import PurchaseOrder
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the item lines behind the ?sku= and ?item_name= purchase order "
+        "filters from the items of existing orders, one chunk of orders at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of purchase orders per chunk and transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--start-after",
+            type=int,
+            default=0,
+            help="Only process orders with a higher id, to resume an interrupted run.",
+        )
+
+    def handle(self, *args, batch_size, start_after, **options):
+        if batch_size <= 0:
+            raise CommandError("--batch-size must be positive.")
+        queryset = PurchaseOrder.objects.only("id", "items").order_by("id")
+        last_id = start_after
+        orders_done = lines_done = 0
+        while True:
+            # Keyset pagination: every chunk is an index range scan, however
+            # far the run has got.
+            with transaction.atomic():
+                orders = list(queryset.filter(id__gt=last_id)[:batch_size])
+                if not orders:
+                    break
+                lines_done += replace_item_lines(orders, batch_size=batch_size)
+            orders_done += len(orders)
+            last_id = orders[-1].id
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Processed orders up to id {last_id}.")
+        self.stdout.write(
+            f"Wrote {lines_done} item lines for {orders_done} purchase orders."
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from vendor_api.metrics import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds every vendor's metric counters from its purchase orders in one "
+        "grouped pass and refreshes the performance rates that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the vendors whose counters or rates drifted.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of counter rows per UPDATE (default: 1000).",
+        )
+
+    def handle(self, *args, dry_run, batch_size, **options):
+        drift = reconcile_counters(dry_run=dry_run, batch_size=batch_size)
+        for vendor_id, changes in sorted(drift.items()):
+            details = ", ".join(
+                f"{field} {stored} -> {actual}"
+                for field, (stored, actual) in changes.items()
+            )
+            self.stdout.write(f"Vendor {vendor_id}: {details}")
+        action = "Found" if dry_run else "Repaired"
+        self.stdout.write(f"{action} drift in {len(drift)} vendors.")
@@ -0,0 +1,213 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from vendor_api import metrics
+from vendor_api.changes import log_changes
+from vendor_api.items import replace_item_lines
+from vendor_api.models import PurchaseOrder, Vendor, VendorMetricCounters
+
+STATUS_WEIGHTS = {"completed": 70, "pending": 20, "canceled": 10}
+
+
+def zipf_weights(count, skew):
+    """
+    Returns: Weights following a Zipf distribution, so that a few items
+    account for most draws.
+    """
+    return [1 / rank**skew for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds the database with synthetic vendors and purchase orders. Orders "
+        "are spread over vendors and items with a Zipf skew, like real traffic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vendors", type=int, default=100, help="Number of vendors (default: 100)."
+        )
+        parser.add_argument(
+            "--orders",
+            type=int,
+            default=10000,
+            help="Number of purchase orders (default: 10000).",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of the orders per vendor and item (default: 1.1).",
+        )
+        parser.add_argument(
+            "--skus",
+            type=int,
+            default=500,
+            help="Number of distinct items (default: 500).",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Spread order dates over this many past days (default: 365).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed (default: 0)."
+        )
+        parser.add_argument(
+            "--prefix",
+            default="SEED",
+            help="Prefix of the generated vendor codes and po numbers (default: SEED).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows per INSERT (default: 1000).",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the data seeded earlier with the same prefix first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["vendors"] <= 0 or options["orders"] < 0:
+            raise CommandError("--vendors must be positive and --orders not negative.")
+        prefix = options["prefix"]
+        seeded_vendors = Vendor.objects.filter(vendor_code__startswith=f"{prefix}-")
+        if options["clear"]:
+            seeded_vendors.delete()
+        elif seeded_vendors.exists():
+            raise CommandError(
+                f"Vendors prefixed {prefix!r} exist already; use --clear to replace them."
+            )
+
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            vendors = self.create_vendors(rng, options)
+            created = self.create_purchase_orders(rng, vendors, options)
+        self.stdout.write(
+            f"Seeded {len(vendors)} vendors and {created} purchase orders."
+        )
+
+    def create_vendors(self, rng, options):
+        prefix = options["prefix"]
+        vendors = Vendor.objects.bulk_create(
+            [
+                Vendor(
+                    name=f"{prefix} Vendor {number}",
+                    contact_details=f"vendor{number}@example.com",
+                    address=f"{number} Supply Street",
+                    vendor_code=f"{prefix}-{number:06d}",
+                )
+                for number in range(options["vendors"])
+            ],
+            batch_size=options["batch_size"],
+        )
+        if any(vendor.pk is None for vendor in vendors):
+            # Backends that cannot return the ids of bulk inserted rows.
+            vendors = list(
+                Vendor.objects.filter(vendor_code__startswith=f"{prefix}-").order_by(
+                    "vendor_code"
+                )
+            )
+        # bulk_create skips the post_save receiver that creates the counters.
+        VendorMetricCounters.objects.bulk_create(
+            [VendorMetricCounters(vendor=vendor) for vendor in vendors],
+            batch_size=options["batch_size"],
+        )
+        return vendors
+
+    def create_purchase_orders(self, rng, vendors, options):
+        now = timezone.now()
+        vendor_weights = zipf_weights(len(vendors), options["skew"])
+        sku_weights = zipf_weights(options["skus"], options["skew"])
+        # Each vendor gets its own typical rating and lead time.
+        profiles = {
+            vendor.pk: (rng.uniform(2.5, 5.0), rng.uniform(2, 15)) for vendor in vendors
+        }
+
+        created = 0
+        batch_size = options["batch_size"]
+        for start in range(0, options["orders"], batch_size):
+            count = min(batch_size, options["orders"] - start)
+            orders = []
+            for number, vendor in zip(
+                range(start, start + count),
+                rng.choices(vendors, weights=vendor_weights, k=count),
+            ):
+                rating, lead_days = profiles[vendor.pk]
+                order_date = now - timedelta(
+                    seconds=rng.uniform(0, options["days"] * 86400)
+                )
+                status = rng.choices(
+                    list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values())
+                )[0]
+                items = [
+                    {
+                        "sku": f"SKU-{sku:05d}",
+                        "name": f"Item {sku}",
+                        "quantity": rng.randint(1, 20),
+                        "unit_price": round(rng.uniform(1, 200), 2),
+                    }
+                    for sku in rng.choices(
+                        range(options["skus"]), weights=sku_weights, k=rng.randint(1, 5)
+                    )
+                ]
+                delivery_date = order_date + timedelta(
+                    days=rng.expovariate(1 / lead_days)
+                )
+                completed_at = None
+                if status == "completed":
+                    # Vendors miss their delivery date now and then.
+                    completed_at = min(
+                        delivery_date + timedelta(days=rng.gauss(-1, 2)), now
+                    )
+                acknowledgment_date = None
+                if status != "pending" or rng.random() < 0.5:
+                    acknowledgment_date = order_date + timedelta(
+                        hours=rng.lognormvariate(2, 1)
+                    )
+                orders.append(
+                    PurchaseOrder(
+                        po_number=f"{options['prefix']}-PO-{number:08d}",
+                        vendor=vendor,
+                        order_date=order_date,
+                        delivery_date=delivery_date,
+                        items=items,
+                        quantity=sum(item["quantity"] for item in items),
+                        status=status,
+                        quality_rating=(
+                            round(min(max(rng.gauss(rating, 0.7), 1), 5), 1)
+                            if status == "completed" and rng.random() < 0.8
+                            else None
+                        ),
+                        issue_date=order_date,
+                        acknowledgment_date=acknowledgment_date,
+                        completed_at=completed_at,
+                    )
+                )
+                orders[-1].update_completion()
+                orders[-1].update_order_value()
+            PurchaseOrder.objects.bulk_create(orders)
+            if any(order.pk is None for order in orders):
+                # Backends that cannot return the ids of bulk inserted rows.
+                orders = list(
+                    PurchaseOrder.objects.filter(
+                        po_number__in=[order.po_number for order in orders]
+                    )
+                )
+            # bulk_create bypasses the signals that keep the counters, the
+            # item lines and the change log current.
+            metrics.apply_order_changes(
+                [(None, order.get_metric_state()) for order in orders]
+            )
+            replace_item_lines(orders, created=True, batch_size=batch_size)
+            log_changes(orders, "created", batch_size=batch_size)
+            created += len(orders)
+        return created
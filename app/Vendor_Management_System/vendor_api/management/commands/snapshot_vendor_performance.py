@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from vendor_api.history import (
+    RESOLUTIONS,
+    bucket_start,
+    rebuild_rollups,
+    rollup_history,
+    snapshot_vendor_performance,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Records every vendor's performance metrics in HistoricalPerformance, "
+        "once per interval bucket, and rolls the closed hourly, daily and "
+        "weekly buckets up into HistoricalPerformanceRollup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=3600,
+            help="Snapshot bucket length in seconds (default: 3600).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of snapshots per INSERT (default: 1000).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and take a snapshot at the start of every bucket.",
+        )
+        parser.add_argument(
+            "--rebuild-rollups",
+            action="store_true",
+            dest="rebuild",
+            help=(
+                "Roll every closed bucket up again from scratch first, e.g. "
+                "after importing snapshots."
+            ),
+        )
+
+    def handle(self, *args, interval, batch_size, loop, rebuild, **options):
+        if interval <= 0:
+            raise CommandError("--interval must be a positive number of seconds.")
+        if rebuild:
+            self.stdout.write(f"Rebuilt {rebuild_rollups(batch_size)} rollups.")
+
+        while True:
+            date, processed = snapshot_vendor_performance(
+                interval, batch_size=batch_size
+            )
+            self.stdout.write(
+                f"Snapshotted {processed} vendors for {date.isoformat()}."
+            )
+            # The first run rolls up the existing history, a day at a time.
+            rolled = sum(
+                rollup_history(resolution, batch_size=batch_size)
+                for resolution in RESOLUTIONS
+            )
+            if rolled:
+                self.stdout.write(f"Wrote {rolled} rollups of closed buckets.")
+            if not loop:
+                return
+            next_bucket = bucket_start(timezone.now(), interval).timestamp() + interval
+            time.sleep(max(next_bucket - time.time(), 0))
@@ -0,0 +1,468 @@
+"""
+Incremental vendor performance metrics.
+
+Every purchase order contributes a handful of counters to its vendor (see
+``order_contribution``). When an order is saved or deleted, only the
+difference between its previous and its new contribution is applied to the
+vendor's ``VendorMetricCounters`` row, and the four performance rates are
+derived from those counters. The same row holds the vendor's order summary:
+its per-status counts, open order value and latest order and acknowledgment
+dates (see ``collect_latest``). No write ever scans the vendor's order
+history; only taking away a vendor's latest date looks up the next one,
+through an index.
+
+Counter deltas are applied in the writing transaction with F() expressions,
+so concurrent writers never overwrite each other's updates, and the deltas
+are computed against the order row as read under a lock (see
+PurchaseOrder.save), so concurrent writes to one order apply in turn. The
+performance endpoint derives the rates from the counters on read. The copies
+of the rates and the summary on the Vendor row (used for listing, sorting and
+snapshots) are refreshed after the transaction commits. Refreshes are
+coalesced per vendor: they run once per vendor and transaction ("on_commit"
+mode), or on a background thread that drains a deduplicated queue
+("background" mode), as set by the VENDOR_METRICS_REFRESH_MODE setting. Only
+"background" mode takes the refresh out of the request; the default,
+"on_commit", still runs it before the response is returned, in exchange for
+the copies being current as soon as the write returns.
+
+If the counters ever drift from the orders (e.g. after raw SQL edits),
+reconcile_counters() rebuilds them in one grouped pass.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import (
+    Count,
+    DateTimeField,
+    F,
+    Max,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import PurchaseOrder, Vendor, VendorMetricCounters
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = (
+    "total_orders",
+    "completed_orders",
+    "on_time_orders",
+    "rating_count",
+    "rating_sum",
+    "response_count",
+    "response_time_sum",
+    "pending_orders",
+    "canceled_orders",
+    "open_order_value",
+)
+
+# The latest dates kept on the counters, and the order fields they track.
+LATEST_FIELDS = {
+    "last_order_date": "order_date",
+    "last_acknowledgment_date": "acknowledgment_date",
+}
+
+
+def order_contribution(state):
+    """
+    Computes what a single purchase order adds to its vendor's counters.
+    Args: state: A metric state dict (see PurchaseOrder.get_metric_state) or None.
+    Returns: A dict of counter deltas (empty for None).
+    """
+    if state is None:
+        return {}
+
+    contribution = {"total_orders": 1}
+    if state["status"] == "pending":
+        contribution["pending_orders"] = 1
+        contribution["open_order_value"] = state["order_value"]
+    elif state["status"] == "canceled":
+        contribution["canceled_orders"] = 1
+    elif state["status"] == "completed":
+        contribution["completed_orders"] = 1
+        if state["on_time"]:
+            contribution["on_time_orders"] = 1
+        if state["quality_rating"] is not None:
+            contribution["rating_count"] = 1
+            contribution["rating_sum"] = state["quality_rating"]
+    if state["acknowledgment_date"] is not None:
+        # The state of an unsaved order may hold the strings it was given.
+        response_time = PurchaseOrder.to_datetime(
+            "acknowledgment_date", state["acknowledgment_date"]
+        ) - PurchaseOrder.to_datetime("issue_date", state["issue_date"])
+        contribution["response_count"] = 1
+        contribution["response_time_sum"] = response_time.total_seconds()
+    return contribution
+
+
+def collect_deltas(changes):
+    """
+    Sums the counter deltas of several purchase order state changes.
+    Args: changes: Iterable of (old_state, new_state) pairs; either may be None.
+    Returns: A dict mapping vendor ids to their non-zero counter deltas.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for old_state, new_state in changes:
+        if old_state is not None:
+            for field, value in order_contribution(old_state).items():
+                deltas[old_state["vendor_id"]][field] -= value
+        if new_state is not None:
+            for field, value in order_contribution(new_state).items():
+                deltas[new_state["vendor_id"]][field] += value
+
+    return {
+        vendor_id: {field: value for field, value in delta.items() if value}
+        for vendor_id, delta in deltas.items()
+    }
+
+
+def collect_latest(changes):
+    """
+    Works out how several purchase order state changes move their vendors'
+    LATEST_FIELDS. A date that an order takes away (by leaving the vendor, or
+    moving back or losing its date) may have been the vendor's latest, so it
+    is looked up again; otherwise the latest date can only move forward.
+    Args: changes: Iterable of (old_state, new_state) pairs; either may be None.
+    Returns: A dict mapping vendor ids to {field: date}, where the date is the
+             latest new one, or None if the field must be looked up again.
+    """
+    latest = defaultdict(dict)
+    for old_state, new_state in changes:
+        old_vendor = old_state and old_state["vendor_id"]
+        new_vendor = new_state and new_state["vendor_id"]
+        for field, state_field in LATEST_FIELDS.items():
+            # The state of an unsaved order may hold the strings it was given.
+            old = old_state and PurchaseOrder.to_datetime(
+                state_field, old_state[state_field]
+            )
+            new = new_state and PurchaseOrder.to_datetime(
+                state_field, new_state[state_field]
+            )
+            moved = new_vendor != old_vendor
+            if old is not None and (new is None or new < old or moved):
+                latest[old_vendor][field] = None
+            if new is not None and (old is None or new > old or moved):
+                vendor_latest = latest[new_vendor]
+                if field not in vendor_latest:
+                    vendor_latest[field] = new
+                elif vendor_latest[field] is not None:
+                    vendor_latest[field] = max(vendor_latest[field], new)
+    return latest
+
+
+def get_latest_expression(vendor_id, field, date):
+    """
+    Returns: The expression updating one of a vendor's LATEST_FIELDS to a new
+             date, or to the latest date of its orders if date is None.
+    """
+    if date is None:
+        state_field = LATEST_FIELDS[field]
+        return Subquery(
+            PurchaseOrder.objects.filter(
+                vendor_id=vendor_id, **{f"{state_field}__isnull": False}
+            )
+            .order_by(f"-{state_field}")
+            .values(state_field)[:1]
+        )
+    # Typed, so that SQLite compares it with the column as a datetime.
+    date = Value(date, output_field=DateTimeField())
+    # Greatest() is NULL on SQLite if the vendor has no date yet.
+    return Coalesce(Greatest(F(field), date), date)
+
+
+def apply_counter_delta(vendor_id, delta, latest=None):
+    """
+    Adds a counter delta to a vendor's counters row, and moves its latest
+    dates (see collect_latest), with a single UPDATE.
+    """
+    if not delta and not latest:
+        return
+    changes = {field: F(field) + value for field, value in delta.items()}
+    for field, date in (latest or {}).items():
+        changes[field] = get_latest_expression(vendor_id, field, date)
+    changes["updated_at"] = timezone.now()
+    if not VendorMetricCounters.objects.filter(vendor_id=vendor_id).update(**changes):
+        VendorMetricCounters.objects.get_or_create(vendor_id=vendor_id)
+        VendorMetricCounters.objects.filter(vendor_id=vendor_id).update(**changes)
+
+
+def refresh_vendor_metrics(vendor_ids):
+    """
+    Recomputes the vendors' four performance rates and order summary from
+    their counters. The counter rows are locked while the copies are
+    written, so that a refresh that read older counters can never overwrite
+    the copies written by one that read newer counters, and no counter delta
+    lands in between.
+    Returns: A dict mapping the vendor ids to the values written to their rows.
+    """
+    written = {}
+    with transaction.atomic():
+        counters = {
+            counters.vendor_id: counters
+            for counters in VendorMetricCounters.objects.select_for_update()
+            .filter(vendor_id__in=vendor_ids)
+            .order_by("vendor_id")
+        }
+        for vendor_id in sorted(vendor_ids):
+            vendor_counters = counters.get(
+                vendor_id, VendorMetricCounters(vendor_id=vendor_id)
+            )
+            values = {
+                **vendor_counters.get_performance_metrics(),
+                **vendor_counters.get_order_summary(),
+            }
+            Vendor.objects.filter(pk=vendor_id).update(
+                **values, updated_at=timezone.now()
+            )
+            written[vendor_id] = values
+    return written
+
+
+def get_vendor_counters(vendor_id):
+    """
+    Loads a vendor's counters, from which its performance rates are derived.
+    Returns: The counters row, an unsaved empty one if the vendor has none,
+             or None if the vendor does not exist.
+    """
+    counters = VendorMetricCounters.objects.filter(vendor_id=vendor_id).first()
+    if counters is None:
+        if not Vendor.objects.filter(pk=vendor_id).exists():
+            return None
+        counters = VendorMetricCounters(vendor_id=vendor_id)
+    return counters
+
+
+def refresh_vendors(vendor_ids):
+    if vendor_ids:
+        refresh_vendor_metrics(vendor_ids)
+
+
+class BackgroundRefresher:
+    """
+    Refreshes vendor rates on a worker thread. Vendor ids submitted while a
+    refresh is pending are merged, so a burst of writes for one vendor costs
+    a single refresh.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = None
+
+    def submit(self, vendor_ids):
+        with self._lock:
+            self._pending.update(vendor_ids)
+            self._idle.clear()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="vendor-metrics-refresh", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def wait_until_idle(self, timeout=None):
+        """
+        Blocks until every submitted vendor has been refreshed.
+        Returns: False if the timeout expired first.
+        """
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self.delay:
+                # Let a burst of commits accumulate before refreshing.
+                time.sleep(self.delay)
+            with self._lock:
+                vendor_ids, self._pending = self._pending, set()
+            try:
+                close_old_connections()
+                refresh_vendors(vendor_ids)
+            except Exception:
+                logger.exception("Refreshing vendor metrics failed: %s", vendor_ids)
+            with self._lock:
+                if not self._pending:
+                    self._idle.set()
+
+
+background_refresher = BackgroundRefresher(
+    delay=getattr(settings, "VENDOR_METRICS_REFRESH_DELAY", 0.0)
+)
+_local = threading.local()
+
+
+def _flush_pending_refreshes():
+    pending = getattr(_local, "pending", None)
+    if not pending:
+        return
+    vendor_ids = set(pending)
+    pending.clear()
+    if getattr(settings, "VENDOR_METRICS_REFRESH_MODE", "on_commit") == "background":
+        background_refresher.submit(vendor_ids)
+    else:
+        refresh_vendors(vendor_ids)
+
+
+def schedule_refresh(vendor_ids):
+    """
+    Marks vendors whose rates must be refreshed once the current transaction
+    commits. Ids are collected per thread, so each vendor is refreshed once
+    however many of its orders the transaction wrote.
+    """
+    if not hasattr(_local, "pending"):
+        _local.pending = set()
+    _local.pending.update(vendor_ids)
+    transaction.on_commit(_flush_pending_refreshes)
+
+
+def apply_order_changes(changes):
+    """
+    Applies purchase order state changes to the affected vendors' counters and
+    schedules one rate refresh per affected vendor.
+    Args: changes: Iterable of (old_state, new_state) pairs; either may be None.
+    Returns: The ids of the vendors whose counters changed.
+    """
+    changes = list(changes)
+    deltas = collect_deltas(changes)
+    latest = collect_latest(changes)
+    changed = []
+    for vendor_id in sorted(deltas.keys() | latest.keys()):
+        delta, vendor_latest = deltas.get(vendor_id), latest.get(vendor_id)
+        if not delta and not vendor_latest:
+            continue
+        apply_counter_delta(vendor_id, delta or {}, vendor_latest)
+        changed.append(vendor_id)
+    if changed:
+        schedule_refresh(changed)
+    return changed
+
+
+def aggregate_counters():
+    """
+    Computes every vendor's counters and latest dates from its purchase
+    orders in one grouped query, following the same rules as
+    order_contribution() and collect_latest().
+    Returns: A dict mapping vendor ids to their counter values.
+    """
+    completed = Q(status="completed")
+    pending = Q(status="pending")
+    acknowledged = Q(acknowledgment_date__isnull=False)
+    rows = (
+        PurchaseOrder.objects.values("vendor_id")
+        .order_by()
+        .annotate(
+            total_orders=Count("id"),
+            pending_orders=Count("id", filter=pending),
+            canceled_orders=Count("id", filter=Q(status="canceled")),
+            open_order_value=Sum("order_value", filter=pending),
+            last_order_date=Max("order_date"),
+            last_acknowledgment_date=Max("acknowledgment_date"),
+            completed_orders=Count("id", filter=completed),
+            on_time_orders=Count("id", filter=completed & Q(on_time=True)),
+            rating_count=Count(
+                "id", filter=completed & Q(quality_rating__isnull=False)
+            ),
+            rating_sum=Sum("quality_rating", filter=completed),
+            response_count=Count("id", filter=acknowledged),
+            response_time=Sum(
+                F("acknowledgment_date") - F("issue_date"), filter=acknowledged
+            ),
+        )
+    )
+    counters = {}
+    for row in rows:
+        response_time = row.pop("response_time")
+        row["rating_sum"] = row["rating_sum"] or 0.0
+        row["open_order_value"] = row["open_order_value"] or 0
+        row["response_time_sum"] = (
+            response_time.total_seconds() if response_time else 0.0
+        )
+        counters[row.pop("vendor_id")] = row
+    return counters
+
+
+def reconcile_counters(dry_run=False, batch_size=1000):
+    """
+    Rebuilds the counters of every vendor from its purchase orders and
+    refreshes the rates and summary of the vendors whose counters or copies
+    were off. The counter rows are locked first. Order writes that commit
+    during the rebuild then apply their deltas after it, instead of being
+    lost.
+    Args: dry_run: Only report the drift, without writing anything.
+          batch_size: Number of rows per UPDATE/INSERT statement.
+    Returns: A dict mapping the ids of the drifted vendors to
+             {field: (stored value, actual value)}.
+    """
+    drift = {}
+    with transaction.atomic():
+        stored = {
+            counters.vendor_id: counters
+            for counters in VendorMetricCounters.objects.select_for_update()
+        }
+        actual = aggregate_counters()
+
+        to_update = []
+        to_create = []
+        copied_fields = (*Vendor.PERFORMANCE_FIELDS, *Vendor.SUMMARY_FIELDS)
+        for vendor_id, *copies in Vendor.objects.values_list(
+            "pk", *copied_fields
+        ).iterator():
+            counters = stored.get(vendor_id)
+            if counters is None:
+                counters = VendorMetricCounters(vendor_id=vendor_id)
+                to_create.append(counters)
+            values = actual.get(vendor_id, {})
+            changes = {}
+            for field in COUNTER_FIELDS:
+                value = values.get(field, 0)
+                if not math.isclose(
+                    getattr(counters, field), value, rel_tol=1e-9, abs_tol=1e-6
+                ):
+                    changes[field] = (getattr(counters, field), value)
+                    setattr(counters, field, value)
+            for field in LATEST_FIELDS:
+                value = values.get(field)
+                if getattr(counters, field) != value:
+                    changes[field] = (getattr(counters, field), value)
+                    setattr(counters, field, value)
+            if changes and vendor_id in stored:
+                to_update.append(counters)
+            values = {
+                **counters.get_performance_metrics(),
+                **counters.get_order_summary(),
+            }
+            for field, stored_value in zip(copied_fields, copies):
+                if stored_value != values[field]:
+                    # A drifted counter of the same name is reported already.
+                    changes.setdefault(field, (stored_value, values[field]))
+            if changes:
+                drift[vendor_id] = changes
+
+        if not dry_run:
+            VendorMetricCounters.objects.bulk_create(to_create, batch_size=batch_size)
+            now = timezone.now()
+            for counters in to_update:
+                counters.updated_at = now
+            VendorMetricCounters.objects.bulk_update(
+                to_update,
+                [*COUNTER_FIELDS, *LATEST_FIELDS, "updated_at"],
+                batch_size=batch_size,
+            )
+            schedule_refresh(list(drift))
+    return drift
@@ -0,0 +1,84 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+
+def build_counters(apps, schema_editor):
+    """
+    Seeds the counters of existing vendors from their purchase orders in one
+    grouped pass.
+    """
+    Vendor = apps.get_model("vendor_api", "Vendor")
+    PurchaseOrder = apps.get_model("vendor_api", "PurchaseOrder")
+    VendorMetricCounters = apps.get_model("vendor_api", "VendorMetricCounters")
+
+    completed = Q(status="completed")
+    acknowledged = Q(acknowledgment_date__isnull=False)
+    rows = (
+        PurchaseOrder.objects.values("vendor_id")
+        .order_by()
+        .annotate(
+            total_orders=Count("id"),
+            completed_orders=Count("id", filter=completed),
+            on_time_orders=Count(
+                "id",
+                filter=completed & Q(delivery_date__date__gte=timezone.now()),
+            ),
+            rating_count=Count(
+                "id", filter=completed & Q(quality_rating__isnull=False)
+            ),
+            rating_sum=Sum("quality_rating", filter=completed),
+            response_count=Count("id", filter=acknowledged),
+            response_time=Sum(
+                F("acknowledgment_date") - F("issue_date"), filter=acknowledged
+            ),
+        )
+    )
+    counters = {row.pop("vendor_id"): row for row in rows}
+
+    objs = []
+    for vendor_id in Vendor.objects.values_list("id", flat=True):
+        row = counters.get(vendor_id, {})
+        response_time = row.pop("response_time", None)
+        row["rating_sum"] = row.get("rating_sum") or 0.0
+        row["response_time_sum"] = (
+            response_time.total_seconds() if response_time else 0.0
+        )
+        objs.append(VendorMetricCounters(vendor_id=vendor_id, **row))
+    VendorMetricCounters.objects.bulk_create(objs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendorMetricCounters",
+            fields=[
+                (
+                    "vendor",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="metric_counters",
+                        serialize=False,
+                        to="vendor_api.vendor",
+                    ),
+                ),
+                ("total_orders", models.PositiveIntegerField(default=0)),
+                ("completed_orders", models.PositiveIntegerField(default=0)),
+                ("on_time_orders", models.PositiveIntegerField(default=0)),
+                ("rating_count", models.PositiveIntegerField(default=0)),
+                ("rating_sum", models.FloatField(default=0.0)),
+                ("response_count", models.PositiveIntegerField(default=0)),
+                ("response_time_sum", models.FloatField(default=0.0)),
+            ],
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0002_vendormetriccounters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="historicalperformance",
+            index=models.Index(fields=["vendor", "-date"], name="hp_vendor_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=["vendor", "status", "delivery_date"],
+                name="po_vendor_status_delivery_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                condition=models.Q(("quality_rating__isnull", False)),
+                fields=["vendor", "status", "quality_rating"],
+                name="po_vendor_rated_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                condition=models.Q(("acknowledgment_date__isnull", False)),
+                fields=["vendor", "acknowledgment_date", "issue_date"],
+                name="po_vendor_acknowledged_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="purchaseorder",
+            name="vendor",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="vendor_api.vendor",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0003_purchase_order_metric_indexes"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="historicalperformance",
+            constraint=models.UniqueConstraint(
+                fields=("vendor", "date"), name="hp_vendor_date_unique"
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="historicalperformance",
+            name="hp_vendor_date_idx",
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.0.4 on 2026-10-18 17:55
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_completion(apps, schema_editor):
+    """
+    Completion times were not recorded so far, so completed orders are taken
+    as completed now. Their on-time flag then matches what the counters held
+    (a delivery date no earlier than today), and the on-time counters and rates
+    are rebuilt from the flags so that they stop drifting from here on.
+    """
+    PurchaseOrder = apps.get_model("vendor_api", "PurchaseOrder")
+    Vendor = apps.get_model("vendor_api", "Vendor")
+    VendorMetricCounters = apps.get_model("vendor_api", "VendorMetricCounters")
+
+    now = timezone.now()
+    start_of_today = timezone.make_aware(
+        datetime.datetime.combine(timezone.localdate(now), datetime.time.min)
+    )
+    completed = PurchaseOrder.objects.filter(status="completed")
+    completed.update(completed_at=now, on_time=False)
+    completed.filter(delivery_date__gte=start_of_today).update(on_time=True)
+
+    on_time_orders = (
+        PurchaseOrder.objects.filter(vendor=OuterRef("vendor"), on_time=True)
+        .order_by()
+        .values("vendor")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    VendorMetricCounters.objects.update(
+        on_time_orders=Coalesce(Subquery(on_time_orders), 0)
+    )
+    for counters in VendorMetricCounters.objects.filter(completed_orders__gt=0):
+        Vendor.objects.filter(pk=counters.vendor_id).update(
+            on_time_delivery_rate=round(
+                counters.on_time_orders / counters.completed_orders * 100, 2
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0004_historical_performance_unique_bucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="on_time",
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_completion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=["vendor", "status", "on_time"],
+                name="po_vendor_status_ontime_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="purchaseorder",
+            name="po_vendor_status_delivery_idx",
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0005_purchase_order_completion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PurchaseOrderItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("sku", models.CharField(blank=True, max_length=100)),
+                ("name", models.CharField(blank=True, max_length=255)),
+                (
+                    "purchase_order",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="vendor_api.purchaseorder",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["sku", "purchase_order"], name="poi_sku_idx"),
+                    models.Index(
+                        fields=["name", "purchase_order"], name="poi_name_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="purchaseorderitem",
+            constraint=models.UniqueConstraint(
+                fields=("purchase_order", "position"), name="poi_order_position_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0006_purchase_order_items"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(fields=["order_date", "id"], name="po_order_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=["status", "order_date", "id"], name="po_status_order_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                condition=models.Q(("acknowledgment_date__isnull", True)),
+                fields=["order_date", "id"],
+                name="po_unacknowledged_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(fields=["delivery_date"], name="po_delivery_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                condition=models.Q(("quality_rating__isnull", False)),
+                fields=["quality_rating"],
+                name="po_rating_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,167 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:27
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def price_items(items):
+    # PurchaseOrder.get_order_value() as of this migration.
+    value = Decimal("0")
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            line = Decimal(str(item["quantity"])) * Decimal(str(item["unit_price"]))
+        except (KeyError, ArithmeticError):
+            continue
+        if line.is_finite():
+            value += line
+    return value.quantize(Decimal(".01"))
+
+
+def backfill_order_summary(apps, schema_editor):
+    """
+    Prices the existing orders, then fills in every vendor's order summary
+    from its orders, and copies it onto the vendor, with one UPDATE of
+    correlated subqueries each.
+    """
+    PurchaseOrder = apps.get_model("vendor_api", "PurchaseOrder")
+    Vendor = apps.get_model("vendor_api", "Vendor")
+    VendorMetricCounters = apps.get_model("vendor_api", "VendorMetricCounters")
+
+    priced = []
+    for order in (
+        PurchaseOrder.objects.only("id", "items")
+        .order_by("id")
+        .iterator(chunk_size=1000)
+    ):
+        order.order_value = price_items(order.items)
+        if order.order_value:
+            priced.append(order)
+        if len(priced) == 1000:
+            PurchaseOrder.objects.bulk_update(priced, ["order_value"])
+            priced = []
+    PurchaseOrder.objects.bulk_update(priced, ["order_value"])
+
+    def per_vendor(aggregate):
+        return Subquery(
+            PurchaseOrder.objects.filter(vendor=OuterRef("vendor"))
+            .order_by()
+            .values("vendor")
+            .annotate(value=aggregate)
+            .values("value")
+        )
+
+    pending = Q(status="pending")
+    VendorMetricCounters.objects.update(
+        pending_orders=Coalesce(per_vendor(Count("id", filter=pending)), 0),
+        canceled_orders=Coalesce(
+            per_vendor(Count("id", filter=Q(status="canceled"))), 0
+        ),
+        open_order_value=Coalesce(
+            per_vendor(Sum("order_value", filter=pending)), Decimal("0.00")
+        ),
+        last_order_date=per_vendor(Max("order_date")),
+        last_acknowledgment_date=per_vendor(Max("acknowledgment_date")),
+    )
+
+    counters = VendorMetricCounters.objects.filter(vendor=OuterRef("pk"))
+
+    def copied(field, default=None):
+        value = Subquery(counters.values(field))
+        return value if default is None else Coalesce(value, default)
+
+    Vendor.objects.update(
+        pending_orders=copied("pending_orders", 0),
+        completed_orders=copied("completed_orders", 0),
+        canceled_orders=copied("canceled_orders", 0),
+        open_order_value=copied("open_order_value", Decimal("0.00")),
+        last_order_date=copied("last_order_date"),
+        last_acknowledgment_date=copied("last_acknowledgment_date"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0007_purchase_order_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchaseorder",
+            name="order_value",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=14
+            ),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="canceled_orders",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="completed_orders",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="last_acknowledgment_date",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="last_order_date",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="open_order_value",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=16
+            ),
+        ),
+        migrations.AddField(
+            model_name="vendor",
+            name="pending_orders",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendormetriccounters",
+            name="canceled_orders",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="vendormetriccounters",
+            name="last_acknowledgment_date",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="vendormetriccounters",
+            name="last_order_date",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="vendormetriccounters",
+            name="open_order_value",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=16
+            ),
+        ),
+        migrations.AddField(
+            model_name="vendormetriccounters",
+            name="pending_orders",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="purchaseorder",
+            index=models.Index(
+                fields=["vendor", "order_date", "id"], name="po_vendor_order_date_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_order_summary, migrations.RunPython.noop),
+    ]
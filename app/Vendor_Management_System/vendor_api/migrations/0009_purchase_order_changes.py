@@ -0,0 +1,51 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:31
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0008_vendor_order_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PurchaseOrderChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("purchase_order", models.BigIntegerField()),
+                ("vendor", models.BigIntegerField()),
+                ("po_number", models.CharField(max_length=50)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("updated", "Updated"),
+                            ("deleted", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("changed_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                    ),
+                ),
+            ],
+        ),
+    ]
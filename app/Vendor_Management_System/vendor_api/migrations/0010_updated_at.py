@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0009_purchase_order_changes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vendor",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="vendormetriccounters",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="vendor",
+            index=models.Index(fields=["updated_at"], name="vendor_updated_at_idx"),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.4 on 2026-10-18 18:50
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_changes(apps, schema_editor):
+    """
+    The entries written so far became visible in id order, which is also
+    their sequence.
+    """
+    PurchaseOrderChange = apps.get_model("vendor_api", "PurchaseOrderChange")
+    PurchaseOrderChange.objects.update(seq=F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0010_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchaseorderchange",
+            name="seq",
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="purchaseorderchange",
+            name="transaction_id",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="purchaseorderchange",
+            index=models.Index(
+                condition=models.Q(("seq__isnull", True)),
+                fields=["transaction_id", "id"],
+                name="poc_unsequenced_idx",
+            ),
+        ),
+    ]
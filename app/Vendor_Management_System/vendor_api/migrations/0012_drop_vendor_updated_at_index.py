@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0011_change_sequence"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="vendor",
+            name="vendor_updated_at_idx",
+        ),
+    ]
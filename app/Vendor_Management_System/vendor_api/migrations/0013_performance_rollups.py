@@ -0,0 +1,70 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vendor_api", "0012_drop_vendor_updated_at_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HistoricalPerformanceRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[
+                            ("hourly", "Hourly"),
+                            ("daily", "Daily"),
+                            ("weekly", "Weekly"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("date", models.DateTimeField()),
+                ("samples", models.PositiveIntegerField()),
+                ("on_time_delivery_rate", models.FloatField()),
+                ("quality_rating_avg", models.FloatField()),
+                ("average_response_time", models.FloatField()),
+                ("fulfillment_rate", models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="historicalperformance",
+            index=models.Index(fields=["date"], name="hp_date_idx"),
+        ),
+        migrations.AddField(
+            model_name="historicalperformancerollup",
+            name="vendor",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="vendor_api.vendor",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="historicalperformancerollup",
+            index=models.Index(
+                fields=["resolution", "date"], name="hpr_resolution_date_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="historicalperformancerollup",
+            constraint=models.UniqueConstraint(
+                fields=("vendor", "resolution", "date"), name="hpr_vendor_bucket_unique"
+            ),
+        ),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, router, transaction
 from django.utils import timezone
 from django.db.models import Count, Avg, Sum
+from django.db.models.query_utils import DeferredAttribute
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
@@ -21,9 +24,53 @@ class Vendor(models.Model):
     average_response_time = models.FloatField(default=0.0)
     fulfillment_rate = models.FloatField(default=0.0)
 
+    # Order summary, copied from VendorMetricCounters like the rates, so that
+    # listing and filtering vendors by it reads the vendor table alone.
+    pending_orders = models.PositiveIntegerField(default=0)
+    completed_orders = models.PositiveIntegerField(default=0)
+    canceled_orders = models.PositiveIntegerField(default=0)
+    open_order_value = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal("0.00")
+    )
+    last_order_date = models.DateTimeField(blank=True, null=True)
+    last_acknowledgment_date = models.DateTimeField(blank=True, null=True)
+
+    # Set by every write to the row; the ETag and Last-Modified of the
+    # responses built from it (see vendor_api.cache).
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Derived from VendorMetricCounters and written by vendor_api.metrics only.
+    PERFORMANCE_FIELDS = (
+        "on_time_delivery_rate",
+        "quality_rating_avg",
+        "average_response_time",
+        "fulfillment_rate",
+    )
+    SUMMARY_FIELDS = (
+        "pending_orders",
+        "completed_orders",
+        "canceled_orders",
+        "open_order_value",
+        "last_order_date",
+        "last_acknowledgment_date",
+    )
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # An update of the vendor's details must not write back the rates and
+        # summary it loaded: they may have been refreshed by a concurrent
+        # order write.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            derived = {*self.PERFORMANCE_FIELDS, *self.SUMMARY_FIELDS}
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in derived
+            ]
+        super().save(*args, **kwargs)
+
     def calculate_on_time_delivery_rate(self):
         """
         Calculates the on-time delivery rate for a vendor.
@@ -32,10 +79,7 @@ class Vendor(models.Model):
         completed_orders = PurchaseOrder.objects.filter(vendor=self, status="completed")
         if not completed_orders.count():
             return Decimal("0.00")
-        current_time = timezone.now()
-        on_time_deliveries = completed_orders.filter(
-            delivery_date__date__gte=current_time
-        ).count()
+        on_time_deliveries = completed_orders.filter(on_time=True).count()
         total_completed_orders = completed_orders.count()
 
         if not total_completed_orders:
@@ -72,9 +116,7 @@ class Vendor(models.Model):
         total_orders = PurchaseOrder.objects.filter(vendor=self).count()
         if not total_orders:
             return Decimal("0.00")
-        completed_orders = PurchaseOrder.objects.filter(
-            vendor=self, status="completed"
-        )
+        completed_orders = PurchaseOrder.objects.filter(vendor=self, status="completed")
         fulfilled_orders = completed_orders.count()
         if not total_orders:
             return Decimal("0.00")
@@ -82,16 +124,46 @@ class Vendor(models.Model):
         return Decimal(str(fulfillment_rate)).quantize(Decimal(".01"))
 
 
+class ItemsAttribute(DeferredAttribute):
+    """
+    Access to PurchaseOrder.items that first takes the pending snapshot of the
+    item lines the row was loaded with: reading the items is the only way to
+    change them in place, and assigning them replaces them.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is not None:
+            instance.snapshot_item_lines()
+        return super().__get__(instance, cls)
+
+    def __set__(self, instance, value):
+        instance.snapshot_item_lines()
+        instance.__dict__[self.field.attname] = value
+
+
+class ItemsField(models.JSONField):
+    """
+    JSONField whose attribute keeps the loaded item lines (see ItemsAttribute).
+    """
+
+    descriptor_class = ItemsAttribute
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        return name, "django.db.models.JSONField", args, kwargs
+
+
 class PurchaseOrder(models.Model):
     """
     Model representing a purchase order.
     """
 
     po_number = models.CharField(max_length=50, unique=True)
-    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
+    # Indexed through the composite indexes in Meta, which all lead with vendor.
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, db_index=False)
     order_date = models.DateTimeField(default=timezone.now)
     delivery_date = models.DateTimeField(blank=True, null=True)
-    items = models.JSONField()
+    items = ItemsField()
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     STATUS_CHOICES = (
         ("pending", "Pending"),
@@ -102,10 +174,436 @@ class PurchaseOrder(models.Model):
     quality_rating = models.FloatField(blank=True, null=True)
     issue_date = models.DateTimeField(default=timezone.now)
     acknowledgment_date = models.DateTimeField(blank=True, null=True)
+    # Set when the order is completed (see update_completion).
+    completed_at = models.DateTimeField(blank=True, null=True)
+    on_time = models.BooleanField(blank=True, null=True)
+    # Priced from items on save (see update_order_value).
+    order_value = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00")
+    )
+
+    COMPLETION_FIELDS = ("completed_at", "on_time")
+    # Derived from the other fields on save; never written by clients.
+    DERIVED_FIELDS = (*COMPLETION_FIELDS, "order_value")
+
+    # Fields that determine how a purchase order contributes to its
+    # vendor's performance counters (see vendor_api.metrics).
+    METRIC_STATE_FIELDS = (
+        "vendor_id",
+        "status",
+        "on_time",
+        "quality_rating",
+        "issue_date",
+        "acknowledgment_date",
+        "order_date",
+        "order_value",
+    )
+    # Fields read back, under a row lock, when an order is saved: its metric
+    # state and what update_completion() derives it from.
+    LOCKED_FIELDS = (*METRIC_STATE_FIELDS, "delivery_date", "completed_at")
 
     def __str__(self):
         return f"PO #{self.po_number} - {self.vendor.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the item lines the row was loaded with, so that saving it
+        again only rewrites them if the items changed. They are extracted on
+        the first access to items, so rows whose items are never touched
+        skip it.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._item_lines_pending = True
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        # A partial refresh leaves the other fields as they were, so the
+        # lines are rewritten on the next save.
+        if fields:
+            self._item_lines_pending = False
+            self._loaded_item_lines = None
+        else:
+            self._item_lines_pending = True
+
+    def snapshot_item_lines(self):
+        """
+        Takes the snapshot of the loaded item lines, if it is still pending.
+        """
+        if self.__dict__.pop("_item_lines_pending", False):
+            self._loaded_item_lines = self.get_item_lines()
+
+    def get_metric_state(self):
+        """
+        Returns the values of METRIC_STATE_FIELDS held by this instance, or
+        None if any of them is deferred.
+        """
+        try:
+            return {field: self.__dict__[field] for field in self.METRIC_STATE_FIELDS}
+        except KeyError:
+            return None
+
+    def get_item_lines(self):
+        """
+        Extracts the lines indexed in PurchaseOrderItem from items: the
+        position, SKU and name of every item that has a SKU or a name.
+        Returns: A tuple of (position, sku, name) tuples, or None if items is
+                 deferred.
+        """
+        if "items" not in self.__dict__:
+            return None
+        items = self.items if isinstance(self.items, list) else []
+        lines = []
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            sku, name = item.get("sku"), item.get("name")
+            sku = "" if sku is None else str(sku)[: PurchaseOrderItem.SKU_LENGTH]
+            name = "" if name is None else str(name)[: PurchaseOrderItem.NAME_LENGTH]
+            if sku or name:
+                lines.append((position, sku, name))
+        return tuple(lines)
+
+    def get_order_value(self):
+        """
+        Prices items: the sum of quantity x unit_price over the items that
+        have both as numbers.
+        Returns: The value as a Decimal rounded to cents, or None if items is
+                 deferred.
+        """
+        if "items" not in self.__dict__:
+            return None
+        items = self.items if isinstance(self.items, list) else []
+        value = Decimal("0")
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                line = Decimal(str(item["quantity"])) * Decimal(str(item["unit_price"]))
+            except (KeyError, ArithmeticError):
+                continue
+            if line.is_finite():
+                value += line
+        return value.quantize(Decimal(".01"))
+
+    def update_order_value(self):
+        """
+        Sets order_value from items, unless items is deferred.
+        """
+        value = self.get_order_value()
+        if value is not None:
+            self.order_value = value
+
+    @classmethod
+    def to_datetime(cls, field, value):
+        """
+        Converts a value assigned to one of the datetime fields the way saving
+        it would, so that strings (e.g. "2024-05-10T08:00:00Z") can be
+        compared and subtracted before the order is saved.
+        Args: field: The name of the field.
+              value: A datetime, a date or datetime string, or None.
+        Returns: An aware datetime (naive values are taken in the current time
+                 zone), or None.
+        """
+        value = cls._meta.get_field(field).to_python(value)
+        if value is not None and settings.USE_TZ and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def update_completion(self, now=None):
+        """
+        Stamps completed_at when the order becomes completed and records
+        whether it was completed by its delivery date; clears both for orders
+        that are not completed. The flag only changes with the order itself,
+        so the on-time rate does not drift as time passes.
+        Args: now: The completion time to stamp (default: the current time).
+        """
+        if self.status == "completed":
+            if self.completed_at is None:
+                self.completed_at = now or timezone.now()
+            delivery_date = self.to_datetime("delivery_date", self.delivery_date)
+            completed_at = self.to_datetime("completed_at", self.completed_at)
+            self.on_time = delivery_date is not None and timezone.localdate(
+                delivery_date
+            ) >= timezone.localdate(completed_at)
+        else:
+            self.completed_at = None
+            self.on_time = None
+
+    def lock_row(self, using, saved_fields=None):
+        """
+        Reads the row about to be overwritten with SELECT ... FOR UPDATE, so
+        that concurrent saves of the order apply their counter deltas one
+        after the other, each against the state left by the previous one.
+        The LOCKED_FIELDS that a partial save leaves alone are refreshed from
+        the row, so that the order's new state is the row's.
+        Args: using: The database alias.
+              saved_fields: The attnames being saved, or None for all fields.
+        Returns: The metric state of the row, or None if it does not exist.
+        """
+        row = (
+            PurchaseOrder._base_manager.using(using)
+            .select_for_update()
+            .filter(pk=self.pk)
+            .values(*self.LOCKED_FIELDS)
+            .first()
+        )
+        if row is None:
+            return None
+        if saved_fields is not None:
+            for field in self.LOCKED_FIELDS:
+                if field not in saved_fields:
+                    setattr(self, field, row[field])
+        return {field: row[field] for field in self.METRIC_STATE_FIELDS}
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(PurchaseOrder, instance=self)
+        update_fields = kwargs.get("update_fields")
+        saved_fields = None
+        if update_fields is not None:
+            saved_fields = {
+                self._meta.get_field(name).attname for name in update_fields
+            }
+        elif self.get_deferred_fields() and not self._state.adding:
+            # Django only saves the loaded fields of a partially loaded order.
+            saved_fields = {
+                field.attname
+                for field in self._meta.concrete_fields
+                if field.attname in self.__dict__
+            }
+        if saved_fields is not None and "items" in saved_fields:
+            saved_fields.add("order_value")
+
+        # Keep the row and the metric counters updated by the post_save
+        # receiver in the same transaction. No savepoint is needed: a failure
+        # inside an outer transaction rolls it back as a whole.
+        with transaction.atomic(using=using, savepoint=False):
+            if self.pk is None:
+                self._previous_metric_state = None
+            elif saved_fields is not None and not saved_fields & set(
+                self.LOCKED_FIELDS
+            ):
+                # Leaves the metric state alone: no delta, nothing to lock.
+                self._previous_metric_state = self.get_metric_state()
+            else:
+                self._previous_metric_state = self.lock_row(using, saved_fields)
+
+            deferred = self.get_deferred_fields()
+            if not deferred & {"status", "delivery_date", *self.COMPLETION_FIELDS}:
+                self.update_completion()
+                if update_fields is not None and {"status", "delivery_date"} & set(
+                    update_fields
+                ):
+                    update_fields = {*update_fields, *self.COMPLETION_FIELDS}
+            if "items" not in deferred:
+                self.update_order_value()
+                if update_fields is not None and "items" in update_fields:
+                    update_fields = {*update_fields, "order_value"}
+            if update_fields is not None:
+                kwargs["update_fields"] = update_fields
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(PurchaseOrder, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            # The post_delete receiver removes what the row held when it was
+            # deleted, not what this instance was loaded with.
+            self._deleted_metric_state = self.lock_row(using)
+            return super().delete(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Per-vendor status counts and on-time deliveries.
+            models.Index(
+                fields=["vendor", "status", "on_time"],
+                name="po_vendor_status_ontime_idx",
+            ),
+            # Quality rating average over rated orders.
+            models.Index(
+                fields=["vendor", "status", "quality_rating"],
+                name="po_vendor_rated_idx",
+                condition=models.Q(quality_rating__isnull=False),
+            ),
+            # Response time average over acknowledged orders.
+            models.Index(
+                fields=["vendor", "acknowledgment_date", "issue_date"],
+                name="po_vendor_acknowledged_idx",
+                condition=models.Q(acknowledgment_date__isnull=False),
+            ),
+            # The vendor's latest order (see VendorMetricCounters) and its
+            # orders in the list's (order_date, id) order.
+            models.Index(
+                fields=["vendor", "order_date", "id"], name="po_vendor_order_date_idx"
+            ),
+            # The purchase order list (see filters.filter_purchase_orders):
+            # its default (order_date, id) keyset order and order date ranges,
+            models.Index(fields=["order_date", "id"], name="po_order_date_idx"),
+            # the same within one or a few statuses,
+            models.Index(
+                fields=["status", "order_date", "id"], name="po_status_order_date_idx"
+            ),
+            # the orders waiting for acknowledgement,
+            models.Index(
+                fields=["order_date", "id"],
+                name="po_unacknowledged_idx",
+                condition=models.Q(acknowledgment_date__isnull=True),
+            ),
+            # and delivery date and quality rating ranges.
+            models.Index(fields=["delivery_date"], name="po_delivery_date_idx"),
+            models.Index(
+                fields=["quality_rating"],
+                name="po_rating_idx",
+                condition=models.Q(quality_rating__isnull=False),
+            ),
+        ]
+
+
+class PurchaseOrderItem(models.Model):
+    """
+    One line of a purchase order's items, so that orders can be found by SKU
+    or item name through an index. PurchaseOrder.items stays the source of
+    truth; the lines are rewritten whenever it changes (see vendor_api.items).
+    """
+
+    SKU_LENGTH = 100
+    NAME_LENGTH = 255
+
+    # Indexed through the unique constraint in Meta.
+    purchase_order = models.ForeignKey(
+        PurchaseOrder, on_delete=models.CASCADE, related_name="lines", db_index=False
+    )
+    position = models.PositiveIntegerField()  # Index in PurchaseOrder.items.
+    sku = models.CharField(max_length=SKU_LENGTH, blank=True)
+    name = models.CharField(max_length=NAME_LENGTH, blank=True)
+
+    def __str__(self):
+        return f"Line {self.position} of {self.purchase_order_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["purchase_order", "position"], name="poi_order_position_unique"
+            ),
+        ]
+        indexes = [
+            # Both lead with the looked up value and cover the order id.
+            models.Index(fields=["sku", "purchase_order"], name="poi_sku_idx"),
+            models.Index(fields=["name", "purchase_order"], name="poi_name_idx"),
+        ]
+
+
+class PurchaseOrderChange(models.Model):
+    """
+    One entry of the append-only purchase order change log, written in the
+    transaction that changed the order (see vendor_api.changes). Its seq,
+    given once that transaction has finished, is the sequence number that
+    consumers of the change feed resume from.
+    """
+
+    ACTION_CHOICES = (
+        ("created", "Created"),
+        ("updated", "Updated"),
+        ("deleted", "Deleted"),
+    )
+
+    # Plain ids rather than foreign keys: the entries outlive the order and
+    # its vendor.
+    purchase_order = models.BigIntegerField()
+    vendor = models.BigIntegerField()
+    po_number = models.CharField(max_length=50)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+    # The values written, as the purchase order endpoints render them; null
+    # for deletes.
+    data = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    # Position in the change feed; null until sequenced.
+    seq = models.BigIntegerField(null=True, unique=True)
+    # PostgreSQL transaction id of the write, which orders the entries of
+    # concurrent transactions when they are sequenced; null on SQLite.
+    transaction_id = models.BigIntegerField(null=True)
+
+    class Meta:
+        indexes = [
+            # The entries waiting to be sequenced, in sequencing order.
+            models.Index(
+                fields=["transaction_id", "id"],
+                name="poc_unsequenced_idx",
+                condition=models.Q(seq__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Change {self.pk}: {self.po_number} {self.action}"
+
+
+class VendorMetricCounters(models.Model):
+    """
+    Running totals from which a vendor's performance metrics and order
+    summary are derived. Maintained incrementally on every purchase order
+    write.
+    """
+
+    vendor = models.OneToOneField(
+        Vendor,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="metric_counters",
+    )
+    total_orders = models.PositiveIntegerField(default=0)
+    completed_orders = models.PositiveIntegerField(default=0)
+    on_time_orders = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0.0)
+    response_count = models.PositiveIntegerField(default=0)
+    response_time_sum = models.FloatField(default=0.0)  # In seconds.
+    pending_orders = models.PositiveIntegerField(default=0)
+    canceled_orders = models.PositiveIntegerField(default=0)
+    # Summed order_value of the pending orders.
+    open_order_value = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal("0.00")
+    )
+    last_order_date = models.DateTimeField(blank=True, null=True)
+    last_acknowledgment_date = models.DateTimeField(blank=True, null=True)
+    # Set by every write to the row, like Vendor.updated_at.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Metric counters for {self.vendor_id}"
+
+    def get_performance_metrics(self):
+        """
+        Derives the four vendor performance metrics from the counters.
+        Returns: A dict keyed by the matching Vendor field names.
+        """
+
+        def percentage(part, whole):
+            return round(part / whole * 100, 2) if whole else 0.0
+
+        return {
+            "on_time_delivery_rate": percentage(
+                self.on_time_orders, self.completed_orders
+            ),
+            "quality_rating_avg": (
+                round(self.rating_sum / self.rating_count, 2)
+                if self.rating_count
+                else 0.0
+            ),
+            "average_response_time": (
+                round(self.response_time_sum / self.response_count / 86400, 2)
+                if self.response_count
+                else 0.0
+            ),
+            "fulfillment_rate": percentage(self.completed_orders, self.total_orders),
+        }
+
+    def get_order_summary(self):
+        """
+        Returns: A dict of the vendor's order summary, keyed by the matching
+                 Vendor field names.
+        """
+        return {field: getattr(self, field) for field in Vendor.SUMMARY_FIELDS}
+
 
 class HistoricalPerformance(models.Model):
     """
@@ -124,3 +622,57 @@ class HistoricalPerformance(models.Model):
 
     class Meta:
         ordering = ["-date"]  # Order historical records by date.
+        constraints = [
+            # One snapshot per vendor and bucket; its index also serves the
+            # per-vendor history reads.
+            models.UniqueConstraint(
+                fields=["vendor", "date"], name="hp_vendor_date_unique"
+            ),
+        ]
+        indexes = [
+            # The snapshots of every vendor in a time range, rolled up into
+            # HistoricalPerformanceRollup.
+            models.Index(fields=["date"], name="hp_date_idx"),
+        ]
+
+
+class HistoricalPerformanceRollup(models.Model):
+    """
+    A vendor's HistoricalPerformance snapshots averaged over one hourly, daily
+    or weekly bucket, so that history reads need not aggregate the raw
+    snapshots of closed buckets (see vendor_api.history).
+    """
+
+    RESOLUTION_CHOICES = (
+        ("hourly", "Hourly"),
+        ("daily", "Daily"),
+        ("weekly", "Weekly"),
+    )
+
+    # Indexed through the unique constraint in Meta, which leads with vendor.
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, db_index=False)
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    date = models.DateTimeField()  # Start of the bucket.
+    samples = models.PositiveIntegerField()
+    on_time_delivery_rate = models.FloatField()
+    quality_rating_avg = models.FloatField()
+    average_response_time = models.FloatField()
+    fulfillment_rate = models.FloatField()
+
+    def __str__(self):
+        return (
+            f"{self.resolution} performance for vendor {self.vendor_id} on {self.date}"
+        )
+
+    class Meta:
+        constraints = [
+            # One rollup per vendor and bucket; its index also serves the
+            # per-vendor history reads.
+            models.UniqueConstraint(
+                fields=["vendor", "resolution", "date"], name="hpr_vendor_bucket_unique"
+            ),
+        ]
+        indexes = [
+            # The latest rolled up bucket of a resolution.
+            models.Index(fields=["resolution", "date"], name="hpr_resolution_date_idx"),
+        ]
@@ -0,0 +1,241 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a WHERE clause on the ordering columns of the last
+row seen instead of an OFFSET, so deep pages cost the same as the first one
+and rows inserted while a client is paging neither shift nor repeat rows.
+"""
+
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import JSONField, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite key.
+
+    The ordering is the client's ``?ordering=`` (when the view uses
+    OrderingFilter) or ``ordering``, with the primary key appended as a
+    tie-breaker so the key is always unique. Only non-null columns can be
+    used, as NULLs have no place in a keyset comparison.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE or 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        return self.set_page(list(page_queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Returns the lazily evaluated queryset for the requested page; it holds
+        one extra row that tells whether another page follows.
+        Pass its rows to set_page() before building the response.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering(request, queryset, view)
+        values, self.reverse = self.decode_cursor(request)
+        self.has_cursor = values is not None
+
+        ordering = [
+            (field.attname if descending == self.reverse else "-" + field.attname)
+            for field, descending in self.fields
+        ]
+        queryset = self.load_ordering_fields(queryset).order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.get_keyset_filter(values))
+        return queryset[: self.page_size + 1]
+
+    def load_ordering_fields(self, queryset):
+        """
+        Makes sure the ordering columns are not deferred (see
+        vendor_api.fieldsets), as the cursors are built from them.
+        """
+        names, defer = queryset.query.deferred_loading
+        if not names:
+            return queryset
+        ordering_names = {field.name for field, _ in self.fields}
+        if defer:
+            return queryset.defer(None).defer(*(set(names) - ordering_names))
+        return queryset.only(*names, *ordering_names)
+
+    def set_page(self, rows):
+        """
+        Trims the extra row fetched by get_page_queryset() and works out the
+        neighbouring cursors. Returns: The rows of the page, in order.
+        """
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.has_cursor, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Returns: A list of (model field, descending) pairs ending with the pk.
+        """
+        names = self.ordering
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                requested = backend().get_ordering(request, queryset, view)
+                if requested and request.query_params.get(backend.ordering_param):
+                    names = requested
+                break
+
+        opts = queryset.model._meta
+        fields = []
+        for name in names:
+            descending = name.startswith("-")
+            try:
+                field = opts.get_field(name.lstrip("-"))
+            except FieldDoesNotExist:
+                raise ValidationError({"ordering": [f"Unknown field '{name}'."]})
+            if field.null or isinstance(field, JSONField) or not field.concrete:
+                raise ValidationError(
+                    {"ordering": [f"Cannot paginate on nullable field '{name}'."]}
+                )
+            fields.append((field, descending))
+            if field.primary_key:
+                return fields
+        fields.append((opts.pk, fields[-1][1] if fields else False))
+        return fields
+
+    def get_keyset_filter(self, values):
+        """
+        Builds the row-after-cursor condition: (a > x) or (a = x and b > y) ...
+        with the comparison flipped for descending fields and backward pages.
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for (field, descending), value in zip(self.fields, values):
+            lookup = "lt" if descending != self.reverse else "gt"
+            condition |= equal_so_far & Q(**{f"{field.attname}__{lookup}": value})
+            equal_so_far &= Q(**{field.attname: value})
+        return condition
+
+    def decode_cursor(self, request):
+        """
+        Returns: The key values of the cursor (None for the first page) and
+        whether it points backwards.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode("ascii")).decode("utf-8"))
+            raw_values = cursor["v"]
+            if len(raw_values) != len(self.fields):
+                raise ValueError
+            values = [
+                field.to_python(raw) for (field, _), raw in zip(self.fields, raw_values)
+            ]
+            return values, bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field, _ in self.fields:
+            value = self.get_row_value(row, field)
+            # Full precision: DjangoJSONEncoder would drop the microseconds.
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        payload = json.dumps({"v": values, "r": int(reverse)})
+        encoded = b64encode(payload.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def get_row_value(row, field):
+        if isinstance(row, dict):
+            return row[field.attname] if field.attname in row else row[field.name]
+        return getattr(row, field.attname)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class PurchaseOrderPagination(KeysetPagination):
+    """
+    Pages purchase orders by (order_date, id) unless another ordering is requested.
+    """
+
+    ordering = ("order_date", "id")
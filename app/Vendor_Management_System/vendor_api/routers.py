@@ -0,0 +1,139 @@
+"""
+Read replica routing.
+
+ReplicaRoutingMiddleware marks the GET requests of the vendor, purchase
+order and performance endpoints listed in REPLICA_READ_VIEWS, and
+ReplicaRouter sends the reads of marked requests to the replica database
+(REPLICA_DATABASE), when one is configured. Everything else, including every
+read made while handling a write, goes to the primary.
+
+A client that wrote through the API gets a cookie that keeps its reads on
+the primary for REPLICA_STICKY_SECONDS, so it sees its own writes even if
+the replica lags behind.
+"""
+
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, get_resolver
+from rest_framework.permissions import SAFE_METHODS
+
+STICKY_COOKIE = "vms_primary"
+
+# The url names of the endpoints whose GET requests may be served from the
+# replica. The vendor detail and performance endpoints are left out: they
+# answer conditional GETs with validators taken from the row they read, which
+# would move back and forth between versions as successive requests of a
+# client land on the primary and on a lagging replica.
+REPLICA_READ_VIEWS = frozenset(
+    {
+        "vendor-create-list",
+        "vendor-performance-leaderboard",
+        "vendor-performance-history",
+        "purchase-order-create-list",
+        "purchase-order-read-update-delete",
+        "purchase-order-export",
+        "historical-performance-export",
+        "async-vendor-list",
+        "async-vendor-detail",
+        "async-vendor-performance",
+        "async-purchase-order-list",
+        "async-purchase-order-detail",
+    }
+)
+
+_use_replica = contextvars.ContextVar("vendor_api_use_replica", default=False)
+
+
+def get_replica():
+    """
+    Returns: The alias of the replica database, or None if there is none.
+    """
+    alias = getattr(settings, "REPLICA_DATABASE", None)
+    return alias if alias in settings.DATABASES else None
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of requests marked by ReplicaRoutingMiddleware to the
+    replica; leaves everything else to the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return get_replica()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica gets its schema through replication.
+        return db != get_replica()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets the reads of a request go to the replica if it is a GET (or HEAD)
+    of one of REPLICA_READ_VIEWS and the client has not written recently.
+    Sets the sticky cookie on successful writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _use_replica.set(self.can_use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = _use_replica.set(self.can_use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self.finish(request, response)
+
+    def can_use_replica(self, request):
+        if request.method not in ("GET", "HEAD") or get_replica() is None:
+            return False
+        if STICKY_COOKIE in request.COOKIES:
+            return False
+        try:
+            match = get_resolver(getattr(request, "urlconf", None)).resolve(
+                request.path_info
+            )
+        except Resolver404:
+            return False
+        return match.url_name in REPLICA_READ_VIEWS
+
+    def finish(self, request, response):
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and get_replica() is not None
+        ):
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 5),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
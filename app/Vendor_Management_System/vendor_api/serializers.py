@@ -1,8 +1,129 @@
+from operator import attrgetter
+
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Vendor, PurchaseOrder, HistoricalPerformance
+from rest_framework import ISO_8601
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+from .instrumentation import timed_serialization
+from .models import Vendor, PurchaseOrder, PurchaseOrderChange, HistoricalPerformance
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent validating and representing data to the request's
+    serializer timing (see vendor_api.instrumentation).
+    """
+
+    def is_valid(self, *args, **kwargs):
+        with timed_serialization():
+            return super().is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class FastListSerializer(TimedListSerializer):
+    """
+    Renders lists of model instances with one precomputed reader per field.
+    Columns whose serializer field returns the stored value unchanged are read
+    straight off the instance, skipping the per-row get_attribute() and
+    to_representation() calls of ModelSerializer; other fields fall back to
+    the regular path. The output is the same as the child serializer's.
+    """
 
+    # Exact types only: subclasses may override to_representation().
+    PASSTHROUGH_FIELDS = (
+        serializers.BooleanField,
+        serializers.CharField,
+        serializers.ChoiceField,
+        serializers.FloatField,
+        serializers.IntegerField,
+        serializers.JSONField,
+    )
 
-class VendorSerializer(serializers.ModelSerializer):
+    def get_reader(self, field):
+        model = getattr(getattr(self.child, "Meta", None), "model", None)
+        if len(field.source_attrs) == 1 and model is not None:
+            source = field.source_attrs[0]
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                model_field = model._meta.get_field(source)
+                return attrgetter(model_field.attname)
+            if type(field) in self.PASSTHROUGH_FIELDS:
+                return attrgetter(source)
+            if type(field) is serializers.DateTimeField:
+                return self.get_datetime_reader(field, attrgetter(source))
+
+        def read(instance):
+            attribute = field.get_attribute(instance)
+            check_for_none = (
+                attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            )
+            return (
+                None if check_for_none is None else field.to_representation(attribute)
+            )
+
+        return read
+
+    @staticmethod
+    def get_datetime_reader(field, read_value):
+        """
+        Same as DateTimeField.to_representation() for aware datetimes in the
+        default ISO 8601 format, with the field's time zone looked up once.
+        """
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        field_timezone = getattr(field, "timezone", field.default_timezone())
+        if output_format is None or output_format.lower() != ISO_8601:
+            field_timezone = None
+
+        def read_datetime(instance):
+            value = read_value(instance)
+            if not value:
+                return None
+            if field_timezone is None or value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return read_datetime
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        readers = [
+            (field.field_name, self.get_reader(field))
+            for field in self.child._readable_fields
+        ]
+        return [
+            {name: read(instance) for name, read in readers} for instance in iterable
+        ]
+
+
+class SparseFieldsMixin:
+    """
+    Takes an optional ``fields`` argument with the names of the only fields to
+    render (see vendor_api.fieldsets).
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class VendorSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for the Vendor model.
     """
@@ -10,9 +131,13 @@ class VendorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vendor
         fields = "__all__"
+        read_only_fields = (*Vendor.PERFORMANCE_FIELDS, *Vendor.SUMMARY_FIELDS)
+        list_serializer_class = FastListSerializer
 
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+class PurchaseOrderSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for the PurchaseOrder model.
     """
@@ -20,9 +145,43 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = "__all__"
+        read_only_fields = PurchaseOrder.DERIVED_FIELDS
+        list_serializer_class = FastListSerializer
 
 
-class HistoricalPerformanceSerializer(serializers.ModelSerializer):
+class PurchaseOrderAcknowledgeSerializer(PurchaseOrderSerializer):
+    """
+    Acknowledges a purchase order: stamps its acknowledgment date and sets
+    its delivery date 5 days later. The request takes no body; the order is
+    returned as acknowledged.
+    """
+
+    class Meta(PurchaseOrderSerializer.Meta):
+        read_only_fields = [field.name for field in PurchaseOrder._meta.concrete_fields]
+
+    def validate(self, data):
+        # The fields are all read-only, so anything sent would be dropped.
+        if self.initial_data:
+            raise serializers.ValidationError(
+                "Acknowledging a purchase order takes no request body."
+            )
+        return data
+
+    def update(self, instance, validated_data):
+        instance.acknowledgment_date = timezone.now()
+        # Estimated delivery: 5 days after the vendor's acknowledgment.
+        instance.delivery_date = instance.acknowledgment_date + timezone.timedelta(
+            days=5
+        )
+        # One UPDATE of the two columns; the save and the counter update that
+        # follows it share a transaction.
+        instance.save(update_fields=["acknowledgment_date", "delivery_date"])
+        return instance
+
+
+class HistoricalPerformanceSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for the HistoricalPerformance model (optional).
     """
@@ -30,3 +189,63 @@ class HistoricalPerformanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = HistoricalPerformance
         fields = "__all__"
+        list_serializer_class = FastListSerializer
+
+
+class PurchaseOrderChangeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for the PurchaseOrderChange model.
+    """
+
+    class Meta:
+        model = PurchaseOrderChange
+        fields = [
+            "seq",
+            "purchase_order",
+            "vendor",
+            "po_number",
+            "action",
+            "changed_at",
+            "data",
+        ]
+        list_serializer_class = FastListSerializer
+
+
+class PurchaseOrderBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Validates one row of a bulk purchase order upsert.
+
+    Rows are matched on po_number, so its uniqueness check is left out, and the
+    vendor is taken as a plain id that the caller checks for the whole batch
+    at once instead of with one query per row.
+    """
+
+    vendor = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = PurchaseOrder
+        exclude = ["id", *PurchaseOrder.DERIVED_FIELDS]
+        extra_kwargs = {"po_number": {"validators": []}}
+
+
+class PurchaseOrderBulkStatusSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Validates a bulk status transition: the orders, by id and/or po_number,
+    the target status and optional quality ratings keyed by id or po_number.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+    po_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False, default=list
+    )
+    status = serializers.ChoiceField(choices=PurchaseOrder.STATUS_CHOICES)
+    quality_ratings = serializers.DictField(
+        child=serializers.FloatField(allow_null=True), required=False, default=dict
+    )
+
+    def validate(self, data):
+        if not data["ids"] and not data["po_numbers"]:
+            raise serializers.ValidationError("Provide ids or po_numbers.")
+        return data
@@ -1,15 +1,68 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from .models import *
+from . import changes, items, metrics
+from .authentication import user_cache
+
+
+@receiver(post_save, sender=Vendor)
+def create_vendor_metric_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        VendorMetricCounters.objects.create(vendor=instance)
+
+
+@receiver(post_save, sender=PurchaseOrder)
+def update_vendor_metrics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # The previous state was read under a row lock by PurchaseOrder.save().
+    metrics.apply_order_changes(
+        [(instance._previous_metric_state, instance.get_metric_state())]
+    )
+
+
+@receiver(post_save, sender=PurchaseOrder)
+def sync_item_lines(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "items" not in update_fields):
+        return
+    if items.items_changed(instance):
+        items.replace_item_lines([instance], created=created)
 
 
 @receiver(post_save, sender=PurchaseOrder)
-def update_vendor_metrics(sender, instance, **kwargs):
-    vendor = instance.vendor
+def log_purchase_order_save(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    if not raw:
+        changes.log_changes(
+            [instance], "created" if created else "updated", update_fields
+        )
+
+
+@receiver(post_delete, sender=PurchaseOrder)
+def log_purchase_order_delete(sender, instance, **kwargs):
+    # Also for orders deleted along with their vendor.
+    changes.log_changes([instance], "deleted")
+
+
+@receiver(post_delete, sender=PurchaseOrder)
+def remove_vendor_metrics(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Vendor) or getattr(origin, "model", None) is Vendor:
+        # The vendor (or a queryset of vendors) and its counters are being
+        # deleted along with the order.
+        return
+    if "_deleted_metric_state" in instance.__dict__:
+        # Deleted by PurchaseOrder.delete(), which read the row under a lock.
+        previous_state = instance.__dict__.pop("_deleted_metric_state")
+    else:
+        previous_state = instance.get_metric_state()
+    metrics.apply_order_changes([(previous_state, None)])
 
-    # Update metrics in real-time
-    vendor.on_time_delivery_rate = vendor.calculate_on_time_delivery_rate()
-    vendor.quality_rating_avg = vendor.calculate_quality_rating_average()
-    vendor.fulfillment_rate = vendor.calculate_fulfillment_rate()
 
-    vendor.save()
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def evict_cached_user(sender, instance, **kwargs):
+    # Deactivation, a password change or any other edit of the user.
+    transaction.on_commit(lambda: user_cache.evict(instance.pk))
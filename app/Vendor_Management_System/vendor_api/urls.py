@@ -1,11 +1,18 @@
 from django.urls import path
+from .async_views import purchase_order_changes
 from .views import (
     VendorListCreateAPIView,
     VendorRetrieveUpdateDestroyView,
     PurchaseOrderListCreateAPIView,
+    PurchaseOrderBulkUpsertView,
+    PurchaseOrderBulkStatusView,
+    PurchaseOrderExportView,
+    HistoricalPerformanceExportView,
     PurchaseOrderRetrieveUpdateDestroyView,
     PurchaseOrderAcknowledgeView,
     VendorPerformanceRetrieveView,
+    VendorPerformanceHistoryView,
+    VendorPerformanceLeaderboardView,
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
@@ -13,6 +20,11 @@ urlpatterns = [
     path("token/", TokenObtainPairView.as_view(), name="get-token"),
     path("token/refresh/", TokenRefreshView.as_view(), name="refresh-token"),
     path("vendors/", VendorListCreateAPIView.as_view(), name="vendor-create-list"),
+    path(
+        "vendors/performance/",
+        VendorPerformanceLeaderboardView.as_view(),
+        name="vendor-performance-leaderboard",
+    ),
     path(
         "vendors/<int:pk>/",
         VendorRetrieveUpdateDestroyView.as_view(),
@@ -23,6 +35,26 @@ urlpatterns = [
         PurchaseOrderListCreateAPIView.as_view(),
         name="purchase-order-create-list",
     ),
+    path(
+        "purchase_orders/bulk/",
+        PurchaseOrderBulkUpsertView.as_view(),
+        name="purchase-order-bulk-upsert",
+    ),
+    path(
+        "purchase_orders/bulk_status/",
+        PurchaseOrderBulkStatusView.as_view(),
+        name="purchase-order-bulk-status",
+    ),
+    path(
+        "purchase_orders/export/",
+        PurchaseOrderExportView.as_view(),
+        name="purchase-order-export",
+    ),
+    path(
+        "historical_performance/export/",
+        HistoricalPerformanceExportView.as_view(),
+        name="historical-performance-export",
+    ),
     path(
         "purchase_orders/<int:po_id>/",
         PurchaseOrderRetrieveUpdateDestroyView.as_view(),
@@ -38,4 +70,10 @@ urlpatterns = [
         VendorPerformanceRetrieveView.as_view(),
         name="vendor-performance-retrieve",
     ),
+    path(
+        "vendors/<int:vendor_id>/performance/history/",
+        VendorPerformanceHistoryView.as_view(),
+        name="vendor-performance-history",
+    ),
+    path("changes/", purchase_order_changes, name="purchase-order-changes"),
 ]
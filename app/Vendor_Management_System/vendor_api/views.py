@@ -1,4 +1,5 @@
-from django.utils import timezone
+import datetime
+
 from rest_framework.generics import (
     ListCreateAPIView,
     RetrieveUpdateDestroyAPIView,
@@ -6,30 +7,95 @@ from rest_framework.generics import (
     RetrieveAPIView,
 )
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import OrderingFilter
+from django.db.models.functions import PercentRank
+from django.db.models import Window
 from django.http import Http404
-from django.db.models import Q, F, Avg
-
-from .models import Vendor, PurchaseOrder
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.db.models import F
+
+from .bulk import transition_purchase_orders, upsert_purchase_orders
+from .cache import to_version
+from .exports import CONTENT_TYPES, stream_queryset
+from .fieldsets import SparseFieldsetMixin
+from .filters import (
+    PurchaseOrderFilterBackend,
+    VendorFilterBackend,
+    filter_historical_performance,
+    filter_purchase_orders,
+    parse_bool_param,
+    parse_datetime_param,
+)
+from .history import METRIC_FIELDS, RESOLUTIONS, performance_history
+from .metrics import get_vendor_counters
+from .models import Vendor, PurchaseOrder, HistoricalPerformance
+from .pagination import PurchaseOrderPagination
 from .serializers import (
     VendorSerializer,
+    PurchaseOrderAcknowledgeSerializer,
     PurchaseOrderSerializer,
+    PurchaseOrderBulkStatusSerializer,
 )
 
 
-class VendorListCreateAPIView(ListCreateAPIView):
+class ConditionalVendorResponseMixin:
+    """
+    Adds ETag and Last-Modified validators, derived from the updated_at of the
+    row a single-vendor GET response is built from (see vendor_api.cache), and
+    answers conditional requests for an unchanged row with 304.
+    """
+
+    def get_conditional_vendor_response(
+        self, request, vendor_id, kind, updated_at, get_data
+    ):
+        """
+        Args: vendor_id: The vendor the response describes.
+              kind: Name distinguishing this response from the vendor's others.
+              updated_at: The updated_at of the row the data is built from, or
+                          None for an unsaved row (no validators are sent).
+              get_data: Callable building the response data, unless a 304 is
+                        returned.
+        Returns: A 304 response if the client's copy is current, otherwise a
+                 200 response with the data.
+        """
+        if updated_at is None:
+            return Response(get_data())
+        version = to_version(updated_at)
+        etag = quote_etag(f"{kind}-{vendor_id}-{version}")
+        last_modified = version // 10**6
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(get_data())
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class VendorListCreateAPIView(SparseFieldsetMixin, ListCreateAPIView):
     """
-    API endpoint for creating and listing vendors.
+    API endpoint for creating and listing vendors, filtered by their order
+    summary (see filters.filter_vendors).
     """
 
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [VendorFilterBackend]
 
 
-class VendorRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+class VendorRetrieveUpdateDestroyView(
+    SparseFieldsetMixin, ConditionalVendorResponseMixin, RetrieveUpdateDestroyAPIView
+):
     """
     API endpoint for retrieving, updating, and deleting a specific vendor.
     """
@@ -37,6 +103,20 @@ class VendorRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     permission_classes = [IsAuthenticated]
+    # The validators of the detail response.
+    always_loaded_fields = ("updated_at",)
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = self.get_requested_fields()
+        kind = "detail" if fields is None else "detail:" + ",".join(fields)
+        vendor = self.get_object()
+        return self.get_conditional_vendor_response(
+            request,
+            vendor.pk,
+            kind,
+            vendor.updated_at,
+            lambda: self.get_serializer(vendor).data,
+        )
 
     def get_object(self):
         """
@@ -49,24 +129,26 @@ class VendorRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
             raise Http404("Vendor with ID " + str(pk) + " not found.")
 
 
-class PurchaseOrderListCreateAPIView(ListCreateAPIView):
+class PurchaseOrderListCreateAPIView(SparseFieldsetMixin, ListCreateAPIView):
     """
-    API endpoint to list and create purchase orders with vendor filtering.
+    API endpoint to list and create purchase orders, filtered by the query
+    string (see filters.filter_purchase_orders).
     """
 
     queryset = PurchaseOrder.objects.all()
     serializer_class = PurchaseOrderSerializer
-    filter_backends = [OrderingFilter]
+    filter_backends = [PurchaseOrderFilterBackend, OrderingFilter]
+    pagination_class = PurchaseOrderPagination
 
-    def get_queryset(self):
+    def list(self, request, *args, **kwargs):
         """
-        Override to filter by vendor (optional parameter in query string).
+        With ?count_only=true, returns only the number of matching purchase
+        orders instead of a page of them.
         """
-        queryset = PurchaseOrder.objects.all()
-        vendor_id = self.request.query_params.get("vendor")
-        if vendor_id:
-            queryset = queryset.filter(Q(vendor__id=vendor_id))
-        return queryset
+        if parse_bool_param(request.query_params, "count_only"):
+            queryset = self.filter_queryset(self.get_queryset())
+            return Response({"count": queryset.order_by().count()})
+        return super().list(request, *args, **kwargs)
 
     def post(self, request):
         """
@@ -78,7 +160,132 @@ class PurchaseOrderListCreateAPIView(ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class PurchaseOrderRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
+class PurchaseOrderBulkUpsertView(APIView):
+    """
+    API endpoint to create or update many purchase orders, keyed on po_number.
+    """
+
+    permission_classes = [IsAuthenticated]
+    max_rows = 10000
+
+    def post(self, request):
+        """
+        Upsert a list of purchase orders. Invalid rows are reported per index
+        and skipped; the valid rows are still written.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response(
+                {"detail": "Expected a list of purchase orders."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(rows) > self.max_rows:
+            return Response(
+                {"detail": f"At most {self.max_rows} purchase orders per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = upsert_purchase_orders(rows)
+        written = result["created"] + result["updated"]
+        if result["errors"] and not written:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class PurchaseOrderBulkStatusView(APIView):
+    """
+    API endpoint to move many purchase orders to a status at once.
+    """
+
+    permission_classes = [IsAuthenticated]
+    max_orders = 10000
+
+    def post(self, request):
+        """
+        Set the status (and optionally the quality rating) of purchase orders
+        given by id and/or po_number. Unknown orders are reported and skipped.
+        """
+        serializer = PurchaseOrderBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if len(data["ids"]) + len(data["po_numbers"]) > self.max_orders:
+            return Response(
+                {"detail": f"At most {self.max_orders} purchase orders per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        result = transition_purchase_orders(
+            data["ids"], data["po_numbers"], data["status"], data["quality_ratings"]
+        )
+        if result["errors"] and not result["updated"] and not result["unchanged"]:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class ExportAPIView(APIView):
+    """
+    Base for endpoints streaming a filtered queryset as NDJSON or CSV.
+    """
+
+    permission_classes = [IsAuthenticated]
+    export_fields = ()
+    export_filename = None
+
+    def filter_export_queryset(self, queryset):
+        return queryset
+
+    def get(self, request):
+        """
+        Stream the records as NDJSON (default) or CSV (?output=csv).
+        """
+        output = request.query_params.get("output", "ndjson")
+        if output not in CONTENT_TYPES:
+            return Response(
+                {"output": [f"Expected one of: {', '.join(CONTENT_TYPES)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.filter_export_queryset(self.queryset.order_by("pk"))
+        # The rows are read while the response streams, after the request has
+        # left the middleware: pin the database it was routed to now.
+        queryset = queryset.using(queryset.db)
+        return stream_queryset(
+            queryset, self.export_fields, output, self.export_filename
+        )
+
+
+class PurchaseOrderExportView(ExportAPIView):
+    """
+    API endpoint to export purchase orders, filtered by vendor, status and
+    order date range.
+    """
+
+    queryset = PurchaseOrder.objects.all()
+    export_fields = [field.attname for field in PurchaseOrder._meta.concrete_fields]
+    export_filename = "purchase_orders"
+
+    def filter_export_queryset(self, queryset):
+        return filter_purchase_orders(queryset, self.request.query_params)
+
+
+class HistoricalPerformanceExportView(ExportAPIView):
+    """
+    API endpoint to export vendors' historical performance records, filtered
+    by vendor and date range.
+    """
+
+    queryset = HistoricalPerformance.objects.all()
+    export_fields = [
+        field.attname for field in HistoricalPerformance._meta.concrete_fields
+    ]
+    export_filename = "historical_performance"
+
+    def filter_export_queryset(self, queryset):
+        return filter_historical_performance(queryset, self.request.query_params)
+
+
+class PurchaseOrderRetrieveUpdateDestroyView(
+    SparseFieldsetMixin, RetrieveUpdateDestroyAPIView
+):
     """
     API endpoint to retrieve, update, and delete a specific purchase order.
     """
@@ -92,53 +299,24 @@ class PurchaseOrderRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
         """
         pk = self.kwargs.get("po_id")
         try:
-            return self.queryset.get(pk=pk)
+            return self.get_queryset().get(pk=pk)
         except PurchaseOrder.DoesNotExist:
             raise Http404("Purchase order with ID " + str(pk) + " not found.")
 
 
 class PurchaseOrderAcknowledgeView(UpdateAPIView):
     """
-    API endpoint to acknowledge a PO by the vendor.
+    API endpoint to acknowledge a PO by the vendor. The vendor's average
+    response time is kept up to date by the metric counters on save.
     """
 
     permission_classes = [IsAuthenticated]
     queryset = PurchaseOrder.objects.all()
-    serializer_class = PurchaseOrderSerializer
+    serializer_class = PurchaseOrderAcknowledgeSerializer
     lookup_url_kwarg = "po_id"
 
-    def perform_update(self, serializer):
-        """
-        Acknowledge a purchase order and update vendor's average response time.
-        """
-        serializer.save(acknowledgment_date=timezone.now())
-
-        # Calculate new delivery date (Estimated date - 5 days after vendor acknowledgement)
-        acknowledgment_date = serializer.instance.acknowledgment_date
-        new_delivery_date = acknowledgment_date + timezone.timedelta(days=5)
-        serializer.instance.delivery_date = new_delivery_date
-        serializer.instance.save()
-
-        # Update average response time for the vendor
-        purchase_order = serializer.instance
-        vendor = purchase_order.vendor
-        if vendor:
-            avg_response_time = PurchaseOrder.objects.filter(
-                vendor=vendor, acknowledgment_date__isnull=False
-            ).aggregate(
-                avg_response_time=Avg(F("acknowledgment_date") - F("issue_date"))
-            )[
-                "avg_response_time"
-            ]
-
-            average_days = avg_response_time.total_seconds() / (60 * 60 * 24)
-            avg_response_time = round(average_days, 2)
-
-            vendor.average_response_time = avg_response_time
-            vendor.save()
 
-
-class VendorPerformanceRetrieveView(RetrieveAPIView):
+class VendorPerformanceRetrieveView(ConditionalVendorResponseMixin, RetrieveAPIView):
     """
     API endpoint to retrieve a vendor's performance metrics.
     """
@@ -149,20 +327,116 @@ class VendorPerformanceRetrieveView(RetrieveAPIView):
     lookup_url_kwarg = "vendor_id"
 
     def retrieve(self, request, *args, **kwargs):
-        vendor = self.get_object()
-        serializer = VendorSerializer(vendor)
-
-        serializer.data["on_time_delivery_rate"] = vendor.on_time_delivery_rate
-        serializer.data["quality_rating_avg"] = vendor.quality_rating_avg
-        serializer.data["average_response_time"] = vendor.average_response_time
-        serializer.data["fulfillment_rate"] = vendor.fulfillment_rate
-        
-        performance_data = {
-            "on_time_delivery_rate": serializer.data["on_time_delivery_rate"],
-            "quality_rating_avg": serializer.data["quality_rating_avg"],
-            "average_response_time": serializer.data["average_response_time"],
-            "fulfillment_rate": serializer.data["fulfillment_rate"],
-        }
-
-
-        return Response(performance_data)
+        vendor_id = self.kwargs["vendor_id"]
+        counters = get_vendor_counters(vendor_id)
+        if counters is None:
+            raise Http404("Vendor with ID " + str(vendor_id) + " not found.")
+        return self.get_conditional_vendor_response(
+            request,
+            vendor_id,
+            "performance",
+            counters.updated_at,
+            counters.get_performance_metrics,
+        )
+
+
+class VendorPerformanceLeaderboardView(APIView):
+    """
+    API endpoint to rank all (or selected) vendors by a performance metric.
+    """
+
+    permission_classes = [IsAuthenticated]
+    default_ordering = "-on_time_delivery_rate"
+
+    def get(self, request):
+        """
+        Returns every vendor's metrics and percentile rank on the ordering
+        metric, read in one query from the stored metric columns.
+        """
+        ordering = request.query_params.get("ordering", self.default_ordering)
+        if ordering.lstrip("-") not in METRIC_FIELDS:
+            return Response(
+                {"ordering": [f"Expected one of: {', '.join(METRIC_FIELDS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            vendor_ids = sorted(
+                {
+                    int(vendor_id)
+                    for vendor_id in request.query_params.get("vendor", "").split(",")
+                    if vendor_id
+                }
+            )
+            top = int(request.query_params.get("top", 0))
+        except ValueError:
+            return Response(
+                {"detail": "vendor and top must be integers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(self.get_leaderboard(ordering, vendor_ids, top))
+
+    def get_leaderboard(self, ordering, vendor_ids, top):
+        metric = ordering.lstrip("-")
+        queryset = Vendor.objects.all()
+        if vendor_ids:
+            queryset = queryset.filter(id__in=vendor_ids)
+        queryset = queryset.annotate(
+            percentile_rank=Window(PercentRank(), order_by=F(metric).asc())
+        ).order_by(ordering, "id")
+        rows = queryset.values(
+            "id", "name", "vendor_code", *METRIC_FIELDS, "percentile_rank"
+        )
+        if top > 0:
+            rows = rows[:top]
+
+        results = []
+        for row in rows:
+            row["vendor_id"] = row.pop("id")
+            row["percentile_rank"] = round(row["percentile_rank"] * 100, 2)
+            results.append(row)
+        return {"ordering": ordering, "count": len(results), "results": results}
+
+
+class VendorPerformanceHistoryView(APIView):
+    """
+    API endpoint to retrieve a vendor's performance history, downsampled to
+    hourly, daily or weekly averages. Raw reads are capped at RAW_LIMIT
+    records; a truncated response links to the next records.
+    """
+
+    permission_classes = [IsAuthenticated]
+    resolutions = ("raw", *RESOLUTIONS)
+
+    def get(self, request, vendor_id):
+        resolution = request.query_params.get("resolution", "daily")
+        if resolution not in self.resolutions:
+            return Response(
+                {"resolution": [f"Expected one of: {', '.join(self.resolutions)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not Vendor.objects.filter(pk=vendor_id).exists():
+            raise Http404("Vendor with ID " + str(vendor_id) + " not found.")
+
+        results, truncated = performance_history(
+            vendor_id,
+            resolution,
+            after=parse_datetime_param(request.query_params, "date_after"),
+            before=parse_datetime_param(request.query_params, "date_before"),
+        )
+        next_url = None
+        if truncated:
+            # Dates are unique per vendor; resume just after the last one.
+            resume = results[-1]["date"] + datetime.timedelta(microseconds=1)
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "date_after", resume.isoformat()
+            )
+        return Response(
+            {
+                "vendor_id": vendor_id,
+                "resolution": resolution,
+                "truncated": truncated,
+                "next": next_url,
+                "results": results,
+            }
+        )